@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark batch threshold evaluation for IoT sensor readings
+
+Compares, at 10k, 100k and 1M readings:
+
+- per_reading: FruitGuardIoT-style checks, one reading dict at a time
+- python: RuleSet.evaluate_batch over the built-in rules without NumPy
+- numpy: RuleSet.evaluate_batch with NumPy (skipped when not installed)
+
+Readings come from 1000 devices with roughly 2% out-of-range values and rare
+motion/intrusion flags, so alert volume stays realistic.
+
+Usage:
+    python benchmarks/bench_iot_batch.py
+    python benchmarks/bench_iot_batch.py --sizes 10000 100000 --output iot_batch.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from iot import rules
+from iot.rules import DEFAULT_RULES, compile_rules
+
+THRESHOLDS = {'temperature': {'min': 15, 'max': 35}, 'humidity': {'min': 30, 'max': 80}}
+RULES = compile_rules(DEFAULT_RULES, THRESHOLDS)
+
+def make_readings(count: int, devices: int = 1000, seed: int = 42):
+    rng = random.Random(seed)
+    device_ids = [f"node-{rng.randrange(devices):05d}" for _ in range(count)]
+    temperature = [rng.gauss(25, 4.5) for _ in range(count)]
+    humidity = [rng.gauss(55, 11) for _ in range(count)]
+    motion = [rng.random() < 0.001 for _ in range(count)]
+    intrusion = [rng.random() < 0.0001 for _ in range(count)]
+    return device_ids, temperature, humidity, motion, intrusion
+
+def per_reading(columns):
+    """The single-reading checks from FruitGuardIoT._check_thresholds, applied row by row"""
+    device_ids, temperature, humidity, motion, intrusion = columns
+    latched = {'motion': set(), 'intrusion': set()}
+    events = []
+    for i in range(len(device_ids)):
+        reading = {'temperature': temperature[i], 'humidity': humidity[i],
+                   'motion_detected': motion[i], 'intrusion_detected': intrusion[i]}
+        temp = reading['temperature']
+        if temp < THRESHOLDS['temperature']['min']:
+            events.append((i, device_ids[i], 'temperature_low', temp))
+        elif temp > THRESHOLDS['temperature']['max']:
+            events.append((i, device_ids[i], 'temperature_high', temp))
+        hum = reading['humidity']
+        if hum < THRESHOLDS['humidity']['min']:
+            events.append((i, device_ids[i], 'humidity_low', hum))
+        elif hum > THRESHOLDS['humidity']['max']:
+            events.append((i, device_ids[i], 'humidity_high', hum))
+        for key, alert_type in (('motion_detected', 'motion'), ('intrusion_detected', 'intrusion')):
+            if reading[key] and device_ids[i] not in latched[alert_type]:
+                latched[alert_type].add(device_ids[i])
+                events.append((i, device_ids[i], alert_type, None))
+    return events
+
+def evaluate_batch(device_ids, temperature, humidity, motion, intrusion, use_numpy):
+    columns = {'temperature': temperature, 'humidity': humidity,
+               'motion_detected': motion, 'intrusion_detected': intrusion}
+    return RULES.evaluate_batch(device_ids, columns, use_numpy=use_numpy)
+
+def best_of(func, repeat: int) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+def bench_size(count: int, repeat: int) -> dict:
+    columns = make_readings(count)
+    results = {
+        'per_reading': best_of(lambda: per_reading(columns), repeat),
+        'python': best_of(lambda: evaluate_batch(*columns, use_numpy=False), repeat)
+    }
+    events = len(evaluate_batch(*columns, use_numpy=False))
+    if rules.np is not None:
+        np = rules.np
+        arrays = (np.asarray(columns[0]), np.asarray(columns[1]), np.asarray(columns[2]),
+                  np.asarray(columns[3]), np.asarray(columns[4]))
+        results['numpy'] = best_of(lambda: evaluate_batch(*arrays, use_numpy=True),
+                                   repeat)
+        assert len(evaluate_batch(*arrays, use_numpy=True)) == events
+    results['events'] = events
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    print(f"Batch backend: {rules.BACKEND}")
+    results = {'backend': rules.BACKEND, 'sizes': {}}
+    for count in args.sizes:
+        timings = results['sizes'][count] = bench_size(count, args.repeat)
+        line = f"{count:>8} readings  {timings['events']:>6} alerts"
+        for name in ('per_reading', 'python', 'numpy'):
+            if name in timings:
+                line += f"  {name} {timings[name] * 1000:9.2f} ms"
+        if 'numpy' in timings:
+            line += f"  x{timings['per_reading'] / timings['numpy']:.1f}"
+        print(line)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-alert overhead of the IoT alert transports
+
+Sends alerts through each FruitGuardIoT transport and reports the time per
+alert:
+
+- http_unpooled   a new connection per alert (the old requests.post behaviour)
+- http            iot.transport.HttpTransport, pooled keep-alive connections
+- inprocess       iot.transport.InProcessTransport, a direct call into the app
+
+The HTTP modes post to `run.py --prod` (gunicorn, one worker) on localhost.
+The in-process mode imports the app into this process instead. Every mode
+ends at the same upstream: benchmarks/fake_smsleopard_server.py with no
+injected latency. The differences are therefore the gateway-to-app hop: JSON
+encoding, the HTTP round trip, routing and decoding.
+
+Usage:
+    python benchmarks/bench_iot_transport.py
+    python benchmarks/bench_iot_transport.py --recipients 1 10 --alerts 2000 --output transport.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = ['http_unpooled', 'http', 'inprocess']
+MESSAGE = '⚠️ ALERT: node-7: Temperature too high: 36.5°C at 2024-01-01 12:00:00'
+
+def wait_until_ready(port: int, path: str, timeout: float = 15.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', path)
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+def time_alerts(send, numbers, alerts: int, repeat: int) -> dict:
+    """Median and best microseconds per alert over repeat runs of alerts sends"""
+    for _ in range(min(alerts, 50)):
+        if not send(numbers, MESSAGE):
+            raise RuntimeError("Warmup alert was not accepted")
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(alerts):
+            send(numbers, MESSAGE)
+        samples.append((time.perf_counter() - start) / alerts * 1e6)
+    return {'median_us': round(statistics.median(samples), 1), 'min_us': round(min(samples), 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--recipients', nargs='+', type=int, default=[1, 10, 100])
+    parser.add_argument('--alerts', type=int, default=1000, help='Alerts per run')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--modes', nargs='+', default=MODES, choices=MODES)
+    parser.add_argument('--port', type=int, default=5098, help='Port of the SMS app for the HTTP modes')
+    parser.add_argument('--provider-port', type=int, default=9098)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_transport_')
+    env = dict(os.environ,
+               API_key='bench-key', API_secret='bench-secret',
+               API_URL=f"http://127.0.0.1:{args.provider_port}/v1",
+               PORT=str(args.port), HOST='127.0.0.1', LOG_LEVEL='WARNING', DEBUG='False',
+               WORKERS='1', THREADS='4',
+               DR_DB_PATH=os.path.join(workdir, 'dr.db'), JOB_DB_PATH=os.path.join(workdir, 'jobs.db'))
+    os.environ.update({key: env[key] for key in ('API_key', 'API_secret', 'API_URL', 'LOG_LEVEL',
+                                                 'DR_DB_PATH', 'JOB_DB_PATH')})
+    sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+    processes = [subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'benchmarks', 'fake_smsleopard_server.py'),
+         '--port', str(args.provider_port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)]
+    if any(mode.startswith('http') for mode in args.modes):
+        processes.append(subprocess.Popen([sys.executable, os.path.join(ROOT, 'run.py'), '--prod'],
+                                          env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+    transports = []
+    results = {}
+    try:
+        wait_until_ready(args.provider_port, '/v1/balance')
+        import requests
+        from iot.transport import HttpTransport, InProcessTransport
+
+        senders = {}
+        if any(mode.startswith('http') for mode in args.modes):
+            wait_until_ready(args.port, '/health')
+            base_url = f"http://127.0.0.1:{args.port}"
+            http_transport = HttpTransport(base_url)
+            transports.append(http_transport)
+            senders['http'] = http_transport.send
+
+            def unpooled(numbers, message):
+                response = requests.post(f"{base_url}/sms/send", timeout=10, json={
+                    'phone_numbers': numbers, 'message': message, 'sender_id': 'FruitGuard'})
+                return response.status_code == 200
+            senders['http_unpooled'] = unpooled
+        if 'inprocess' in args.modes:
+            senders['inprocess'] = InProcessTransport().send
+
+        for count in args.recipients:
+            numbers = [f"07{i:08d}" for i in range(count)]
+            results[str(count)] = {}
+            line = f"{count:>5} recipients"
+            for mode in args.modes:
+                timing = results[str(count)][mode] = time_alerts(senders[mode], numbers, args.alerts, args.repeat)
+                line += f"  {mode} {timing['median_us']:9.1f} us"
+            if 'http' in args.modes and 'inprocess' in args.modes:
+                ratio = results[str(count)]['http']['median_us'] / results[str(count)]['inprocess']['median_us']
+                line += f"  http/inprocess x{ratio:.1f}"
+            print(line)
+    finally:
+        for transport in transports:
+            transport.close()
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'alerts': args.alerts, 'results': results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
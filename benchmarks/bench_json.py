@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON encoding/decoding on the send and validate paths
+
+Compares the stdlib json module against the fast provider (orjson, when
+installed) at 1k, 10k and 100k recipients for:
+
+- encoding the SMSLeopard /sms/send payload (SMSLeopardService)
+- decoding a /sms/send request body
+- encoding a /sms/validate response through the Flask JSON provider
+
+Usage:
+    python benchmarks/bench_json.py
+    python benchmarks/bench_json.py --sizes 1000 10000 --output json_bench.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from utils import json_provider
+from utils.flask_json import FastJSONProvider
+
+def numbers(count: int):
+    return [f"+2547{i % 100000000:08d}" for i in range(count)]
+
+def best_of(func, repeat: int) -> float:
+    number = 1
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+def bench_size(count: int, repeat: int) -> dict:
+    phone_numbers = numbers(count)
+    send_payload = {
+        'source': 'FruitGuard',
+        'message': 'Alert: FruitGuard detected potential threat in your orchard!',
+        'destination': [{'number': n} for n in phone_numbers]
+    }
+    request_body = json.dumps({'phone_numbers': phone_numbers, 'message': 'Alert'}).encode()
+    validate_response = {
+        'success': True,
+        'validation_results': {n: True for n in phone_numbers},
+        'formatted_numbers': phone_numbers
+    }
+
+    app = Flask(__name__)
+    stdlib_provider = DefaultJSONProvider(app)
+    fast_provider = FastJSONProvider(app)
+
+    results = {}
+    results['send_payload_encode'] = {
+        'stdlib': best_of(lambda: json.dumps(send_payload).encode(), repeat),
+        'fast': best_of(lambda: json_provider.dumps_bytes(send_payload), repeat)
+    }
+    results['request_decode'] = {
+        'stdlib': best_of(lambda: stdlib_provider.loads(request_body), repeat),
+        'fast': best_of(lambda: fast_provider.loads(request_body), repeat)
+    }
+    with app.app_context():
+        results['validate_response_encode'] = {
+            'stdlib': best_of(lambda: stdlib_provider.response(validate_response), repeat),
+            'fast': best_of(lambda: fast_provider.response(validate_response), repeat)
+        }
+    for timings in results.values():
+        timings['speedup'] = round(timings['stdlib'] / timings['fast'], 2) if timings['fast'] else None
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    print(f"Fast JSON backend: {json_provider.BACKEND}")
+    results = {'backend': json_provider.BACKEND, 'sizes': {}}
+    for count in args.sizes:
+        results['sizes'][count] = bench_size(count, args.repeat)
+        for name, timings in results['sizes'][count].items():
+            print(f"{count:>7} recipients  {name:26} stdlib {timings['stdlib'] * 1000:9.2f} ms  "
+                  f"fast {timings['fast'] * 1000:9.2f} ms  x{timings['speedup']}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
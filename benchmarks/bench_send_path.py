@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark the send path against an in-process fake provider
+
+Measures, for each recipient count:
+
+- format_phone_numbers     SMSLeopardService.format_phone_numbers on mixed formats
+- validate_phone_number    one call per recipient
+- send_sms                 payload building, encoding and response decoding
+- route_validate           POST /sms/validate through the Flask test client
+- route_send               POST /sms/send through the Flask test client
+
+SMSLeopard is replaced by benchmarks/fake_provider.py, so nothing leaves the
+process. Logging is set to WARNING unless --log-level says otherwise, since the
+service logs the full payload at INFO.
+
+Results are written as JSON. --compare reads an earlier results file and
+exits with status 1 if any measurement got slower by more than --threshold.
+
+Usage:
+    python benchmarks/bench_send_path.py --output baseline.json
+    python benchmarks/bench_send_path.py --sizes 1 1000 --compare baseline.json --threshold 1.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BENCHMARKS = ['format_phone_numbers', 'validate_phone_number', 'send_sms', 'route_validate', 'route_send']
+NUMBER_FORMATS = ['07{:08d}', '+2547{:08d}', '2547{:08d}', '7{:08d}', '07{:02d} {:03d} {:03d}']
+
+def numbers(count: int):
+    result = []
+    for i in range(count):
+        template = NUMBER_FORMATS[i % len(NUMBER_FORMATS)]
+        n = i % 100000000
+        if template.count('{') == 3:
+            result.append(template.format(n // 1000000 % 100, n // 1000 % 1000, n % 1000))
+        else:
+            result.append(template.format(n))
+    return result
+
+def measure(func, min_time: float, repeat: int) -> dict:
+    """Time func, running it enough times per sample to fill min_time"""
+    func()
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        if time.perf_counter() - start >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - start) / loops)
+    return {'min_ms': round(min(samples) * 1000, 4), 'median_ms': round(statistics.median(samples) * 1000, 4),
+            'loops': loops}
+
+def run(sizes, benchmarks, min_time: float, repeat: int) -> dict:
+    import main
+    from fake_provider import FakeProvider
+
+    service = main.components.get_sms_service()
+    client = main.app.test_client()
+    results = {}
+    with FakeProvider():
+        for count in sizes:
+            raw = numbers(count)
+            formatted = service.format_phone_numbers(raw)
+            cases = {
+                'format_phone_numbers': lambda: service.format_phone_numbers(raw),
+                'validate_phone_number': lambda: [service.validate_phone_number(n) for n in formatted],
+                'send_sms': lambda: service.send_sms(formatted, 'Alert: FruitGuard detected a threat'),
+                'route_validate': lambda: client.post('/sms/validate', json={'phone_numbers': raw}),
+                'route_send': lambda: client.post('/sms/send', json={
+                    'phone_numbers': raw, 'message': 'Alert: FruitGuard detected a threat', 'max_retries': 1})
+            }
+            results[str(count)] = {}
+            for name in benchmarks:
+                results[str(count)][name] = measure(cases[name], min_time, repeat)
+                timing = results[str(count)][name]
+                print(f"{count:>7} recipients  {name:22} min {timing['min_ms']:11.4f} ms  "
+                      f"median {timing['median_ms']:11.4f} ms")
+    return results
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Print current/baseline ratios and return the regressions"""
+    regressions = []
+    for size, timings in results.items():
+        for name, timing in timings.items():
+            before = baseline.get(size, {}).get(name)
+            if not before or not before['min_ms']:
+                continue
+            ratio = timing['min_ms'] / before['min_ms']
+            flag = '  REGRESSION' if ratio > threshold else ''
+            print(f"{size:>7} recipients  {name:22} x{ratio:6.2f} vs baseline{flag}")
+            if ratio > threshold:
+                regressions.append(f"{name}@{size}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1, 10, 100, 1000, 10000, 100000])
+    parser.add_argument('--benchmarks', nargs='+', default=BENCHMARKS, choices=BENCHMARKS)
+    parser.add_argument('--min-time', type=float, default=0.2, help='Seconds per sample')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--log-level', default='WARNING')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--compare', help='Results file from an earlier run')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='Fail --compare when a measurement is this many times slower')
+    args = parser.parse_args()
+
+    os.environ['LOG_LEVEL'] = args.log_level
+    os.environ.setdefault('API_key', 'bench-key')
+    os.environ.setdefault('API_secret', 'bench-secret')
+    sys.path.insert(0, os.path.join(ROOT, 'src'))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    results = run(args.sizes, args.benchmarks, args.min_time, args.repeat)
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.threshold)
+        if regressions:
+            print(f"Slower than baseline by more than x{args.threshold}: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
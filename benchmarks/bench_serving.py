@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Compare throughput of the development server (app.run) and production mode
+
+Starts `run.py --dev` and `run.py --prod` in turn on a local port and drives
+GET /health and POST /sms/validate from concurrent keep-alive clients.
+
+Usage:
+    python benchmarks/bench_serving.py --duration 10 --clients 32
+    python benchmarks/bench_serving.py --modes production --workers 4 --threads 8
+"""
+
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    'health': ('GET', '/health', None),
+    'validate': ('POST', '/sms/validate', json.dumps({
+        'phone_numbers': ['0712345678', '+254712345678', '712345678', 'invalid']
+    }))
+}
+
+def wait_until_ready(port: int, timeout: float = 15.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+def drive(port: int, scenario: str, clients: int, duration: float) -> dict:
+    method, path, body = SCENARIOS[scenario]
+    headers = {'Content-Type': 'application/json'} if body else {}
+    latencies = [[] for _ in range(clients)]
+    errors = [0] * clients
+    stop_at = time.perf_counter() + duration
+
+    def client(index):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    errors[index] += 1
+                if response.getheader('Connection', '').lower() == 'close':
+                    conn.close()
+            except (OSError, http.client.HTTPException):
+                errors[index] += 1
+                conn.close()
+                continue
+            latencies[index].append(time.perf_counter() - start)
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    samples = sorted(l for per_client in latencies for l in per_client)
+    def percentile(p):
+        return round(samples[min(int(len(samples) * p), len(samples) - 1)] * 1000, 2) if samples else None
+    return {
+        'requests': len(samples),
+        'errors': sum(errors),
+        'rps': round(len(samples) / elapsed, 1),
+        'p50_ms': percentile(0.50),
+        'p99_ms': percentile(0.99)
+    }
+
+def bench_mode(mode: str, args) -> dict:
+    env = dict(os.environ,
+               PORT=str(args.port), HOST='127.0.0.1', LOG_LEVEL='WARNING', DEBUG='False',
+               WORKERS=str(args.workers), THREADS=str(args.threads),
+               DR_DB_PATH=os.path.join(ROOT, f'bench_{mode}.db'))
+    flag = '--prod' if mode == 'production' else '--dev'
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'run.py'), flag],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_ready(args.port)
+        return {scenario: drive(args.port, scenario, args.clients, args.duration)
+                for scenario in args.scenarios}
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        for suffix in ('', '-wal', '-shm'):
+            path = env['DR_DB_PATH'] + suffix
+            if os.path.exists(path):
+                os.remove(path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', default=['development', 'production'])
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--workers', type=int, default=0, help='0 = 2 x CPU cores + 1')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = {'cpu_count': os.cpu_count(), 'clients': args.clients, 'duration': args.duration}
+    for mode in args.modes:
+        results[mode] = bench_mode(mode, args)
+        for scenario, stats in results[mode].items():
+            print(f"{mode:12} {scenario:10} {stats['rps']:>9} req/s  "
+                  f"p50 {stats['p50_ms']} ms  p99 {stats['p99_ms']} ms  errors {stats['errors']}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Import-time and first-request latency report with a regression budget
+
+Each run starts a fresh interpreter, times `import main`, then times the
+first request to a few endpoints through the Flask test client. These first
+requests are the ones that pay for lazily built services:
+
+- GET /health         Flask's own first-request setup
+- POST /sms/validate  builds SMSLeopardService (imports requests)
+- POST /dr            builds the delivery report store and ingestion worker
+
+The script exits with status 1 if the median of any measurement exceeds its
+budget, so it can gate CI.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 10 --budget-import-ms 250 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, sys, time
+start = time.perf_counter()
+import main
+timings = {'import_ms': (time.perf_counter() - start) * 1000}
+heavy = sorted(m for m in ('requests', 'httpx', 'sqlite3') if m in sys.modules)
+client = main.app.test_client()
+requests_to_time = [
+    ('first_health_ms', 'get', '/health', None),
+    ('first_validate_ms', 'post', '/sms/validate', {'phone_numbers': ['0712345678']}),
+    ('first_dr_ms', 'post', '/dr', {'message_id': 'startup', 'status': 'delivered'}),
+    ('second_validate_ms', 'post', '/sms/validate', {'phone_numbers': ['0712345678']})
+]
+for name, method, path, body in requests_to_time:
+    start = time.perf_counter()
+    response = getattr(client, method)(path, json=body)
+    timings[name] = (time.perf_counter() - start) * 1000
+    assert response.status_code < 500, (path, response.status_code)
+timings['heavy_modules_at_import'] = heavy
+print(json.dumps(timings))
+'''
+
+def run_probe(db_path: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=os.path.join(ROOT, 'src'), LOG_LEVEL='WARNING', DR_DB_PATH=db_path)
+    output = subprocess.run([sys.executable, '-c', PROBE], env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-import-ms', type=float, default=400.0)
+    parser.add_argument('--budget-first-request-ms', type=float, default=250.0)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.runs):
+            runs.append(run_probe(os.path.join(tmp, f'startup_{i}.db')))
+
+    metrics = [key for key in runs[0] if key.endswith('_ms')]
+    report = {key: round(statistics.median(run[key] for run in runs), 2) for key in metrics}
+    report['heavy_modules_at_import'] = runs[0]['heavy_modules_at_import']
+
+    budgets = {'import_ms': args.budget_import_ms}
+    budgets.update({key: args.budget_first_request_ms for key in metrics if key.startswith('first_')})
+    failures = [key for key, budget in budgets.items() if report[key] > budget]
+    if report['heavy_modules_at_import']:
+        failures.append('heavy_modules_at_import')
+
+    for key in metrics:
+        budget = budgets.get(key)
+        limit = f"(budget {budget:.0f} ms)" if budget else ''
+        print(f"{key:22} {report[key]:9.2f} ms  {limit}")
+    print(f"heavy modules loaded by import: {report['heavy_modules_at_import'] or 'none'}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'runs': args.runs, 'median': report, 'budgets': budgets, 'failures': failures}, f, indent=2)
+    if failures:
+        print(f"Over budget: {', '.join(failures)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark the memory-mapped sensor time-series store
+
+Appends one day of readings from 1000 devices in batches, then times:
+
+- append: storing the readings (per second of readings written)
+- summary: daily_summary(), i.e. reading count, distinct devices and
+  min/max/mean per metric plus alert counts for the whole day
+- range: summary() of a one-hour range, which filters rows by time
+- device: daily_summary() of one device
+
+Usage:
+    python benchmarks/bench_timeseries.py
+    python benchmarks/bench_timeseries.py --sizes 1000000 5000000 --output timeseries.json
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import timeit
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from iot import timeseries
+from iot.timeseries import TimeSeriesStore
+
+BATCH = 50000
+
+def fill(store: TimeSeriesStore, count: int, devices: int = 1000, seed: int = 42) -> float:
+    """Append count readings spread over today; returns seconds spent appending"""
+    rng = random.Random(seed)
+    day_start = datetime.combine(date.today(), datetime.min.time()).timestamp()
+    ids = [f"node-{i:05d}" for i in range(devices)]
+    elapsed = 0.0
+    for offset in range(0, count, BATCH):
+        n = min(BATCH, count - offset)
+        device_ids = [ids[rng.randrange(devices)] for _ in range(n)]
+        times = [day_start + (offset + i) * 86399.0 / count for i in range(n)]
+        columns = {'temperature': [rng.gauss(25, 4.5) for _ in range(n)],
+                   'humidity': [rng.gauss(55, 11) for _ in range(n)]}
+        start = timeit.default_timer()
+        store.append(device_ids, columns, times)
+        store.append_alerts([(device_ids[0], 'temperature_high')], times[-1])
+        elapsed += timeit.default_timer() - start
+    return elapsed
+
+def best_of(func, repeat: int) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+def bench_size(count: int, repeat: int) -> dict:
+    path = tempfile.mkdtemp(prefix='bench_series_')
+    try:
+        store = TimeSeriesStore(path)
+        append = fill(store, count)
+        day_start = datetime.combine(date.today(), datetime.min.time()).timestamp()
+        results = {
+            'append_rows_per_s': count / append,
+            'summary': best_of(lambda: store.daily_summary(), repeat),
+            'range': best_of(lambda: store.summary(day_start + 12 * 3600, day_start + 13 * 3600), repeat),
+            'device': best_of(lambda: store.daily_summary(device_id='node-00007'), repeat),
+            'bytes': sum(os.path.getsize(os.path.join(root, name))
+                         for root, _, names in os.walk(path) for name in names)
+        }
+        assert store.daily_summary()['readings'] == count
+        store.close()
+        return results
+    finally:
+        shutil.rmtree(path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', type=int, default=[100000, 1000000, 5000000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    print(f"Time-series backend: {timeseries.BACKEND}")
+    results = {'backend': timeseries.BACKEND, 'sizes': {}}
+    for count in args.sizes:
+        timings = results['sizes'][count] = bench_size(count, args.repeat)
+        print(f"{count:>8} readings  append {timings['append_rows_per_s'] / 1e6:5.2f} M/s"
+              f"  summary {timings['summary'] * 1000:8.2f} ms"
+              f"  1h range {timings['range'] * 1000:8.2f} ms"
+              f"  device {timings['device'] * 1000:8.2f} ms"
+              f"  {timings['bytes'] / 1e6:7.1f} MB on disk")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+In-process stand-in for the SMSLeopard API
+
+FakeProvider patches `requests.post` and `requests.get`, so SMSLeopardService
+and the Flask routes run their real code paths (payload building, JSON
+encoding, response decoding) without touching the network. Request bodies are
+decoded and responses are built the way the real API shapes them, so the cost
+of large payloads is still paid.
+
+Usage:
+    with FakeProvider() as provider:
+        client.post('/sms/send', json={...})
+    print(provider.calls)
+"""
+
+import itertools
+import json
+from typing import Dict, List, Optional
+from unittest import mock
+
+import requests
+
+COST_PER_SMS = 0.8
+
+def build_send_response(destinations: List[Dict], ids=None) -> Dict:
+    """
+    Build a /sms/send response body in SMSLeopard's shape
+
+    Args:
+        destinations: The 'destination' list of the request payload
+        ids: Iterator of message IDs (defaults to a fresh counter)
+
+    Returns:
+        Response dictionary with one recipient entry per destination
+    """
+    ids = ids if ids is not None else itertools.count(1)
+    return {
+        'success': True,
+        'message': 'Message queued',
+        'recipients': [
+            {'id': f"msg-{next(ids)}", 'number': destination.get('number'), 'status': 'queued', 'cost': COST_PER_SMS}
+            for destination in destinations
+        ]
+    }
+
+class FakeResponse:
+    """Subset of requests.Response used by SMSLeopardService"""
+
+    def __init__(self, status_code: int, body: Dict):
+        self.status_code = status_code
+        self.headers = {'Content-Type': 'application/json'}
+        self._body = body
+
+    def json(self) -> Dict:
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error", response=self)
+
+class FakeProvider:
+    """Patch requests so SMSLeopard calls are answered in-process"""
+
+    def __init__(self, balance: float = 1000.0):
+        self.balance = balance
+        self.calls = 0
+        self._ids = itertools.count(1)
+        self._patches: List = []
+
+    def post(self, url: str, data: Optional[bytes] = None, **kwargs) -> FakeResponse:
+        self.calls += 1
+        payload = json.loads(data) if data is not None else (kwargs.get('json') or {})
+        if not url.endswith('/sms/send'):
+            return FakeResponse(404, {'success': False, 'message': 'Not found'})
+        return FakeResponse(200, build_send_response(payload.get('destination', []), self._ids))
+
+    def get(self, url: str, **kwargs) -> FakeResponse:
+        self.calls += 1
+        if url.endswith('/balance'):
+            return FakeResponse(200, {'success': True, 'balance': self.balance, 'currency': 'KES'})
+        if '/status/' in url:
+            message_id = url.rsplit('/', 1)[-1]
+            return FakeResponse(200, {'success': True, 'message_id': message_id, 'recipients': [
+                {'id': message_id, 'status': 'delivered'}
+            ]})
+        return FakeResponse(404, {'success': False, 'message': 'Not found'})
+
+    def __enter__(self):
+        self._patches = [mock.patch.object(requests, 'post', self.post),
+                         mock.patch.object(requests, 'get', self.get)]
+        for patch in self._patches:
+            patch.start()
+        return self
+
+    def __exit__(self, *exc):
+        for patch in reversed(self._patches):
+            patch.stop()
+        self._patches = []
+        return False
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Local SMSLeopard stand-in with latency and failure injection
+
+Implements the endpoints SMSLeopardService calls, under any path prefix
+(so API_URL=http://127.0.0.1:9090/v1 works):
+
+- POST /sms/send      {success, recipients: [{id, number, status, cost}]}
+- GET  /status/<id>   latest status of a message sent through this server
+- GET  /balance       starting balance minus the cost of messages sent
+
+Each request waits for a latency drawn from --latency, then fails with a 500
+(--error-rate) or a 429 with Retry-After (--rate-limit-rate), or succeeds.
+With --dr-url, every accepted recipient gets a delivery report POSTed to that
+URL after a delay drawn from --dr-delay, delivered with probability
+--delivered-ratio and failed otherwise.
+
+Latency distributions are given in milliseconds:
+    fixed:50  uniform:20:80  normal:50:10  lognormal:40:0.5 (median, sigma)  exp:50 (mean)
+
+Usage:
+    python benchmarks/fake_smsleopard_server.py --port 9090 --latency lognormal:80:0.4 \\
+        --error-rate 0.01 --rate-limit-rate 0.02 --dr-url http://127.0.0.1:5000/dr
+    API_URL=http://127.0.0.1:9090/v1 API_key=test API_secret=test python run.py
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_provider import COST_PER_SMS, build_send_response
+
+MAX_TRACKED_MESSAGES = 1000000
+
+def parse_distribution(spec: str) -> Callable[[], float]:
+    """
+    Parse a latency distribution spec into a sampler
+
+    Args:
+        spec: e.g. 'fixed:50', 'uniform:20:80', 'normal:50:10', 'lognormal:40:0.5', 'exp:50'
+
+    Returns:
+        Function returning a delay in seconds (never negative)
+    """
+    kind, _, rest = spec.partition(':')
+    params = [float(p) for p in rest.split(':')] if rest else []
+    if kind == 'fixed' and len(params) == 1:
+        sample = lambda: params[0]
+    elif kind == 'uniform' and len(params) == 2:
+        sample = lambda: random.uniform(params[0], params[1])
+    elif kind == 'normal' and len(params) == 2:
+        sample = lambda: random.gauss(params[0], params[1])
+    elif kind == 'lognormal' and len(params) == 2:
+        import math
+        mu = math.log(params[0]) if params[0] > 0 else 0.0
+        sample = lambda: random.lognormvariate(mu, params[1])
+    elif kind == 'exp' and len(params) == 1:
+        sample = lambda: random.expovariate(1.0 / params[0]) if params[0] > 0 else 0.0
+    else:
+        raise ValueError(f"Invalid distribution: {spec!r}")
+    return lambda: max(0.0, sample()) / 1000.0
+
+class DeliveryReportSender:
+    """Posts delivery reports to a webhook URL when they fall due"""
+
+    def __init__(self, url: str, delay: Callable[[], float], delivered_ratio: float,
+                 workers: int = 4, timeout: float = 5.0):
+        self.url = url
+        self.delay = delay
+        self.delivered_ratio = delivered_ratio
+        self.timeout = timeout
+        self.stats = {'scheduled': 0, 'sent': 0, 'failed': 0}
+        self._heap = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        for i in range(max(1, workers)):
+            threading.Thread(target=self._run, name=f'dr-callbacks-{i}', daemon=True).start()
+
+    def schedule(self, message_id: str, number: str, on_status: Callable[[str, str], None]):
+        status = 'delivered' if random.random() < self.delivered_ratio else 'failed'
+        due = time.time() + self.delay()
+        with self._cond:
+            heapq.heappush(self._heap, (due, next(self._sequence), message_id, number, status, on_status))
+            self.stats['scheduled'] += 1
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.time():
+                    self._cond.wait(None if not self._heap else self._heap[0][0] - time.time())
+                _, _, message_id, number, status, on_status = heapq.heappop(self._heap)
+            on_status(message_id, status)
+            body = json.dumps({'message_id': message_id, 'status': status, 'to': number,
+                               'timestamp': int(time.time())}).encode()
+            request = urllib.request.Request(self.url, data=body, method='POST',
+                                             headers={'Content-Type': 'application/json'})
+            try:
+                urllib.request.urlopen(request, timeout=self.timeout).read()
+                outcome = 'sent'
+            except (urllib.error.URLError, OSError):
+                outcome = 'failed'
+            with self._cond:
+                self.stats[outcome] += 1
+
+class FakeSMSLeopard:
+    """State and failure injection shared by all request handler threads"""
+
+    def __init__(self, latency: Callable[[], float], error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 balance: float = 1000000.0, dr_sender: Optional[DeliveryReportSender] = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.balance = balance
+        self.dr_sender = dr_sender
+        self.messages: "OrderedDict[str, dict]" = OrderedDict()
+        self.ids = itertools.count(1)
+        self.stats = {'requests': 0, 'errors': 0, 'rate_limited': 0, 'messages': 0}
+        self.lock = threading.Lock()
+
+    def inject(self) -> Optional[int]:
+        """Sleep for a sampled latency and pick a failure status, if any"""
+        time.sleep(self.latency())
+        roll = random.random()
+        with self.lock:
+            self.stats['requests'] += 1
+            if roll < self.error_rate:
+                self.stats['errors'] += 1
+                return 500
+            if roll < self.error_rate + self.rate_limit_rate:
+                self.stats['rate_limited'] += 1
+                return 429
+        return None
+
+    def send(self, payload: dict) -> dict:
+        destinations = payload.get('destination') or []
+        with self.lock:
+            response = build_send_response(destinations, self.ids)
+            for recipient in response['recipients']:
+                self.messages[recipient['id']] = {'number': recipient['number'], 'status': 'queued'}
+            while len(self.messages) > MAX_TRACKED_MESSAGES:
+                self.messages.popitem(last=False)
+            self.balance -= COST_PER_SMS * len(destinations)
+            self.stats['messages'] += len(destinations)
+        if self.dr_sender is not None:
+            for recipient in response['recipients']:
+                self.dr_sender.schedule(recipient['id'], recipient['number'], self.set_status)
+        return response
+
+    def set_status(self, message_id: str, status: str):
+        with self.lock:
+            if message_id in self.messages:
+                self.messages[message_id]['status'] = status
+
+    def status(self, message_id: str) -> Optional[dict]:
+        with self.lock:
+            message = self.messages.get(message_id)
+            if message is None:
+                return None
+            return {'success': True, 'message_id': message_id,
+                    'recipients': [{'id': message_id, 'number': message['number'], 'status': message['status']}]}
+
+def make_handler(provider: FakeSMSLeopard):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status: int, body: dict, headers: Optional[dict] = None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _fail(self, status: int):
+            if status == 429:
+                self._reply(429, {'success': False, 'message': 'Too many requests'}, {'Retry-After': '1'})
+            else:
+                self._reply(status, {'success': False, 'message': 'Internal server error'})
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            if not self.path.rstrip('/').endswith('/sms/send'):
+                self._reply(404, {'success': False, 'message': 'Not found'})
+                return
+            failure = provider.inject()
+            if failure:
+                self._fail(failure)
+                return
+            try:
+                payload = json.loads(body or b'{}')
+            except ValueError:
+                self._reply(400, {'success': False, 'message': 'Invalid JSON'})
+                return
+            if not payload.get('destination') or not payload.get('message'):
+                self._reply(400, {'success': False, 'message': 'destination and message are required'})
+                return
+            self._reply(200, provider.send(payload))
+
+        def do_GET(self):
+            path = self.path.split('?', 1)[0].rstrip('/')
+            if '/status/' in path:
+                failure = provider.inject()
+                if failure:
+                    self._fail(failure)
+                    return
+                result = provider.status(path.rsplit('/', 1)[-1])
+                if result is None:
+                    self._reply(404, {'success': False, 'message': 'Message not found'})
+                else:
+                    self._reply(200, result)
+            elif path.endswith('/balance'):
+                failure = provider.inject()
+                if failure:
+                    self._fail(failure)
+                    return
+                self._reply(200, {'success': True, 'balance': round(provider.balance, 2), 'currency': 'KES'})
+            elif path.endswith('/_stats'):
+                stats = dict(provider.stats)
+                if provider.dr_sender is not None:
+                    stats['delivery_reports'] = dict(provider.dr_sender.stats)
+                self._reply(200, stats)
+            else:
+                self._reply(404, {'success': False, 'message': 'Not found'})
+
+    return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9090)
+    parser.add_argument('--latency', default='fixed:0', help='Response latency distribution (ms)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction answered with 429')
+    parser.add_argument('--balance', type=float, default=1000000.0)
+    parser.add_argument('--dr-url', help='Webhook for delivery reports, e.g. http://127.0.0.1:5000/dr')
+    parser.add_argument('--dr-delay', default='lognormal:2000:0.6', help='Send-to-report delay distribution (ms)')
+    parser.add_argument('--delivered-ratio', type=float, default=0.95)
+    parser.add_argument('--dr-workers', type=int, default=4, help='Threads posting delivery reports')
+    parser.add_argument('--seed', type=int, help='Seed the random generator for repeatable runs')
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    dr_sender = None
+    if args.dr_url:
+        dr_sender = DeliveryReportSender(args.dr_url, parse_distribution(args.dr_delay), args.delivered_ratio,
+                                         args.dr_workers)
+    provider = FakeSMSLeopard(parse_distribution(args.latency), args.error_rate, args.rate_limit_rate,
+                              args.balance, dr_sender)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(provider))
+    server.daemon_threads = True
+    print(f"Fake SMSLeopard listening on http://{args.host}:{args.port} (GET /_stats for counters)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
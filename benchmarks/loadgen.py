@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Open-loop load generator that replays requests.http and JSONL scenarios
+
+Requests are scheduled at a fixed target rate (or with Poisson arrivals)
+regardless of how fast the service answers, and are executed by a pool of
+--concurrency keep-alive connections. Each request gets two latencies:
+
+- service time: from when the request was actually sent to the response
+- corrected:    from when it was scheduled to be sent to the response
+
+When the service stalls, requests queue behind the pool. Closed-loop tools
+stop sending during the stall and so never see that wait (coordinated
+omission). The corrected latency includes it, so its percentiles show what
+clients arriving at the target rate would have experienced.
+
+Scenario sources:
+- .http files (VS Code REST Client / IntelliJ format, as in requests.http):
+  `### name` separates requests and `@var = value` defines {{var}}
+- .jsonl files: one {"name", "method", "url", "headers", "body", "weight"} per
+  line, where body may be a string or a JSON value
+
+Usage:
+    python benchmarks/loadgen.py requests.http --rps 200 --duration 30 --concurrency 32
+    python benchmarks/loadgen.py benchmarks/scenarios.jsonl --base-url http://127.0.0.1:5000 \\
+        --rps 500 --arrival poisson --output load.json
+    python benchmarks/loadgen.py requests.http --only "Health Check" "Validate Phone Numbers" --list
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import math
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS')
+
+def _substitute(text: str, variables: Dict[str, str]) -> str:
+    return re.sub(r'\{\{\s*(\w+)\s*\}\}', lambda m: variables.get(m.group(1), m.group(0)), text)
+
+def parse_http_file(path: str) -> List[Dict]:
+    """
+    Parse a REST Client .http file into scenarios
+
+    Args:
+        path: Path to the .http file
+
+    Returns:
+        List of scenario dictionaries (name, method, url, headers, body, weight)
+    """
+    with open(path) as f:
+        lines = f.read().splitlines()
+    variables = {}
+    blocks = []
+    current = {'name': None, 'lines': []}
+    for line in lines:
+        if line.startswith('###'):
+            blocks.append(current)
+            current = {'name': line.lstrip('#').strip(), 'lines': []}
+            continue
+        match = re.match(r'^@(\w+)\s*=\s*(.*?);?\s*$', line)
+        if match:
+            variables[match.group(1)] = match.group(2)
+            continue
+        current['lines'].append(line)
+    blocks.append(current)
+
+    scenarios = []
+    for block in blocks:
+        body_lines = [l for l in block['lines'] if not l.lstrip().startswith(('#', '//'))]
+        while body_lines and not body_lines[0].strip():
+            body_lines.pop(0)
+        if not body_lines:
+            continue
+        parts = body_lines[0].split()
+        if len(parts) < 2 or parts[0].upper() not in METHODS:
+            continue
+        headers = {}
+        index = 1
+        while index < len(body_lines) and body_lines[index].strip():
+            name, _, value = body_lines[index].partition(':')
+            headers[name.strip()] = _substitute(value.strip(), variables)
+            index += 1
+        body = '\n'.join(body_lines[index + 1:]).strip()
+        scenarios.append({
+            'name': block['name'] or f"{parts[0]} {parts[1]}",
+            'method': parts[0].upper(),
+            'url': _substitute(parts[1], variables),
+            'headers': headers,
+            'body': _substitute(body, variables) if body else None,
+            'weight': 1.0
+        })
+    return scenarios
+
+def parse_jsonl_file(path: str) -> List[Dict]:
+    """
+    Parse a JSONL scenario file
+
+    Args:
+        path: Path to the .jsonl file
+
+    Returns:
+        List of scenario dictionaries
+    """
+    scenarios = []
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if 'method' not in item or 'url' not in item:
+                raise ValueError(f"{path}:{number}: scenario needs method and url")
+            body = item.get('body')
+            headers = dict(item.get('headers') or {})
+            if body is not None and not isinstance(body, str):
+                body = json.dumps(body)
+                headers.setdefault('Content-Type', 'application/json')
+            scenarios.append({
+                'name': item.get('name') or f"{item['method'].upper()} {item['url']}",
+                'method': item['method'].upper(),
+                'url': item['url'],
+                'headers': headers,
+                'body': body,
+                'weight': float(item.get('weight', 1.0))
+            })
+    return scenarios
+
+def load_scenarios(paths: List[str], base_url: Optional[str] = None, only: Optional[List[str]] = None) -> List[Dict]:
+    """Load scenarios from files, optionally filtering by name and rebasing URLs"""
+    scenarios = []
+    for path in paths:
+        scenarios.extend(parse_jsonl_file(path) if path.endswith('.jsonl') else parse_http_file(path))
+    if only:
+        scenarios = [s for s in scenarios if s['name'] in only]
+    for scenario in scenarios:
+        parts = urlsplit(scenario['url'])
+        if base_url:
+            parts = urlsplit(base_url.rstrip('/') + (parts.path or '/') + (f"?{parts.query}" if parts.query else ''))
+        scenario['scheme'] = parts.scheme or 'http'
+        scenario['host'] = parts.hostname or 'localhost'
+        scenario['port'] = parts.port or (443 if parts.scheme == 'https' else 80)
+        scenario['path'] = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        scenario['payload'] = scenario['body'].encode() if scenario['body'] else None
+    return scenarios
+
+class LatencyRecorder:
+    """Per-scenario latency samples and error counts"""
+
+    def __init__(self):
+        self.service: List[float] = []
+        self.corrected: List[float] = []
+        self.statuses: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.lock = threading.Lock()
+
+    def record(self, service: float, corrected: float, status: Optional[int], error: Optional[str]):
+        with self.lock:
+            self.service.append(service)
+            self.corrected.append(corrected)
+            if error:
+                self.errors[error] += 1
+            else:
+                self.statuses[status] += 1
+                if status >= 400:
+                    self.errors[f"HTTP {status}"] += 1
+
+def _percentiles(samples: List[float]) -> Dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    def at(p):
+        return round(ordered[min(len(ordered) - 1, max(0, math.ceil(len(ordered) * p) - 1))] * 1000, 3)
+    return {'p50_ms': at(0.50), 'p90_ms': at(0.90), 'p95_ms': at(0.95), 'p99_ms': at(0.99),
+            'p999_ms': at(0.999), 'max_ms': round(ordered[-1] * 1000, 3),
+            'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3)}
+
+def _histogram(samples: List[float]) -> List[Dict]:
+    counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    for sample in samples:
+        ms = sample * 1000
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if ms <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    cumulative = 0
+    histogram = []
+    for bound, count in zip(list(LATENCY_BUCKETS_MS) + ['+Inf'], counts):
+        cumulative += count
+        histogram.append({'le_ms': bound, 'count': cumulative})
+    return histogram
+
+def run_load(scenarios: List[Dict], rps: float, duration: float, concurrency: int,
+             arrival: str = 'constant', timeout: float = 30.0, warmup: float = 0.0) -> Dict:
+    """
+    Drive the scenarios open-loop at the target rate
+
+    Args:
+        scenarios: Scenarios from load_scenarios()
+        rps: Target requests per second across all scenarios
+        duration: Seconds of measured load
+        concurrency: Number of worker connections
+        arrival: 'constant' spacing or 'poisson' arrivals
+        timeout: Socket timeout per request
+        warmup: Seconds of load sent before measuring starts
+
+    Returns:
+        Report dictionary
+    """
+    weights = [s['weight'] for s in scenarios]
+    recorders = {s['name']: LatencyRecorder() for s in scenarios}
+    work: "queue.Queue" = queue.Queue()
+    stop = object()
+    measure_from = time.perf_counter() + warmup
+
+    def worker():
+        connections = {}
+        while True:
+            item = work.get()
+            if item is stop:
+                break
+            intended, scenario = item
+            key = (scenario['scheme'], scenario['host'], scenario['port'])
+            conn = connections.get(key)
+            if conn is None:
+                cls = http.client.HTTPSConnection if scenario['scheme'] == 'https' else http.client.HTTPConnection
+                conn = connections[key] = cls(scenario['host'], scenario['port'], timeout=timeout)
+            sent = time.perf_counter()
+            status, error = None, None
+            try:
+                conn.request(scenario['method'], scenario['path'], body=scenario['payload'],
+                             headers=scenario['headers'])
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+                if response.getheader('Connection', '').lower() == 'close':
+                    conn.close()
+            except (OSError, http.client.HTTPException) as e:
+                error = 'timeout' if isinstance(e, TimeoutError) else type(e).__name__
+                conn.close()
+                connections.pop(key, None)
+            done = time.perf_counter()
+            if intended >= measure_from:
+                recorders[scenario['name']].record(done - sent, done - intended, status, error)
+        for conn in connections.values():
+            conn.close()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+
+    interval = 1.0 / rps
+    start = time.perf_counter()
+    end = measure_from + duration
+    intended = start
+    scheduled = 0
+    max_lag = 0.0
+    while intended < end:
+        now = time.perf_counter()
+        if intended > now:
+            time.sleep(intended - now)
+        else:
+            max_lag = max(max_lag, now - intended)
+        work.put((intended, random.choices(scenarios, weights)[0]))
+        scheduled += 1
+        intended += random.expovariate(rps) if arrival == 'poisson' else interval
+    send_elapsed = time.perf_counter() - measure_from
+    for _ in threads:
+        work.put(stop)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - measure_from
+
+    service_all = list(itertools.chain.from_iterable(r.service for r in recorders.values()))
+    corrected_all = list(itertools.chain.from_iterable(r.corrected for r in recorders.values()))
+    errors = sum((r.errors for r in recorders.values()), Counter())
+    statuses = sum((r.statuses for r in recorders.values()), Counter())
+    completed = len(service_all)
+    return {
+        'target_rps': rps,
+        'arrival': arrival,
+        'concurrency': concurrency,
+        'duration_s': duration,
+        'completed': completed,
+        'achieved_rps': round(completed / elapsed, 1) if elapsed > 0 else 0.0,
+        'drain_s': round(max(0.0, elapsed - send_elapsed), 3),
+        'scheduler_max_lag_ms': round(max_lag * 1000, 3),
+        'statuses': {str(k): v for k, v in sorted(statuses.items())},
+        'errors': dict(errors.most_common()),
+        'error_rate': round(sum(errors.values()) / completed, 4) if completed else 0.0,
+        'latency': {'service': _percentiles(service_all), 'corrected': _percentiles(corrected_all)},
+        'histogram': {'service': _histogram(service_all), 'corrected': _histogram(corrected_all)},
+        'scenarios': {
+            name: {
+                'completed': len(r.service),
+                'errors': dict(r.errors.most_common()),
+                'service': _percentiles(r.service),
+                'corrected': _percentiles(r.corrected)
+            }
+            for name, r in recorders.items() if r.service
+        }
+    }
+
+def print_report(report: Dict):
+    print(f"target {report['target_rps']} req/s ({report['arrival']}), achieved {report['achieved_rps']} req/s, "
+          f"{report['completed']} requests, concurrency {report['concurrency']}")
+    print(f"error rate {report['error_rate']:.2%}  errors {report['errors'] or 'none'}  statuses {report['statuses']}")
+    if report['drain_s'] > 1:
+        print(f"queue took {report['drain_s']} s to drain after the last send: the service is below the target rate")
+    header = f"{'':10} {'p50':>9} {'p95':>9} {'p99':>9} {'p99.9':>9} {'max':>9}  (ms)"
+    print(header)
+    for kind in ('service', 'corrected'):
+        l = report['latency'][kind]
+        if l:
+            print(f"{kind:10} {l['p50_ms']:9.2f} {l['p95_ms']:9.2f} {l['p99_ms']:9.2f} {l['p999_ms']:9.2f} {l['max_ms']:9.2f}")
+    print("corrected latency histogram:")
+    total = report['completed'] or 1
+    previous = 0
+    for bucket in report['histogram']['corrected']:
+        count = bucket['count'] - previous
+        previous = bucket['count']
+        if count:
+            bar = '#' * max(1, round(40 * count / total))
+            print(f"  <= {str(bucket['le_ms']):>6} ms {count:>8}  {bar}")
+    for name, stats in report['scenarios'].items():
+        print(f"  {name[:40]:40} n={stats['completed']:<7} p99 {stats['corrected']['p99_ms']:9.2f} ms  "
+              f"errors {stats['errors'] or 'none'}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='+', help='.http or .jsonl scenario files')
+    parser.add_argument('--base-url', help='Replace scheme, host and port of every scenario URL')
+    parser.add_argument('--only', nargs='+', help='Scenario names to include')
+    parser.add_argument('--rps', type=float, default=50.0, help='Target request rate')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of measured load')
+    parser.add_argument('--warmup', type=float, default=0.0, help='Seconds of unmeasured load first')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--arrival', choices=['constant', 'poisson'], default='constant')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--list', action='store_true', help='List parsed scenarios and exit')
+    parser.add_argument('--output', help='Write the report as JSON to this file')
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    scenarios = load_scenarios(args.files, args.base_url, args.only)
+    if not scenarios:
+        sys.exit('No scenarios found')
+    if args.list:
+        for s in scenarios:
+            print(f"{s['name'][:40]:40} {s['method']:6} {s['scheme']}://{s['host']}:{s['port']}{s['path']}")
+        return
+
+    report = run_load(scenarios, args.rps, args.duration, args.concurrency, args.arrival, args.timeout, args.warmup)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
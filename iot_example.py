@@ -4,138 +4,378 @@ IoT Integration Example for FruitGuard SMS Service
 This example shows how to integrate the SMS service with IoT devices
 """
 
-import requests
+import contextlib
+import os
+import sys
 import json
+import tempfile
 import time
-from datetime import datetime
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from iot.batch import METRIC_UNITS, alert_text, format_event
+from iot.coalescer import AlertCoalescer, format_alert
+from iot.debounce import AlertDebouncer
+from iot.registry import DEFAULT_GROUP, DeviceRegistry
+from iot.rolling import RollingStats
+from iot.rules import DEFAULT_RULES, compile_rules, load_rules
+from iot.timeseries import TimeSeriesStore, is_metric_name
+from iot.transport import make_transport
+from iot.sender import BackgroundAlertSender
 
 class FruitGuardIoT:
     """IoT integration class for FruitGuard SMS alerts"""
     
-    def __init__(self, sms_api_url="http://localhost:5000"):
+    def __init__(self, sms_api_url="http://localhost:5000", coalesce_window=30.0, max_delay=None,
+                 data_dir=None, queue_path=None, queue_size=10000,
+                 debounce=True, hysteresis=None, min_interval=300.0, latch_ttl=None,
+                 adaptive=None, adaptive_window=60, rules=None, rules_check_interval=5.0,
+                 series_path=None, series_retention_days=30, transport="http"):
+        """
+        Args:
+            sms_api_url: Base URL of the FruitGuard SMS service
+            coalesce_window: Seconds to collect alerts per recipient before sending
+                one combined SMS; 0 or None sends every alert immediately
+            max_delay: Per-priority maximum hold time in seconds, e.g. {'medium': 5}
+            data_dir: Directory for the outgoing alert queue (alerts.db) and the
+                reading history (series/) when queue_path/series_path are not
+                given; created if missing. Without it nothing is written to disk
+            queue_path: SQLite file for the outgoing alert queue, so alerts survive
+                a gateway reboot; with neither this nor data_dir alerts are posted
+                from the calling thread
+            queue_size: Most alerts held in the outgoing queue
+            debounce: Suppress repeated alerts (hysteresis, re-alert interval and
+                latch expiry); False alerts on every reading as before
+            hysteresis: Band per metric before a threshold alert clears,
+                e.g. {'temperature': 1.0, 'humidity': 3.0}
+            min_interval: Seconds before the same alert is sent again for a device
+            latch_ttl: Seconds motion/intrusion alerts stay latched,
+                e.g. {'motion': 1800, 'intrusion': 3600}
+            adaptive: Rolling-statistics rules per metric, alerting on readings far
+                from the device's recent mean or changing too fast, e.g.
+                {'temperature': {'z': 3.0, 'max_rate': 0.5}} (rate in units per minute)
+            adaptive_window: Readings kept per device and metric for adaptive rules
+            rules: Alert rules (see src/iot/rules.py) as a list of rule dictionaries
+                or the path of a JSON rules file; defaults to the built-in
+                temperature, humidity, motion and intrusion checks
+            rules_check_interval: Seconds between checks of a rules file for
+                changes; an edited file is reloaded without a restart
+            series_path: Directory of the reading/alert history used by the daily
+                report; with neither this nor data_dir no history is kept
+            series_retention_days: Days of history kept
+            transport: How alerts reach the SMS service: "http" posts to
+                sms_api_url over pooled keep-alive connections, "inprocess" calls
+                the service directly when the gateway runs inside the SMS app's
+                process; or any object with send(phone_numbers, message) -> bool
+                and close() (see src/iot/transport.py)
+        """
         self.sms_api_url = sms_api_url
+        self.transport = make_transport(transport, base_url=sms_api_url)
         self.alert_recipients = []
         self.alert_thresholds = {
             'temperature': {'min': 15, 'max': 35},
-            'humidity': {'min': 30, 'max': 80},
-            'motion_detected': False,
-            'intrusion_detected': False
+            'humidity': {'min': 30, 'max': 80}
         }
+        # Names of latched rules (motion, intrusion) that have fired for the global readings
+        self.latched = set()
+        self._rules_path = None
+        self._rules_mtime = None
+        self._rules_check_interval = rules_check_interval
+        self._rules_checked = 0.0
+        self.load_rules(DEFAULT_RULES if rules is None else rules)
+        if data_dir:
+            os.makedirs(data_dir, exist_ok=True)
+            queue_path = queue_path or os.path.join(data_dir, 'alerts.db')
+            series_path = series_path or os.path.join(data_dir, 'series')
+        self.series = TimeSeriesStore(series_path) if series_path else None
+        self.series_retention_days = series_retention_days
+        # Per-device thresholds, latches and recipient groups; devices added
+        # without their own settings use alert_thresholds and alert_recipients
+        self.devices = DeviceRegistry(default_thresholds=self.alert_thresholds)
+        self.devices.set_group(DEFAULT_GROUP, self.alert_recipients)
+        # Latched rule name -> devices it has fired for; motion and intrusion
+        # use the registry's latch bits
+        self._device_latches = dict(self.devices.latched)
+        self.debouncer = None
+        if debounce:
+            self.debouncer = AlertDebouncer(hysteresis=hysteresis, min_interval=min_interval,
+                                            latch_ttl=latch_ttl)
+        self.rolling = RollingStats(adaptive, window=adaptive_window) if adaptive else None
+        self.sender = None
+        self._deliver = self.transport.send
+        if queue_path:
+            # Sensor processing only writes to the queue; a worker thread sends
+            self.sender = BackgroundAlertSender(self.transport.send, db_path=queue_path, maxsize=queue_size)
+            self._deliver = self.sender.submit
+        self.coalescer = None
+        if coalesce_window:
+            self.coalescer = AlertCoalescer(self._deliver, window=coalesce_window, max_delay=max_delay)
+            self.coalescer.start()
     
     def add_alert_recipient(self, phone_number):
         """Add a phone number to receive alerts"""
         self.alert_recipients.append(phone_number)
     
+    def set_recipient_group(self, group, phone_numbers):
+        """Create or replace a named group of alert recipients for devices"""
+        self.devices.set_group(group, list(phone_numbers))
+    
+    def add_device(self, device_id, thresholds=None, group=DEFAULT_GROUP):
+        """Register a device with its own thresholds and recipient group"""
+        self.devices.add(device_id, thresholds, group)
+    
     def set_alert_thresholds(self, **thresholds):
         """Set alert thresholds for different sensors"""
         self.alert_thresholds.update(thresholds)
+        # Rules refer to thresholds such as "temperature.min" by name
+        self.rules = compile_rules(self._rule_specs, self.alert_thresholds)
+    
+    def load_rules(self, rules):
+        """
+        Replace the alert rules without restarting
+        
+        Args:
+            rules: List of rule dictionaries, or the path of a JSON rules file
+                that is then watched for changes
+        
+        Raises:
+            ValueError: If a rule is invalid; the current rules stay in place
+        """
+        path = None
+        if isinstance(rules, (str, os.PathLike)):
+            path = os.fspath(rules)
+            mtime = os.stat(path).st_mtime_ns
+            rules = load_rules(path)
+        compiled = compile_rules(rules, self.alert_thresholds)
+        self._rule_specs = list(rules)
+        self.rules = compiled
+        self._rules_path = path
+        if path is not None:
+            self._rules_mtime = mtime
+    
+    def _reload_rules_if_changed(self):
+        """Reload the rules file when it has changed, at most every rules_check_interval"""
+        if self._rules_path is None:
+            return
+        now = time.monotonic()
+        if now - self._rules_checked < self._rules_check_interval:
+            return
+        self._rules_checked = now
+        try:
+            mtime = os.stat(self._rules_path).st_mtime_ns
+            if mtime == self._rules_mtime:
+                return
+            # Recorded first, so a broken file is reported once rather than on every check
+            self._rules_mtime = mtime
+            self.load_rules(self._rules_path)
+            print(f"Reloaded {len(self.rules)} alert rules from {self._rules_path}")
+        except (OSError, ValueError) as e:
+            print(f"Keeping current alert rules: {str(e)}")
     
-    def send_alert(self, alert_type, message, priority="normal"):
-        """Send SMS alert to all recipients"""
-        if not self.alert_recipients:
+    def send_alert(self, alert_type, message, priority="normal", recipients=None):
+        """Send SMS alert to all recipients, or hold it for the next combined SMS"""
+        recipients = self.alert_recipients if recipients is None else recipients
+        if not recipients:
             print("No alert recipients configured")
             return
         
+        if self.coalescer is not None:
+            self.coalescer.add(alert_type, message, priority, recipients)
+            return
+        
         # Add priority prefix to message
-        if priority == "high":
-            message = f"🚨 URGENT: {message}"
-        elif priority == "medium":
-            message = f"⚠️ ALERT: {message}"
-        else:
-            message = f"ℹ️ INFO: {message}"
+        if self._deliver(recipients, format_alert(message, priority)):
+            print(f"Alert {'queued' if self.sender else 'sent'} successfully: {alert_type}")
+    
+    def flush_alerts(self):
+        """Send all held alerts now"""
+        if self.coalescer is not None:
+            self.coalescer.flush()
+    
+    def queue_stats(self):
+        """Outgoing queue counters (depth, sent, retries, dropped, ...), or None without a queue"""
+        return self.sender.stats() if self.sender is not None else None
+    
+    def close(self, timeout=10.0):
+        """Send held alerts, then give the outgoing queue up to timeout seconds to drain"""
+        if self.coalescer is not None:
+            self.coalescer.stop(flush=True)
+        if self.sender is not None:
+            self.sender.close(timeout)
+        if self.series is not None:
+            self.series.close()
+        self.transport.close()
+    
+    def process_sensor_data(self, sensor_data, device_id=None):
+        """
+        Process sensor data and send alerts if thresholds are exceeded
         
-        try:
-            response = requests.post(
-                f"{self.sms_api_url}/sms/send",
-                headers={'Content-Type': 'application/json'},
-                json={
-                    'phone_numbers': self.alert_recipients,
-                    'message': message,
-                    'sender_id': 'FruitGuard'
-                },
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                print(f"Alert sent successfully: {alert_type}")
-            else:
-                print(f"Failed to send alert: {response.text}")
-                
-        except Exception as e:
-            print(f"Error sending alert: {str(e)}")
+        With a device_id the reading goes through the same rule table as
+        process_sensor_batch(): "metric.key" rule thresholds come from the
+        device's registry settings, and latches and recipients are per device.
+        """
+        if self.series is not None:
+            metrics = {key: [value] for key, value in sensor_data.items()
+                       if isinstance(value, (int, float)) and not isinstance(value, bool) and is_metric_name(key)}
+            self.series.append([device_id], metrics)
+        if device_id is not None:
+            self._evaluate_batch([device_id], {metric: [value] for metric, value in sensor_data.items()})
+            return
+        if self.coalescer is None:
+            self._check_thresholds(sensor_data)
+            return
+        # Alerts raised by one reading are combined before anything is sent
+        with self.coalescer.batch():
+            self._check_thresholds(sensor_data)
     
-    def process_sensor_data(self, sensor_data):
-        """Process sensor data and send alerts if thresholds are exceeded"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    def process_sensor_batch(self, device_ids, temperature=None, humidity=None,
+                             motion=None, intrusion=None, timestamps=None):
+        """
+        Evaluate readings from many devices in one pass and send their alerts
         
-        # Temperature monitoring
-        if 'temperature' in sensor_data:
-            temp = sensor_data['temperature']
-            if temp < self.alert_thresholds['temperature']['min']:
-                self.send_alert(
-                    'temperature_low',
-                    f"Temperature too low: {temp}°C at {timestamp}",
-                    priority="medium"
-                )
-            elif temp > self.alert_thresholds['temperature']['max']:
-                self.send_alert(
-                    'temperature_high',
-                    f"Temperature too high: {temp}°C at {timestamp}",
-                    priority="high"
-                )
+        Columns are equal-length sequences or NumPy arrays with one entry per
+        reading; use NaN for a missing temperature or humidity. The readings are
+        checked against the alert rules; "metric.key" thresholds such as
+        "temperature.max" come from each device's registry settings, and
+        latches and recipients are per device; unknown devices use the global
+        settings. With adaptive rules
+        the readings also update each device's rolling statistics; timestamps
+        (seconds, one per reading) default to now.
         
-        # Humidity monitoring
-        if 'humidity' in sensor_data:
-            humidity = sensor_data['humidity']
-            if humidity < self.alert_thresholds['humidity']['min']:
-                self.send_alert(
-                    'humidity_low',
-                    f"Humidity too low: {humidity}% at {timestamp}",
-                    priority="medium"
-                )
-            elif humidity > self.alert_thresholds['humidity']['max']:
-                self.send_alert(
-                    'humidity_high',
-                    f"Humidity too high: {humidity}% at {timestamp}",
-                    priority="medium"
-                )
+        Returns:
+            List of alert events (reading index, device ID, alert type, value)
+        """
+        if self.series is not None:
+            columns = {name: column for name, column in (('temperature', temperature), ('humidity', humidity))
+                       if column is not None}
+            self.series.append(device_ids, columns, timestamps)
+        columns = {'temperature': temperature, 'humidity': humidity,
+                   'motion_detected': motion, 'intrusion_detected': intrusion}
+        return self._evaluate_batch(device_ids, columns, timestamps)
+    
+    def _evaluate_batch(self, device_ids, columns, timestamps=None):
+        """Check columns of readings (metric -> values) against the rules and send their alerts"""
+        self._release_expired_latches()
+        self._reload_rules_if_changed()
+        rules = self.rules
+        columns = {metric: column for metric, column in columns.items() if column is not None}
+        thresholds = self.devices.threshold_columns(device_ids)
+        events = rules.evaluate_batch(device_ids, columns, thresholds=thresholds, latched=self._device_latches)
+        temperature, humidity = columns.get('temperature'), columns.get('humidity')
+        if self.rolling is not None:
+            adaptive = self.rolling.evaluate_batch(
+                device_ids, {'temperature': temperature, 'humidity': humidity}, timestamps)
+            if adaptive:
+                # Stable sort keeps each reading's rule alerts first
+                events = sorted(events + adaptive, key=lambda event: event[0])
+        if self.debouncer is not None:
+            events = self.debouncer.filter(events, device_ids, temperature, humidity, thresholds)
+        if not events:
+            return events
+        self._record_alerts((event[1], event[2]) for event in events)
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        batch = self.coalescer.batch() if self.coalescer is not None else contextlib.nullcontext()
+        with batch:
+            for event in events:
+                device_id, alert_type = event[1], event[2]
+                if alert_type in rules:
+                    message = rules.format_event(event, timestamp, thresholds)
+                    priority = rules[alert_type].priority
+                else:
+                    message, priority = format_event(event, timestamp), "medium"
+                # Keyed per device so the coalescer does not merge different devices' alerts
+                self.send_alert(f"{alert_type}:{device_id}", message, priority=priority,
+                                recipients=self.devices.recipients(device_id))
+        return events
+    
+    def _check_thresholds(self, sensor_data):
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._release_expired_latches()
+        self._reload_rules_if_changed()
+        alerts = [(rule.name, rule.format(value, timestamp), rule.priority)
+                  for rule, value in self.rules.evaluate(sensor_data, self.latched)]
         
-        # Motion detection
-        if 'motion_detected' in sensor_data and sensor_data['motion_detected']:
-            if not self.alert_thresholds['motion_detected']:
-                self.send_alert(
-                    'motion',
-                    f"Motion detected in orchard at {timestamp}",
-                    priority="high"
-                )
-                self.alert_thresholds['motion_detected'] = True
+        # Adaptive rules against the readings' rolling statistics
+        if self.rolling is not None:
+            for metric in ('temperature', 'humidity'):
+                if sensor_data.get(metric) is None:
+                    continue
+                value = float(sensor_data[metric])
+                for alert_type, _ in self.rolling.update(None, metric, value):
+                    alerts.append((alert_type, alert_text(alert_type, value, timestamp), "medium"))
         
-        # Intrusion detection
-        if 'intrusion_detected' in sensor_data and sensor_data['intrusion_detected']:
-            if not self.alert_thresholds['intrusion_detected']:
-                self.send_alert(
-                    'intrusion',
-                    f"🚨 INTRUSION DETECTED in orchard at {timestamp}!",
-                    priority="high"
-                )
-                self.alert_thresholds['intrusion_detected'] = True
+        if self.debouncer is not None:
+            # The global (non-device) readings are debounced under device ID None
+            allowed = self.debouncer.filter(
+                [(0, None, alert[0], None) for alert in alerts], [None],
+                [sensor_data.get('temperature')], [sensor_data.get('humidity')],
+                self.alert_thresholds)
+            allowed_types = {event[2] for event in allowed}
+            alerts = [alert for alert in alerts if alert[0] in allowed_types]
+        self._record_alerts((None, alert[0]) for alert in alerts)
+        for alert_type, message, priority in alerts:
+            self.send_alert(alert_type, message, priority=priority)
+    
+    def _record_alerts(self, alerts):
+        """Add (device ID, alert type) pairs to the history for the daily report"""
+        if self.series is not None:
+            self.series.append_alerts(alerts)
+    
+    def _release_expired_latches(self):
+        """Unlatch motion/intrusion alerts whose latch_ttl has passed"""
+        if self.debouncer is None:
+            return
+        for device_id, alert_type in self.debouncer.expired_latches():
+            if device_id is None:
+                self.latched.discard(alert_type)
+            else:
+                held = self._device_latches.get(alert_type)
+                if held is not None:
+                    held.discard(device_id)
     
     def reset_alerts(self):
         """Reset alert states"""
-        self.alert_thresholds['motion_detected'] = False
-        self.alert_thresholds['intrusion_detected'] = False
+        self.latched.clear()
+        self.devices.reset_latches()
+        self._device_latches = dict(self.devices.latched)
+        if self.debouncer is not None:
+            self.debouncer.reset()
     
     def send_daily_report(self):
-        """Send daily status report"""
-        message = f"📊 Daily FruitGuard Report - {datetime.now().strftime('%Y-%m-%d')}\n"
-        message += "All systems operational. No critical alerts."
+        """Send daily status report with today's reading statistics and alert counts"""
+        today = date.today()
+        message = f"📊 Daily FruitGuard Report - {today.strftime('%Y-%m-%d')}\n"
+        if self.series is None:
+            message += "All systems operational. No critical alerts."
+        else:
+            message += self._daily_report_body(self.series.daily_summary(today))
+            if self.series_retention_days:
+                self.series.drop_before(today - timedelta(days=self.series_retention_days))
         
         self.send_alert('daily_report', message, priority="normal")
+    
+    def _daily_report_body(self, summary):
+        if not summary['readings']:
+            return "No sensor readings recorded."
+        lines = [f"{summary['readings']:,} readings from {summary['devices']:,} devices"]
+        for metric, stats in summary['metrics'].items():
+            unit = METRIC_UNITS.get(metric, '')
+            lines.append(f"{metric.replace('_', ' ').capitalize()}: min {stats['min']:.1f}{unit}, "
+                         f"max {stats['max']:.1f}{unit}, mean {stats['mean']:.1f}{unit}")
+        alerts = summary['alerts']
+        if alerts:
+            counts = ', '.join(f"{alert_type} {count}" for alert_type, count
+                               in sorted(alerts.items(), key=lambda item: -item[1]))
+            lines.append(f"Alerts: {sum(alerts.values())} ({counts})")
+        else:
+            lines.append("No alerts.")
+        return '\n'.join(lines)
 
 # Example usage
 if __name__ == '__main__':
-    # Initialize FruitGuard IoT
-    fruitguard = FruitGuardIoT()
+    # Initialize FruitGuard IoT; a real gateway keeps data_dir on persistent storage
+    fruitguard = FruitGuardIoT(data_dir=tempfile.mkdtemp(prefix='fruitguard-'))
     
     # Add alert recipients
     fruitguard.add_alert_recipient('1234567890')
@@ -187,5 +427,11 @@ if __name__ == '__main__':
     # Daily report
     fruitguard.send_daily_report()
     
+    # Send anything still held in a coalescing window
+    fruitguard.close()
+    print(f"Coalescing stats: {fruitguard.coalescer.stats()}")
+    print(f"Queue stats: {fruitguard.queue_stats()}")
+    print(f"Debounce stats: {fruitguard.debouncer.stats()}")
+    
     print("IoT simulation completed!")
 
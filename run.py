@@ -1,17 +1,31 @@
 #!/usr/bin/env python3
 """
 Entry point for the FruitGuard SMS service
+
+Usage:
+    python run.py              # mode from SERVER_MODE (production unless DEBUG=True)
+    python run.py --prod       # gunicorn, prefork workers x threads
+    python run.py --dev        # Werkzeug development server
+    python run.py --asgi       # async API (asgi.py) under uvicorn
 """
 
+import argparse
 import sys
 import os
 
 # Add the src directory to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-# Import and run the Flask app
-from main import app
+from server import run
 
 if __name__ == '__main__':
-    app.run()
-
+    parser = argparse.ArgumentParser(description='Run the FruitGuard SMS service')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--prod', dest='mode', action='store_const', const='production',
+                       help='Serve with gunicorn workers')
+    group.add_argument('--dev', dest='mode', action='store_const', const='development',
+                       help='Serve with the Flask development server')
+    group.add_argument('--asgi', dest='mode', action='store_const', const='asgi',
+                       help='Serve the async API with uvicorn')
+    args = parser.parse_args()
+    run(args.mode)
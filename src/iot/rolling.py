@@ -0,0 +1,277 @@
+"""
+Rolling-window sensor statistics for adaptive alerting
+
+Each (device, metric) series keeps a fixed-size ring buffer of its last
+`window` readings and updates, in O(1) amortized per reading:
+
+- EWMA (exponentially weighted moving average)
+- rolling mean and sample variance (Welford's update, adjusted as readings
+  leave the window)
+- rolling min and max (monotonic deques)
+
+Adaptive rules use these instead of fixed limits: a z-score rule fires when a
+reading is more than `z` standard deviations from the device's own recent
+mean (a warm afternoon is normal, a sudden spike is not), and a rate rule
+fires when a metric changes faster than `max_rate` units per minute.
+
+Memory per series is bounded by the window: an 8-byte slot per reading in the
+ring buffer plus at most `window` entries in each min/max deque. With the
+default 60-reading window that is under 10 KB per series in the worst case,
+typically about 1 KB. Series idle for `idle_ttl` seconds are dropped, and at
+most `max_series` are kept.
+"""
+
+import math
+import time
+from array import array
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from iot.debounce import TTLMap
+
+class MetricWindow:
+    """Fixed-size ring buffer with O(1) rolling statistics"""
+
+    __slots__ = ('size', 'alpha', '_values', '_count', '_seq', '_mean', '_m2', '_ewma',
+                 '_min', '_max', '_last', '_last_time')
+
+    def __init__(self, size: int = 60, alpha: float = 0.1):
+        """
+        Args:
+            size: Number of readings in the window
+            alpha: EWMA smoothing factor (0-1, higher follows new readings faster)
+        """
+        self.size = size
+        self.alpha = alpha
+        self._values = array('d', bytes(8 * size))
+        self._count = 0
+        self._seq = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._ewma: Optional[float] = None
+        # (sequence, value) pairs; front is the window's min (or max)
+        self._min: deque = deque()
+        self._max: deque = deque()
+        self._last: Optional[float] = None
+        self._last_time: Optional[float] = None
+
+    def push(self, value: float, timestamp: Optional[float] = None):
+        """
+        Add a reading, evicting the oldest once the window is full
+
+        Args:
+            value: Reading
+            timestamp: Reading time in seconds, used for rate()
+        """
+        seq = self._seq
+        slot = seq % self.size
+        if self._count < self.size:
+            self._count += 1
+            delta = value - self._mean
+            self._mean += delta / self._count
+            self._m2 += delta * (value - self._mean)
+        else:
+            old = self._values[slot]
+            mean = self._mean + (value - old) / self.size
+            self._m2 += (value - old) * (value - mean + old - self._mean)
+            self._mean = mean
+        if self._m2 < 0:
+            # Rounding can take a constant window slightly negative
+            self._m2 = 0.0
+        self._values[slot] = value
+
+        # Each deque keeps only readings that can still become the window's min
+        # (or max), so every reading is appended and removed at most once
+        oldest = seq - self.size
+        lows = self._min
+        while lows and lows[-1][1] >= value:
+            lows.pop()
+        lows.append((seq, value))
+        if lows[0][0] <= oldest:
+            lows.popleft()
+        highs = self._max
+        while highs and highs[-1][1] <= value:
+            highs.pop()
+        highs.append((seq, value))
+        if highs[0][0] <= oldest:
+            highs.popleft()
+
+        self._ewma = value if self._ewma is None else self.alpha * value + (1 - self.alpha) * self._ewma
+        self._last = value
+        self._last_time = timestamp
+        self._seq = seq + 1
+
+    @property
+    def count(self) -> int:
+        """Readings currently in the window"""
+        return self._count
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self._mean if self._count else None
+
+    @property
+    def variance(self) -> Optional[float]:
+        """Sample variance of the window"""
+        return self._m2 / (self._count - 1) if self._count > 1 else None
+
+    @property
+    def std(self) -> Optional[float]:
+        variance = self.variance
+        return None if variance is None else math.sqrt(variance)
+
+    @property
+    def ewma(self) -> Optional[float]:
+        return self._ewma
+
+    @property
+    def min(self) -> Optional[float]:
+        return self._min[0][1] if self._min else None
+
+    @property
+    def max(self) -> Optional[float]:
+        return self._max[0][1] if self._max else None
+
+    @property
+    def last(self) -> Optional[float]:
+        return self._last
+
+    def zscore(self, value: float) -> Optional[float]:
+        """
+        Standard score of a reading against the window, before it is added
+
+        Returns:
+            z-score, or None with fewer than two readings or no variation
+        """
+        std = self.std
+        if not std:
+            return None
+        return (value - self._mean) / std
+
+    def rate(self, value: float, timestamp: Optional[float]) -> Optional[float]:
+        """
+        Change per minute from the previous reading
+
+        Returns:
+            Rate, or None without a previous timestamped reading
+        """
+        if timestamp is None or self._last_time is None or timestamp <= self._last_time:
+            return None
+        return (value - self._last) * 60.0 / (timestamp - self._last_time)
+
+    def snapshot(self) -> Dict:
+        """Current statistics as a dictionary"""
+        return {'count': self._count, 'mean': self.mean, 'std': self.std, 'ewma': self.ewma,
+                'min': self.min, 'max': self.max, 'last': self.last}
+
+class RollingStats:
+    """Per-device, per-metric rolling windows evaluating z-score and rate-of-change rules"""
+
+    def __init__(self,
+                 rules: Dict[str, Dict],
+                 window: int = 60,
+                 alpha: float = 0.1,
+                 idle_ttl: float = 86400.0,
+                 max_series: int = 100000,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            rules: Per-metric rules, e.g. {'temperature': {'z': 3.0, 'max_rate': 0.5,
+                'min_samples': 20}}; 'z' and 'max_rate' (units per minute) are each
+                optional, min_samples (default 20) gates the z-score rule
+            window: Readings kept per series
+            alpha: EWMA smoothing factor
+            idle_ttl: Seconds after which a series with no readings is dropped
+            max_series: Most series kept
+            clock: Time source for readings without a timestamp
+        """
+        self.rules = rules
+        self.window = window
+        self.alpha = alpha
+        self.clock = clock
+        self._series = TTLMap(idle_ttl, max_series, clock)
+        self._stats = {'readings': 0, 'zscore_alerts': 0, 'rate_alerts': 0, 'evicted': 0}
+
+    def update(self, device_id: str, metric: str, value: float,
+               timestamp: Optional[float] = None) -> List[Tuple[str, float]]:
+        """
+        Check a reading against the metric's rules, then add it to the window
+
+        Args:
+            device_id: Device ID
+            metric: Metric name, e.g. 'temperature'
+            value: Reading
+            timestamp: Reading time in seconds (defaults to now)
+
+        Returns:
+            (alert_type, score) pairs: '<metric>_anomaly' with the z-score and
+            '<metric>_rate' with the change per minute
+        """
+        rule = self.rules.get(metric)
+        if rule is None or value is None or math.isnan(value):
+            return []
+        timestamp = self.clock() if timestamp is None else timestamp
+        key = (device_id, metric)
+        series = self._series.get(key)
+        if series is None:
+            series = MetricWindow(self.window, self.alpha)
+        self._series.set(key, series)
+        self._stats['readings'] += 1
+
+        alerts = []
+        if rule.get('z') is not None and series.count >= rule.get('min_samples', 20):
+            z = series.zscore(value)
+            if z is not None and abs(z) >= rule['z']:
+                alerts.append((f"{metric}_anomaly", z))
+                self._stats['zscore_alerts'] += 1
+        if rule.get('max_rate') is not None:
+            rate = series.rate(value, timestamp)
+            if rate is not None and abs(rate) >= rule['max_rate']:
+                alerts.append((f"{metric}_rate", rate))
+                self._stats['rate_alerts'] += 1
+        series.push(value, timestamp)
+        return alerts
+
+    def evaluate_batch(self,
+                       device_ids: Sequence[str],
+                       columns: Dict[str, Sequence[float]],
+                       timestamps: Optional[Sequence[float]] = None) -> List[Tuple]:
+        """
+        Run a batch of readings through the rules, in reading order
+
+        Args:
+            device_ids: Device ID of each reading
+            columns: Metric name -> readings (NaN/None where not reported)
+            timestamps: Reading times in seconds (defaults to now for the whole batch)
+
+        Returns:
+            (reading index, device ID, alert type, value) events like RuleSet.evaluate_batch()'s
+        """
+        self._stats['evicted'] += len(self._series.expire())
+        now = self.clock()
+        metrics = [(metric, column) for metric, column in columns.items()
+                   if column is not None and metric in self.rules]
+        events = []
+        for i, device_id in enumerate(device_ids):
+            timestamp = now if timestamps is None else timestamps[i]
+            for metric, column in metrics:
+                value = column[i]
+                if value is None:
+                    continue
+                for alert_type, _ in self.update(device_id, metric, float(value), timestamp):
+                    events.append((i, device_id, alert_type, float(value)))
+        return events
+
+    def get(self, device_id: str, metric: str) -> Optional[MetricWindow]:
+        """The rolling window of a series, if it exists"""
+        return self._series.get((device_id, metric))
+
+    def stats(self) -> Dict:
+        """
+        Get rolling statistics counters
+
+        Returns:
+            Dictionary of counters plus the number of series held
+        """
+        stats = dict(self._stats)
+        stats['series'] = len(self._series)
+        return stats
@@ -0,0 +1,414 @@
+"""
+Declarative sensor alert rules
+
+A rule is a plain dictionary, so rule sets can live in a JSON file:
+
+    {"name": "soil_moisture_low", "metric": "soil_moisture", "op": "<",
+     "threshold": 20, "priority": "medium",
+     "message": "Soil moisture low: {value}% at {timestamp}"}
+
+- op is one of <, <=, >, >=, ==, != or "true" (the reading is truthy; no
+  threshold needed)
+- threshold is a number, or a "metric.key" reference such as
+  "temperature.min" resolved against the params passed to compile_rules()
+  (FruitGuardIoT passes its alert_thresholds)
+- message is a str.format template with {value}, {threshold}, {timestamp},
+  {metric}, {name} and {device_id}
+- latch (optional) makes the rule fire once until its latch is released,
+  like motion and intrusion alerts
+
+compile_rules() validates a rule list once and builds a flat decision table:
+one entry per metric, each holding that metric's (comparator, threshold,
+rule) rows in file order. evaluate() looks each metric up in the reading once
+and walks its rows, so a reading is checked in a single pass with no parsing
+or reference resolution. A RuleSet is immutable; swapping the object a
+caller holds replaces the rules without a restart, and evaluations already
+running finish with the old set.
+
+evaluate_batch() applies the same table to columns of readings from many
+devices. A "metric.key" threshold is then looked up per reading when the
+caller passes per-device limits (DeviceRegistry.threshold_columns()), and
+latched rules are tracked per device. With NumPy installed every rule is one
+vectorized comparison over the batch.
+"""
+
+import json
+import math
+import operator
+from typing import Callable, Dict, Iterable, List, Mapping, MutableSet, Optional, Sequence, Tuple
+from iot.coalescer import PRIORITY_RANK
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+BACKEND = 'numpy' if np is not None else 'python'
+
+COMPARATORS: Dict[str, Callable] = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+    'true': None
+}
+
+# The checks FruitGuardIoT has always applied, worded the same way
+DEFAULT_RULES = [
+    {'name': 'temperature_low', 'metric': 'temperature', 'op': '<', 'threshold': 'temperature.min',
+     'priority': 'medium', 'message': 'Temperature too low: {value}°C at {timestamp}'},
+    {'name': 'temperature_high', 'metric': 'temperature', 'op': '>', 'threshold': 'temperature.max',
+     'priority': 'high', 'message': 'Temperature too high: {value}°C at {timestamp}'},
+    {'name': 'humidity_low', 'metric': 'humidity', 'op': '<', 'threshold': 'humidity.min',
+     'priority': 'medium', 'message': 'Humidity too low: {value}% at {timestamp}'},
+    {'name': 'humidity_high', 'metric': 'humidity', 'op': '>', 'threshold': 'humidity.max',
+     'priority': 'medium', 'message': 'Humidity too high: {value}% at {timestamp}'},
+    {'name': 'motion', 'metric': 'motion_detected', 'op': 'true', 'latch': True,
+     'priority': 'high', 'message': 'Motion detected in orchard at {timestamp}'},
+    {'name': 'intrusion', 'metric': 'intrusion_detected', 'op': 'true', 'latch': True,
+     'priority': 'high', 'message': '🚨 INTRUSION DETECTED in orchard at {timestamp}!'}
+]
+
+def display_value(value):
+    """A reading as shown in alert texts: integral floats without the trailing .0, so 40.0 reads as 40"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+class Rule:
+    """A compiled rule"""
+
+    __slots__ = ('name', 'metric', 'op', 'threshold', 'ref', 'priority', 'message', 'latch')
+
+    def __init__(self, name: str, metric: str, op: str, threshold, priority: str, message: str, latch: bool,
+                 ref: Optional[Tuple[str, str]] = None):
+        self.name = name
+        self.metric = metric
+        self.op = op
+        self.threshold = threshold
+        # ("temperature", "min") for a "temperature.min" threshold, so batches can use per-device limits
+        self.ref = ref
+        self.priority = priority
+        self.message = message
+        self.latch = latch
+
+    def format(self, value, timestamp: str, device_id: Optional[str] = None, threshold=None) -> str:
+        """Render the rule's message for a matching reading (threshold overrides the compiled one)"""
+        return self.message.format(value=display_value(value),
+                                   threshold=display_value(self.threshold if threshold is None else threshold),
+                                   timestamp=timestamp, metric=self.metric, name=self.name, device_id=device_id)
+
+    def __repr__(self) -> str:
+        return f"Rule({self.name!r}: {self.metric} {self.op} {self.threshold!r})"
+
+# (rule, reading value)
+RuleMatch = Tuple[Rule, object]
+
+def _resolve(threshold, params: Mapping):
+    if not isinstance(threshold, str):
+        return threshold
+    metric, _, key = threshold.partition('.')
+    try:
+        return params[metric][key] if key else params[metric]
+    except (KeyError, TypeError):
+        raise ValueError(f"Unknown threshold reference: {threshold!r}") from None
+
+def _compile(spec: Mapping, params: Mapping) -> Rule:
+    missing = [field for field in ('name', 'metric', 'op', 'message') if not spec.get(field)]
+    if missing:
+        raise ValueError(f"Rule {spec.get('name', spec)!r} is missing {', '.join(missing)}")
+    name = spec['name']
+    op = spec['op']
+    if op not in COMPARATORS:
+        raise ValueError(f"Rule {name!r}: unknown op {op!r}")
+    threshold = None
+    ref = None
+    if op != 'true':
+        if spec.get('threshold') is None:
+            raise ValueError(f"Rule {name!r}: op {op!r} needs a threshold")
+        threshold = _resolve(spec['threshold'], params)
+        if isinstance(spec['threshold'], str):
+            metric, _, key = spec['threshold'].partition('.')
+            ref = (metric, key) if key else None
+        if isinstance(threshold, bool) or not isinstance(threshold, (int, float)):
+            raise ValueError(f"Rule {name!r}: threshold must be a number, got {threshold!r}")
+    priority = spec.get('priority', 'normal')
+    if priority not in PRIORITY_RANK:
+        raise ValueError(f"Rule {name!r}: priority must be one of {', '.join(PRIORITY_RANK)}")
+    rule = Rule(name, spec['metric'], op, threshold, priority, spec['message'], bool(spec.get('latch')), ref)
+    try:
+        rule.format(0, '')
+    except (KeyError, IndexError, ValueError) as e:
+        raise ValueError(f"Rule {name!r}: bad message template: {e}") from None
+    return rule
+
+class RuleSet:
+    """Rules compiled into a per-metric decision table"""
+
+    def __init__(self, rules: Iterable[Rule]):
+        self.rules = tuple(rules)
+        table: Dict[str, List] = {}
+        for rule in self.rules:
+            table.setdefault(rule.metric, []).append((COMPARATORS[rule.op], rule.threshold, rule))
+        # Metrics in the order their first rule appears
+        self._table = tuple((metric, tuple(rows)) for metric, rows in table.items())
+        self._by_name = {rule.name: rule for rule in self.rules}
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def __getitem__(self, name: str) -> Rule:
+        return self._by_name[name]
+
+    def __contains__(self, name) -> bool:
+        return name in self._by_name
+
+    @property
+    def metrics(self) -> Tuple[str, ...]:
+        return tuple(metric for metric, _ in self._table)
+
+    def evaluate(self,
+                 reading: Mapping,
+                 latched: Optional[MutableSet] = None,
+                 skip: Iterable[str] = ()) -> List[RuleMatch]:
+        """
+        Check one reading against every rule
+
+        Args:
+            reading: Metric name -> value; absent, None and NaN values match nothing
+            latched: Names of latched rules that already fired; matching latch
+                rules are skipped when present and added when they fire
+            skip: Metrics not to check
+
+        Returns:
+            (rule, value) pairs in rule order
+        """
+        matches = []
+        for metric, rows in self._table:
+            value = reading.get(metric)
+            if value is None or (isinstance(value, float) and math.isnan(value)) or metric in skip:
+                continue
+            for compare, threshold, rule in rows:
+                if compare is None:
+                    hit = bool(value)
+                else:
+                    try:
+                        hit = compare(value, threshold)
+                    except TypeError:
+                        # Not a number; the reading cannot match this metric's rules
+                        break
+                if not hit:
+                    continue
+                if rule.latch:
+                    if latched is None:
+                        raise ValueError(f"Rule {rule.name!r} latches but no latched set was given")
+                    if rule.name in latched:
+                        continue
+                    latched.add(rule.name)
+                matches.append((rule, value))
+        return matches
+
+    def _plan(self, columns: Mapping[str, Sequence], thresholds: Optional[Mapping], n: int) -> List[Tuple]:
+        """(column, comparator, limit, rule) per rule whose metric has a column, in table order"""
+        plan = []
+        for metric, rows in self._table:
+            column = columns.get(metric)
+            if column is None:
+                continue
+            if len(column) != n:
+                raise ValueError(f"Column {metric!r} has {len(column)} readings for {n} device IDs")
+            for compare, threshold, rule in rows:
+                limit = threshold
+                if rule.ref is not None and thresholds is not None:
+                    limit = (thresholds.get(rule.ref[0]) or {}).get(rule.ref[1], threshold)
+                plan.append((column, compare, limit, rule))
+        return plan
+
+    def evaluate_batch(self,
+                       device_ids: Sequence[str],
+                       columns: Mapping[str, Sequence],
+                       thresholds: Optional[Mapping] = None,
+                       latched: Optional[Dict[str, MutableSet]] = None,
+                       use_numpy: Optional[bool] = None) -> List[Tuple[int, str, str, Optional[float]]]:
+        """
+        Check columns of readings from many devices against every rule
+
+        Args:
+            device_ids: Device ID of each reading
+            columns: Metric name -> one value per reading (NaN/None where not reported)
+            thresholds: Per-reading limits shaped like DeviceRegistry.threshold_columns();
+                a rule whose threshold is a "metric.key" reference found here
+                compares against it instead of the compiled value
+            latched: Rule name -> set of device IDs whose latched rule already
+                fired (e.g. DeviceRegistry.latched for motion and intrusion);
+                missing names are added as sets; updated in place
+            use_numpy: Force (True) or disable (False) the NumPy path; defaults to
+                NumPy when installed
+
+        Returns:
+            (reading index, device ID, rule name, value) events ordered by reading,
+            then rule order; value is None for "true" rules
+        """
+        n = len(device_ids)
+        plan = self._plan(columns, thresholds, n)
+        if latched is None:
+            latched = {}
+        for _, _, _, rule in plan:
+            if rule.latch and rule.name not in latched:
+                latched[rule.name] = set()
+        if use_numpy is None:
+            use_numpy = np is not None
+        if use_numpy:
+            if np is None:
+                raise RuntimeError("NumPy is not installed")
+            return self._evaluate_numpy(device_ids, plan, latched)
+        return self._evaluate_python(device_ids, plan, latched)
+
+    @staticmethod
+    def _evaluate_python(device_ids, plan, latched) -> List[Tuple]:
+        plan = [(column, compare, limit, hasattr(limit, '__len__'), rule) for column, compare, limit, rule in plan]
+        events = []
+        for i, device_id in enumerate(device_ids):
+            for column, compare, limit, per_reading, rule in plan:
+                value = column[i]
+                if value is None or (isinstance(value, float) and math.isnan(value)):
+                    continue
+                if compare is None:
+                    if not value:
+                        continue
+                    value = None
+                else:
+                    try:
+                        if not compare(value, limit[i] if per_reading else limit):
+                            continue
+                        value = float(value)
+                    except (TypeError, ValueError):
+                        continue
+                if rule.latch:
+                    held = latched[rule.name]
+                    if device_id in held:
+                        continue
+                    held.add(device_id)
+                events.append((i, device_id, rule.name, value))
+        return events
+
+    def _evaluate_numpy(self, device_ids, plan, latched) -> List[Tuple]:
+        ids = np.asarray(device_ids)
+        indices = []
+        codes = []
+        readings = {}
+        # (reading index, code) -> value of events from the reading-by-reading fallback
+        fallback = {}
+        for code, (column, compare, limit, rule) in enumerate(plan):
+            hits = None
+            if compare is None:
+                flags = np.asarray(column)
+                if flags.dtype.kind == 'f':
+                    hits = np.flatnonzero(~np.isnan(flags) & (flags != 0))
+                elif flags.dtype.kind in 'biu':
+                    hits = np.flatnonzero(flags)
+            else:
+                values = readings.get(id(column))
+                if values is None:
+                    try:
+                        # None becomes NaN, which no comparison below lets through
+                        values = readings[id(column)] = np.asarray(column, dtype=np.float64)
+                    except (TypeError, ValueError):
+                        values = None
+                if values is not None:
+                    hits = np.flatnonzero(compare(values, np.asarray(limit, dtype=np.float64)) & ~np.isnan(values))
+            if hits is None:
+                # Not a numeric or boolean column: check this rule reading by reading
+                for event in self._evaluate_python(device_ids, [(column, compare, limit, rule)], latched):
+                    indices.append(np.array([event[0]]))
+                    codes.append(np.array([code], dtype=np.int32))
+                    fallback[(event[0], code)] = event[3]
+                continue
+            if rule.latch and len(hits):
+                held = latched[rule.name]
+                if held:
+                    hits = hits[~np.isin(ids[hits], list(held))]
+                # Only each device's first trigger in the batch fires; it then stays latched
+                first_ids, first = np.unique(ids[hits], return_index=True)
+                hits = np.sort(hits[first])
+                held.update(first_ids.tolist())
+            if len(hits):
+                indices.append(hits)
+                codes.append(np.full(len(hits), code, dtype=np.int32))
+        if not indices:
+            return []
+        index = np.concatenate(indices)
+        code = np.concatenate(codes)
+        order = np.lexsort((code, index))
+        events = []
+        for i, c in zip(index[order].tolist(), code[order].tolist()):
+            column, compare, _, rule = plan[c]
+            if (i, c) in fallback:
+                value = fallback[(i, c)]
+            else:
+                value = None if compare is None else float(readings[id(column)][i])
+            events.append((i, device_ids[i], rule.name, value))
+        return events
+
+    def format_event(self, event: Tuple[int, str, str, Optional[float]], timestamp: str,
+                     thresholds: Optional[Mapping] = None) -> str:
+        """
+        Alert text for an evaluate_batch() event, prefixed with the device
+
+        Args:
+            event: (reading index, device ID, rule name, value) from evaluate_batch()
+            timestamp: Time to show in the message
+            thresholds: The per-reading limits the batch was evaluated with, so
+                {threshold} shows the device's own limit
+
+        Returns:
+            Alert text without the priority prefix
+        """
+        i, device_id, name, value = event
+        rule = self._by_name[name]
+        limit = None
+        if rule.ref is not None and thresholds is not None:
+            limits = (thresholds.get(rule.ref[0]) or {}).get(rule.ref[1])
+            if limits is not None:
+                limit = limits[i] if hasattr(limits, '__len__') else limits
+        return f"{device_id}: {rule.format(value, timestamp, device_id, limit)}"
+
+def compile_rules(rules: Iterable[Mapping], params: Optional[Mapping] = None) -> RuleSet:
+    """
+    Validate rule dictionaries and compile them into a RuleSet
+
+    Args:
+        rules: Rule dictionaries (see the module docstring)
+        params: Values that "metric.key" threshold references resolve against
+
+    Returns:
+        Compiled rule set
+
+    Raises:
+        ValueError: If a rule is malformed or names are duplicated
+    """
+    compiled = [_compile(spec, params or {}) for spec in rules]
+    names = [rule.name for rule in compiled]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate rule names: {', '.join(duplicates)}")
+    return RuleSet(compiled)
+
+def load_rules(path: str) -> List[Dict]:
+    """
+    Read rule dictionaries from a JSON file
+
+    The file holds a list of rules, or an object with a "rules" list.
+
+    Raises:
+        ValueError: If the file is not valid JSON or has no rule list
+    """
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('rules')
+    if not isinstance(data, list):
+        raise ValueError(f"{path}: expected a list of rules")
+    return data
@@ -0,0 +1,56 @@
+"""
+SMS segment arithmetic
+
+A message that only uses the GSM 03.38 alphabet is sent as GSM-7: 160
+characters in one segment, or 153 per segment once it is split (the rest
+carries the concatenation header). Characters from the extension table
+(e.g. `{`, `€`) take two septets. Any other character, including every emoji,
+switches the whole message to UCS-2: 70 UTF-16 code units in one segment, or
+67 per segment when split.
+"""
+
+import math
+from typing import Tuple
+
+GSM7_BASIC = set(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+GSM7_EXTENDED = set("^{}\\[~]|€\f")
+
+GSM7_SINGLE, GSM7_MULTI = 160, 153
+UCS2_SINGLE, UCS2_MULTI = 70, 67
+
+def is_gsm7(text: str) -> bool:
+    """Check whether text can be sent with the GSM-7 alphabet"""
+    return all(ch in GSM7_BASIC or ch in GSM7_EXTENDED for ch in text)
+
+def encoded_length(text: str) -> Tuple[str, int]:
+    """
+    Get the encoding and length in encoding units of a message
+
+    Args:
+        text: Message text
+
+    Returns:
+        ('gsm7', septets) or ('ucs2', UTF-16 code units)
+    """
+    if is_gsm7(text):
+        return 'gsm7', len(text) + sum(1 for ch in text if ch in GSM7_EXTENDED)
+    return 'ucs2', len(text.encode('utf-16-le')) // 2
+
+def count_segments(text: str) -> int:
+    """
+    Number of SMS segments needed to send text
+
+    Args:
+        text: Message text
+
+    Returns:
+        Segment count (0 for an empty message)
+    """
+    encoding, length = encoded_length(text)
+    if length == 0:
+        return 0
+    single, multi = (GSM7_SINGLE, GSM7_MULTI) if encoding == 'gsm7' else (UCS2_SINGLE, UCS2_MULTI)
+    return 1 if length <= single else math.ceil(length / multi)
@@ -0,0 +1,279 @@
+"""
+Non-blocking, disk-backed alert sending for FruitGuard IoT gateways
+
+BackgroundAlertSender.submit() writes the alert to a bounded SQLite queue and
+returns immediately; a worker thread delivers queued alerts through a
+pluggable send function. Alerts survive a gateway reboot because they are
+only deleted once sent. The worker batches queued alerts that share a message
+text into one call with the union of their recipients, and retries failures
+with exponential backoff.
+
+Several senders may share one queue file. A worker claims rows (owner and
+claim time set in the same write transaction that selects them) before
+sending, so no row goes out twice; claims older than claim_timeout are taken
+over, which recovers rows held by a sender that died mid-send.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alert_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    phone_numbers TEXT NOT NULL,
+    message TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    claimed_by TEXT,
+    claimed_at REAL
+);
+"""
+
+class BackgroundAlertSender:
+    """Bounded SQLite-backed alert queue drained by a worker thread"""
+
+    def __init__(self,
+                 send_fn: Callable[[List[str], str], bool],
+                 db_path: str = 'fruitguard_alerts.db',
+                 maxsize: int = 10000,
+                 batch_size: int = 50,
+                 max_attempts: int = 8,
+                 backoff: float = 1.0,
+                 max_backoff: float = 300.0,
+                 claim_timeout: float = 300.0):
+        """
+        Args:
+            send_fn: Called as send_fn(phone_numbers, message); returns True once delivered
+            db_path: SQLite file holding the queue (':memory:' for a non-persistent queue)
+            maxsize: Most alerts held; submit() rejects alerts beyond it
+            batch_size: Most queued alerts read per worker pass
+            max_attempts: Attempts before an alert is dropped
+            backoff: First retry delay in seconds, doubled per consecutive failure
+            max_backoff: Upper bound of the retry delay
+            claim_timeout: Seconds after which another sender may take over claimed alerts
+        """
+        self.send_fn = send_fn
+        self.db_path = db_path
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.claim_timeout = claim_timeout
+        self.owner = f"{os.getpid()}:{id(self):x}"
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        if db_path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(alert_queue)')}
+        for column, kind in (('claimed_by', 'TEXT'), ('claimed_at', 'REAL')):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE alert_queue ADD COLUMN {column} {kind}")
+        self._db_lock = threading.Lock()
+        self._closed_depth = None
+        recovered = self.depth()
+        self._wakeup = threading.Event()
+        self._closed = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'enqueued': 0,
+            'recovered': recovered,
+            'dropped': 0,
+            'sent': 0,
+            'requests': 0,
+            'batches': 0,
+            'retries': 0,
+            'failed': 0
+        }
+        if recovered:
+            logger.info(f"Recovered {recovered} queued alerts from {db_path}")
+        self._worker = threading.Thread(target=self._run, name='alert-sender', daemon=True)
+        self._worker.start()
+
+    def _incr(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def submit(self, phone_numbers: Iterable[str], message: str) -> bool:
+        """
+        Queue an alert without waiting for it to be sent
+
+        Args:
+            phone_numbers: Recipients
+            message: Message text
+
+        Returns:
+            True if queued, False if the queue is full or closed
+        """
+        numbers = list(phone_numbers)
+        if self._closed.is_set():
+            return False
+        with self._db_lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                full = self._count() >= self.maxsize
+                if not full:
+                    self._conn.execute(
+                        'INSERT INTO alert_queue (phone_numbers, message, enqueued_at) VALUES (?, ?, ?)',
+                        (json.dumps(numbers), message, time.time()))
+            finally:
+                self._conn.execute('COMMIT')
+        if full:
+            self._incr('dropped')
+            logger.warning(f"Alert queue full ({self.maxsize}), dropping alert")
+            return False
+        self._incr('enqueued')
+        self._wakeup.set()
+        return True
+
+    def _count(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM alert_queue').fetchone()[0]
+
+    def _next_batch(self) -> List[Dict]:
+        """Claim the oldest unclaimed alerts and merge those with the same message text"""
+        now = time.time()
+        with self._db_lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                rows = self._conn.execute(
+                    'SELECT id, phone_numbers, message, attempts FROM alert_queue '
+                    'WHERE claimed_by IS NULL OR claimed_at < ? ORDER BY id LIMIT ?',
+                    (now - self.claim_timeout, self.batch_size)).fetchall()
+                if rows:
+                    ids = [row[0] for row in rows]
+                    self._conn.execute(
+                        f"UPDATE alert_queue SET claimed_by = ?, claimed_at = ? WHERE id IN ({','.join('?' * len(ids))})",
+                        [self.owner, now] + ids)
+            finally:
+                self._conn.execute('COMMIT')
+        batches: Dict[str, Dict] = {}
+        for row_id, numbers, message, attempts in rows:
+            batch = batches.setdefault(message, {'ids': [], 'numbers': [], 'attempts': 0, 'message': message})
+            batch['ids'].append(row_id)
+            batch['attempts'] = max(batch['attempts'], attempts)
+            for number in json.loads(numbers):
+                if number not in batch['numbers']:
+                    batch['numbers'].append(number)
+        return list(batches.values())
+
+    def _idle_timeout(self) -> float:
+        """Seconds until the oldest claim on the queue expires, or claim_timeout if nothing is claimed"""
+        with self._db_lock:
+            oldest = self._conn.execute(
+                'SELECT MIN(claimed_at) FROM alert_queue WHERE claimed_by IS NOT NULL').fetchone()[0]
+        if oldest is None:
+            return self.claim_timeout
+        return min(self.claim_timeout, max(0.01, oldest + self.claim_timeout - time.time()))
+
+    def _delete(self, ids: List[int]):
+        with self._db_lock:
+            self._conn.execute(
+                f"DELETE FROM alert_queue WHERE claimed_by = ? AND id IN ({','.join('?' * len(ids))})",
+                [self.owner] + ids)
+
+    def _process(self, batch: Dict) -> bool:
+        self._incr('requests')
+        try:
+            delivered = bool(self.send_fn(batch['numbers'], batch['message']))
+        except Exception as e:
+            logger.error(f"Alert send function raised: {str(e)}")
+            delivered = False
+        if delivered:
+            self._delete(batch['ids'])
+            self._incr('sent', len(batch['ids']))
+            return True
+        if batch['attempts'] + 1 >= self.max_attempts:
+            logger.error(f"Dropping alert after {self.max_attempts} attempts: {batch['message'][:60]}")
+            self._delete(batch['ids'])
+            self._incr('failed', len(batch['ids']))
+        else:
+            with self._db_lock:
+                self._conn.execute(
+                    'UPDATE alert_queue SET attempts = attempts + 1, claimed_by = NULL, claimed_at = NULL '
+                    f"WHERE claimed_by = ? AND id IN ({','.join('?' * len(batch['ids']))})",
+                    [self.owner] + batch['ids'])
+            self._incr('retries', len(batch['ids']))
+        return False
+
+    def _run(self):
+        failures = 0
+        while True:
+            self._wakeup.clear()
+            batches = self._next_batch()
+            if not batches:
+                if self._closed.is_set():
+                    return
+                # Rows claimed by a sender that died, or submitted by another
+                # sender on the same file, do not set our wakeup event
+                self._wakeup.wait(self._idle_timeout())
+                continue
+            self._incr('batches')
+            ok = all([self._process(batch) for batch in batches])
+            if ok:
+                failures = 0
+                continue
+            failures += 1
+            delay = min(self.max_backoff, self.backoff * 2 ** (failures - 1))
+            # close() cuts the backoff short; unsent alerts stay on disk
+            if self._closed.wait(delay):
+                return
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the queue is empty
+
+        Args:
+            timeout: Seconds to wait at most
+
+        Returns:
+            True if the queue drained
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.depth():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def depth(self) -> int:
+        """Number of alerts in the queue file, including those being sent by any sender"""
+        with self._db_lock:
+            if self._closed_depth is not None:
+                return self._closed_depth
+            return self._count()
+
+    def stats(self) -> Dict:
+        """
+        Get sender counters
+
+        Returns:
+            Dictionary of counters plus current depth and capacity
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['depth'] = self.depth()
+        stats['capacity'] = self.maxsize
+        return stats
+
+    def close(self, timeout: float = 10.0):
+        """
+        Stop the worker, giving it up to timeout seconds to drain the queue
+
+        Alerts still queued afterwards are kept on disk for the next start.
+        """
+        self.join(timeout)
+        self._closed.set()
+        self._wakeup.set()
+        self._worker.join(timeout=timeout)
+        with self._db_lock:
+            self._closed_depth = self._count()
+            self._conn.close()
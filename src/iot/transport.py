@@ -0,0 +1,125 @@
+"""
+Alert transports for FruitGuard IoT gateways
+
+A transport delivers one alert SMS and reports whether it was accepted:
+
+    send(phone_numbers, message) -> bool
+    close()
+
+HttpTransport POSTs to the SMS service's /sms/send over a pooled keep-alive
+session, for gateways on another host. InProcessTransport is for a gateway
+running in the same process as the SMS service: it calls the service's send
+path directly (number formatting, SMSLeopardService, status cache and
+analytics, as /sms/send does) and skips JSON encoding, the localhost HTTP
+round trip, Flask routing and JSON decoding.
+
+Both return False instead of raising, so BackgroundAlertSender retries
+failed sends with backoff.
+"""
+
+from typing import List, Union
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+TRANSPORTS = ('http', 'inprocess')
+
+class HttpTransport:
+    """Sends alerts to the SMS service's /sms/send endpoint over pooled connections"""
+
+    def __init__(self,
+                 base_url: str = "http://localhost:5000",
+                 sender_id: str = 'FruitGuard',
+                 timeout: float = 10.0,
+                 pool_size: int = 4):
+        """
+        Args:
+            base_url: Base URL of the FruitGuard SMS service
+            sender_id: Sender ID the SMS is sent as
+            timeout: Seconds to wait for the service
+            pool_size: Keep-alive connections kept open to the service
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.url = f"{base_url.rstrip('/')}/sms/send"
+        self.sender_id = sender_id
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def send(self, phone_numbers: List[str], message: str) -> bool:
+        """
+        POST one alert
+
+        Returns:
+            True when the service accepted it
+        """
+        try:
+            response = self.session.post(
+                self.url,
+                json={'phone_numbers': phone_numbers, 'message': message, 'sender_id': self.sender_id},
+                timeout=self.timeout)
+        except Exception as e:
+            logger.error(f"Error sending alert: {str(e)}")
+            return False
+        if response.status_code == 200:
+            return True
+        logger.error(f"Failed to send alert: {response.text}")
+        return False
+
+    def close(self):
+        self.session.close()
+
+class InProcessTransport:
+    """Sends alerts by calling the SMS service in the same process"""
+
+    def __init__(self, sender_id: str = 'FruitGuard'):
+        """
+        Args:
+            sender_id: Sender ID the SMS is sent as
+        """
+        self.sender_id = sender_id
+
+    def send(self, phone_numbers: List[str], message: str) -> bool:
+        """
+        Send one alert through services.components.send_alert_sms
+
+        Returns:
+            True when SMSLeopard accepted it (or no number was valid, which
+            retrying cannot fix)
+        """
+        from services import components
+
+        try:
+            return components.send_alert_sms(phone_numbers, message, sender_id=self.sender_id)
+        except Exception as e:
+            logger.error(f"Error sending alert: {str(e)}")
+            return False
+
+    def close(self):
+        pass
+
+def make_transport(transport: Union[None, str, object] = 'http',
+                   base_url: str = "http://localhost:5000",
+                   sender_id: str = 'FruitGuard'):
+    """
+    Build a transport by name, or pass an existing one through
+
+    Args:
+        transport: 'http', 'inprocess', or an object with send() and close()
+        base_url: SMS service URL for 'http'
+        sender_id: Sender ID for the built-in transports
+
+    Raises:
+        ValueError: If the name is unknown
+    """
+    if transport is None or transport == 'http':
+        return HttpTransport(base_url, sender_id=sender_id)
+    if transport == 'inprocess':
+        return InProcessTransport(sender_id=sender_id)
+    if isinstance(transport, str):
+        raise ValueError(f"Unknown transport {transport!r}, expected one of {', '.join(TRANSPORTS)}")
+    return transport
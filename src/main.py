@@ -1,16 +1,82 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from config import Config
-from services.smsleopard_service import SMSLeopardService
+from services import components
+from services.status_cache import status_entry
 from utils.logger import setup_logger
-import json
+from utils.handlers import configure_device, group_recipients, ingest_stream
+from utils.flask_json import FastJSONProvider
+from utils.metrics import CONTENT_TYPE, HTTP_LATENCY, HTTP_REQUESTS, REGISTRY
+from utils.profiling import PROFILE_HEADER, RequestProfile, should_profile, stage
+from utils.compression import gzip_response
+import hmac
+import atexit
+import time
 
 # Initialize Flask app
 app = Flask(__name__)
 app.config.from_object(Config)
+app.json = FastJSONProvider(app)
 
-# Initialize services
-sms_service = SMSLeopardService()
+# Services are built lazily on first use (see services/components.py)
 logger = setup_logger(__name__)
+shutdown = components.shutdown
+warmup = components.warmup
+atexit.register(shutdown)
+
+_LAZY_SERVICES = {
+    'sms_service': components.get_sms_service,
+    'dr_store': components.get_dr_store,
+    'dr_queue': components.get_dr_queue,
+    'status_cache': components.get_status_cache,
+    'delivery_analytics': components.get_delivery_analytics
+}
+
+def __getattr__(name):
+    """Keep module attributes such as main.sms_service working for callers and tests"""
+    if name in _LAZY_SERVICES:
+        return _LAZY_SERVICES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+    if Config.PROFILING_ENABLED and should_profile(request.headers.get(PROFILE_HEADER)):
+        g.profile = RequestProfile(request.method, request.path)
+        g.profile.start()
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request and record its latency under the matched route template"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        HTTP_REQUESTS.inc(request.method, route, str(response.status_code))
+        HTTP_LATENCY.observe(time.perf_counter() - started, request.method, route)
+    return response
+
+@app.after_request
+def save_profile(response):
+    """Stop the request profile, if any, and store it in the profile ring"""
+    profile = g.pop('profile', None)
+    if profile is not None:
+        try:
+            profile_id = components.get_profile_store().save(profile.stop(response.status_code))
+            response.headers['X-Profile-Id'] = profile_id
+        except OSError as e:
+            logger.error(f"Failed to save request profile: {str(e)}")
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Gzip large JSON and text responses for clients that accept it"""
+    return gzip_response(response, request.headers.get('Accept-Encoding', ''))
+
+@app.teardown_request
+def discard_profile(exc):
+    """Deactivate a profile left running by an unhandled error"""
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.stop(500)
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -21,11 +87,18 @@ def health_check():
         'version': '1.0.0'
     }), 200
 
+def _wants_summary() -> bool:
+    """Summary view is requested with ?view=summary, X-Response-View: summary or Prefer: return=minimal"""
+    if request.args.get('view') == 'summary' or request.headers.get('X-Response-View') == 'summary':
+        return True
+    return 'return=minimal' in request.headers.get('Prefer', '').replace(' ', '')
+
 @app.route('/sms/send', methods=['POST'])
 def send_sms():
     """Send SMS endpoint"""
     try:
-        data = request.get_json()
+        with stage('parse_json'):
+            data = request.get_json()
         
         if not data:
             return jsonify({'error': 'No JSON data provided'}), 400
@@ -46,19 +119,37 @@ def send_sms():
             return jsonify({'error': 'phone_numbers must be a non-empty list'}), 400
         
         # Format phone numbers
-        formatted_numbers = sms_service.format_phone_numbers(phone_numbers)
+        sms_service = components.get_sms_service()
+        with stage('format_numbers'):
+            formatted_numbers = sms_service.format_phone_numbers(phone_numbers)
         if not formatted_numbers:
             return jsonify({'error': 'No valid phone numbers provided'}), 400
         
         # Send SMS
-        result = sms_service.send_sms_with_retry(
-            phone_numbers=formatted_numbers,
-            message=message,
-            sender_id=sender_id,
-            max_retries=data.get('max_retries')
-        )
+        with stage('send'):
+            result = sms_service.send_sms_with_retry(
+                phone_numbers=formatted_numbers,
+                message=message,
+                sender_id=sender_id,
+                max_retries=data.get('max_retries')
+            )
+        
+        with stage('record_send'):
+            components.get_status_cache().update_from_send_response(result)
+            components.get_delivery_analytics().record_send(result, sender_id or Config.DEFAULT_SENDER_ID, formatted_numbers)
         
         logger.info(f"SMS sent successfully via API endpoint")
+        if _wants_summary():
+            from services.send_job_store import summarize_send_result
+            with stage('store_job'):
+                summary = summarize_send_result(result, len(phone_numbers), len(formatted_numbers))
+                job_id = components.get_job_store().save(result, summary, sender_id or Config.DEFAULT_SENDER_ID)
+            return jsonify({
+                'success': True,
+                'message': 'SMS sent successfully',
+                'job_id': job_id,
+                'summary': summary
+            }), 200
         return jsonify({
             'success': True,
             'message': 'SMS sent successfully',
@@ -72,6 +163,18 @@ def send_sms():
         logger.error(f"Error sending SMS: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/sms/jobs/<job_id>', methods=['GET'])
+def get_send_job(job_id):
+    """Get the full provider response of a summary-mode send"""
+    try:
+        job = components.get_job_store().get(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify({'success': True, 'data': job}), 200
+    except Exception as e:
+        logger.error(f"Error getting send job: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @app.route('/sms/status/<message_id>', methods=['GET'])
 def get_sms_status(message_id):
     """Get SMS status endpoint"""
@@ -79,22 +182,41 @@ def get_sms_status(message_id):
         if not message_id:
             return jsonify({'error': 'Message ID is required'}), 400
         
-        result = sms_service.get_sms_status(message_id)
+        status_cache = components.get_status_cache()
+        cached = status_cache.get(message_id)
+        if cached is not None:
+            return jsonify({
+                'success': True,
+                'data': cached
+            }), 200, {'X-Status-Source': 'cache'}
+        
+        status_cache.record_upstream_call()
+        result = status_entry(message_id, components.get_sms_service().get_sms_status(message_id))
+        if result['status']:
+            status_cache.update(message_id, result)
         
         return jsonify({
             'success': True,
             'data': result
-        }), 200
+        }), 200, {'X-Status-Source': 'upstream'}
         
     except Exception as e:
         logger.error(f"Error getting SMS status: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/sms/status-cache/stats', methods=['GET'])
+def status_cache_stats():
+    """Local status cache statistics endpoint"""
+    return jsonify({
+        'success': True,
+        'data': components.get_status_cache().stats()
+    }), 200
+
 @app.route('/account/balance', methods=['GET'])
 def get_balance():
     """Get account balance endpoint"""
     try:
-        result = sms_service.get_balance()
+        result = components.get_sms_service().get_balance()
         
         return jsonify({
             'success': True,
@@ -118,6 +240,7 @@ def validate_phone_numbers():
         if not isinstance(phone_numbers, list):
             return jsonify({'error': 'phone_numbers must be a list'}), 400
         
+        sms_service = components.get_sms_service()
         validation_results = {}
         for number in phone_numbers:
             validation_results[number] = sms_service.validate_phone_number(number)
@@ -136,31 +259,182 @@ def validate_phone_numbers():
 
 @app.route('/dr', methods=['POST'])
 def delivery_report():
-    """Delivery report webhook endpoint (following original format)"""
-    logger.info("=== Delivery Report Callback ===")
-    logger.info(f"Headers: {dict(request.headers)}")
+    """Delivery report webhook endpoint (following original format)
     
-    payload = request.get_json(silent=True)
-    logger.info(f"JSON: {payload}")
+    Only minimal validation happens here; the raw body is queued and parsed,
+    persisted and logged by the background ingestion worker.
+    """
+    raw = request.get_data(cache=False)
+    if not raw:
+        return ("", 204)
+    if len(raw) > Config.DR_MAX_PAYLOAD_BYTES:
+        logger.warning(f"Delivery report of {len(raw)} bytes rejected")
+        return ("", 413)
     
-    # Process delivery report
-    if payload:
-        try:
-            # Extract relevant information from payload
-            message_id = payload.get('message_id')
-            status = payload.get('status')
-            recipient = payload.get('to')
-            
-            logger.info(f"Message ID: {message_id}, Status: {status}, Recipient: {recipient}")
-            
-            # Here you can add logic to store delivery status in database
-            # or trigger other actions based on delivery status
-            
-        except Exception as e:
-            logger.error(f"Error processing delivery report: {str(e)}")
+    if not components.get_dr_queue().submit(raw):
+        # Queue is full: ask the provider to retry instead of blocking a worker
+        logger.warning("Delivery report queue full, report dropped")
+        return ("", 503, {'Retry-After': '1'})
     
     return ("", 204)
 
+@app.route('/dr/bulk', methods=['POST'])
+def bulk_delivery_reports():
+    """Bulk delivery report ingestion endpoint
+    
+    Accepts a JSON array (application/json) or newline-delimited JSON
+    (application/x-ndjson) and parses it incrementally from the request
+    stream, inserting reports in transactions of DR_BULK_BATCH_SIZE.
+    """
+    try:
+        payload, status = ingest_stream(request.mimetype, request.stream, components.get_dr_queue().ingest)
+        if status == 200:
+            logger.info(f"Bulk delivery report ingest: {payload['data']}")
+        return jsonify(payload), status
+        
+    except Exception as e:
+        logger.error(f"Error ingesting delivery reports: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/dr/stats', methods=['GET'])
+def delivery_report_stats():
+    """Delivery report ingestion queue statistics endpoint"""
+    return jsonify({
+        'success': True,
+        'data': components.get_dr_queue().stats()
+    }), 200
+
+@app.route('/sms/reports/<message_id>', methods=['GET'])
+def get_delivery_reports(message_id):
+    """Get stored delivery reports for a message"""
+    try:
+        reports = components.get_dr_store().get_by_message_id(message_id)
+        if not reports:
+            return jsonify({'error': 'No delivery reports found'}), 404
+        
+        return jsonify({
+            'success': True,
+            'data': reports
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error getting delivery reports: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/analytics/delivery', methods=['GET'])
+def get_delivery_analytics():
+    """Delivery analytics endpoint"""
+    granularity = request.args.get('granularity', 'minute')
+    if granularity not in ('minute', 'hour'):
+        return jsonify({'error': 'granularity must be minute or hour'}), 400
+    try:
+        last = int(request.args.get('last', 60))
+    except ValueError:
+        return jsonify({'error': 'last must be an integer'}), 400
+    
+    return jsonify({
+        'success': True,
+        'data': components.get_delivery_analytics().snapshot(granularity, max(last, 0))
+    }), 200
+
+@app.route('/telemetry', methods=['POST'])
+def ingest_telemetry():
+    """Sensor telemetry ingestion endpoint
+    
+    Accepts a JSON array (application/json) or newline-delimited JSON
+    (application/x-ndjson) of readings, parsed incrementally from the request
+    stream. Alerts are evaluated per device and queued for sending; the
+    response does not wait for any SMS.
+    """
+    try:
+        payload, status = ingest_stream(request.mimetype, request.stream, components.get_telemetry().ingest)
+        if status == 200:
+            logger.debug(f"Telemetry ingest: {payload['data']}")
+        return jsonify(payload), status
+        
+    except Exception as e:
+        logger.error(f"Error ingesting telemetry: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/telemetry/stats', methods=['GET'])
+def telemetry_stats():
+    """Telemetry ingestion, alerting and queue statistics endpoint"""
+    return jsonify({
+        'success': True,
+        'data': components.get_telemetry().stats()
+    }), 200
+
+@app.route('/telemetry/groups/<group>', methods=['PUT'])
+def set_telemetry_group(group):
+    """Create or replace a named group of alert recipients"""
+    denied = _admin_denied()
+    if denied:
+        return denied
+    try:
+        recipients = group_recipients(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    components.get_telemetry().set_group(group, recipients)
+    return jsonify({'success': True}), 200
+
+@app.route('/telemetry/devices/<device_id>', methods=['PUT'])
+def configure_telemetry_device(device_id):
+    """Set a device's alert thresholds and recipient group"""
+    denied = _admin_denied()
+    if denied:
+        return denied
+    try:
+        configure_device(components.get_telemetry(), device_id, request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'success': True}), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(REGISTRY.render(), mimetype=None, content_type=CONTENT_TYPE)
+
+def _admin_denied():
+    """Error response for a request not allowed to use the admin endpoints, or None
+
+    The endpoints are refused outright while ADMIN_TOKEN is unset, so a
+    default deployment does not expose them.
+    """
+    if not Config.ADMIN_TOKEN:
+        return jsonify({'error': 'Admin endpoints are disabled: ADMIN_TOKEN is not set'}), 503
+    supplied = request.headers.get('X-Admin-Token', '')
+    authorization = request.headers.get('Authorization', '')
+    if authorization.startswith('Bearer '):
+        supplied = authorization[len('Bearer '):]
+    if not hmac.compare_digest(supplied.encode(), Config.ADMIN_TOKEN.encode()):
+        return jsonify({'error': 'Unauthorized'}), 401
+    return None
+
+@app.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    """List stored request profiles, newest first"""
+    if not Config.PROFILING_ENABLED:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    denied = _admin_denied()
+    if denied:
+        return denied
+    return jsonify({'success': True, 'data': components.get_profile_store().list()}), 200
+
+@app.route('/admin/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """Get one stored request profile"""
+    if not Config.PROFILING_ENABLED:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    denied = _admin_denied()
+    if denied:
+        return denied
+    report = components.get_profile_store().get(profile_id)
+    if report is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    if request.args.get('format') == 'text':
+        return Response(report.get('cprofile') or '', mimetype='text/plain')
+    return jsonify({'success': True, 'data': report}), 200
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
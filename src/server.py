@@ -0,0 +1,137 @@
+"""
+Serving modes for the FruitGuard SMS service
+
+Development mode runs Flask's single-process Werkzeug server. Production mode
+runs gunicorn with prefork workers using the threaded (gthread) worker class,
+configured from Config. ASGI mode runs the async variant of the API (asgi.py)
+under uvicorn.
+
+Both multi-process modes default to one worker process (WORKERS=1); gunicorn
+then serves requests from THREADS threads. The status cache, delivery
+analytics, telemetry debouncing/coalescing and the /metrics counters live in
+each process's memory, so with more workers a delivery report handled by one
+worker is not seen by another: /sms/status misses, the send stays pending in
+analytics, and each /metrics scrape reports one worker's numbers. Delivery
+reports, send jobs, telemetry config and the telemetry alert queue are in
+SQLite files shared by every worker.
+"""
+
+import multiprocessing
+from typing import Dict
+from config import Config
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+def default_workers() -> int:
+    """Gunicorn's recommended worker count for the current host"""
+    return multiprocessing.cpu_count() * 2 + 1
+
+def worker_count() -> int:
+    """Worker processes for gunicorn and uvicorn: WORKERS, with 0 meaning default_workers()"""
+    return Config.WORKERS or default_workers()
+
+def production_options() -> Dict:
+    """
+    Build gunicorn settings from Config
+
+    Returns:
+        Dictionary of gunicorn setting names to values
+    """
+    return {
+        'bind': f"{Config.HOST}:{Config.PORT}",
+        'workers': worker_count(),
+        'worker_class': 'gthread',
+        'threads': Config.THREADS,
+        'backlog': Config.BACKLOG,
+        'keepalive': Config.KEEPALIVE,
+        'timeout': Config.WORKER_TIMEOUT,
+        'graceful_timeout': Config.GRACEFUL_TIMEOUT,
+        'max_requests': Config.MAX_REQUESTS,
+        'max_requests_jitter': Config.MAX_REQUESTS_JITTER,
+        # Each worker must import the app itself: the delivery report store
+        # and ingestion threads cannot be shared across fork()
+        'preload_app': False,
+        'loglevel': Config.LOG_LEVEL.lower(),
+        'accesslog': '-' if Config.ACCESS_LOG else None,
+        'post_worker_init': _post_worker_init,
+        'worker_exit': _worker_exit
+    }
+
+def _post_worker_init(worker):
+    """Build services before the worker accepts requests so no client pays for it"""
+    import main
+    main.warmup()
+
+def _worker_exit(server, worker):
+    """Flush queued delivery reports before a worker exits or is reloaded"""
+    import main
+    main.shutdown()
+
+def run_development():
+    """Run the Werkzeug development server"""
+    from main import app
+    logger.info(f"Starting FruitGuard SMS development server on {Config.HOST}:{Config.PORT}")
+    app.run(host=Config.HOST, port=Config.PORT, debug=Config.DEBUG, threaded=True)
+
+def run_production():
+    """
+    Run the service under gunicorn
+
+    Send SIGHUP to the master process to gracefully reload workers with new
+    code and configuration, or SIGTERM for a graceful shutdown.
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        logger.warning("gunicorn is not installed (it does not run on Windows); "
+                       "falling back to the development server")
+        run_development()
+        return
+
+    class FruitGuardApplication(BaseApplication):
+        def load_config(self):
+            for key, value in production_options().items():
+                if value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+            return app
+
+    options = production_options()
+    logger.info(f"Starting FruitGuard SMS on {options['bind']} with {options['workers']} workers "
+                f"x {options['threads']} threads")
+    FruitGuardApplication().run()
+
+def run_asgi():
+    """Run the async API under uvicorn"""
+    import uvicorn
+    workers = worker_count()
+    logger.info(f"Starting FruitGuard SMS ASGI server on {Config.HOST}:{Config.PORT} with {workers} workers")
+    uvicorn.run(
+        'asgi:app',
+        host=Config.HOST,
+        port=Config.PORT,
+        workers=workers,
+        backlog=Config.BACKLOG,
+        timeout_keep_alive=Config.KEEPALIVE,
+        timeout_graceful_shutdown=Config.GRACEFUL_TIMEOUT,
+        log_level=Config.LOG_LEVEL.lower(),
+        access_log=Config.ACCESS_LOG
+    )
+
+def run(mode: str = None):
+    """
+    Run the service in the given mode
+
+    Args:
+        mode: 'production', 'asgi' or 'development' (defaults to Config.SERVER_MODE)
+    """
+    mode = mode or Config.SERVER_MODE
+    if mode == 'production':
+        run_production()
+    elif mode == 'asgi':
+        run_asgi()
+    else:
+        run_development()
@@ -0,0 +1,168 @@
+import asyncio
+import time
+from typing import Dict, List, Optional
+import httpx
+from config import Config
+from services.smsleopard_service import SMSLeopardService
+from utils.logger import setup_logger
+from utils.json_provider import dumps_bytes
+from utils.metrics import SEND_RECIPIENTS, SEND_RETRIES, observe_upstream
+
+logger = setup_logger(__name__)
+
+class AsyncSMSLeopardService(SMSLeopardService):
+    """Non-blocking SMSLeopard client for the ASGI app
+
+    Phone number validation and formatting are inherited unchanged; only the
+    upstream HTTP calls are async, over one pooled httpx.AsyncClient.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.api_url,
+                headers=self.headers,
+                timeout=30,
+                limits=httpx.Limits(
+                    max_connections=Config.ASYNC_MAX_CONNECTIONS,
+                    max_keepalive_connections=Config.ASYNC_MAX_KEEPALIVE
+                )
+            )
+        return self._client
+
+    async def send_sms(self,
+                       phone_numbers: List[str],
+                       message: str,
+                       sender_id: Optional[str] = None,
+                       schedule_time: Optional[str] = None) -> Dict:
+        """
+        Send SMS message(s) using SMSLeopard API without blocking the event loop
+
+        Args:
+            phone_numbers: List of phone numbers to send SMS to
+            message: The message content
+            sender_id: Custom sender ID (optional)
+            schedule_time: Schedule time in ISO format (optional)
+
+        Returns:
+            API response dictionary
+        """
+        if not self.api_key or not self.api_secret:
+            raise ValueError("SMSLeopard API key or API secret not configured")
+
+        if not phone_numbers:
+            raise ValueError("Phone numbers list cannot be empty")
+
+        if not message:
+            raise ValueError("Message cannot be empty")
+
+        payload = {
+            'source': sender_id or Config.DEFAULT_SENDER_ID,
+            'message': message,
+            'destination': [{"number": number} for number in phone_numbers]
+        }
+        if schedule_time:
+            payload['schedule_time'] = schedule_time
+        logger.info(f"Sending SMS to {len(phone_numbers)} recipients")
+        SEND_RECIPIENTS.observe(len(phone_numbers))
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await self.client.post('/sms/send', content=dumps_bytes(payload))
+            observe_upstream('/sms/send', started, response.status_code)
+            response.raise_for_status()
+            result = response.json()
+            logger.info(f"SMS sent successfully. Response status: {response.status_code}")
+            return result
+        except httpx.HTTPError as e:
+            if response is None:
+                observe_upstream('/sms/send', started)
+            logger.error(f"Failed to send SMS: {str(e)}")
+            raise
+
+    async def send_sms_with_retry(self,
+                                  phone_numbers: List[str],
+                                  message: str,
+                                  sender_id: Optional[str] = None,
+                                  max_retries: Optional[int] = None) -> Dict:
+        """
+        Send SMS with retry mechanism, sleeping without blocking the event loop
+
+        Args:
+            phone_numbers: List of phone numbers to send SMS to
+            message: The message content
+            sender_id: Custom sender ID (optional)
+            max_retries: Maximum number of retries (optional)
+
+        Returns:
+            API response dictionary
+        """
+        max_retries = max_retries or Config.MAX_RETRIES
+        for attempt in range(max_retries + 1):
+            try:
+                return await self.send_sms(phone_numbers, message, sender_id)
+            except Exception as e:
+                if attempt == max_retries:
+                    logger.error(f"Failed to send SMS after {max_retries} retries")
+                    raise
+                SEND_RETRIES.inc()
+                logger.warning(f"SMS send attempt {attempt + 1} failed, retrying in {Config.RETRY_DELAY}s")
+                await asyncio.sleep(Config.RETRY_DELAY)
+
+    async def get_sms_status(self, message_id: str) -> Dict:
+        """
+        Get SMS delivery status
+
+        Args:
+            message_id: The message ID to check
+
+        Returns:
+            Status information dictionary
+        """
+        if not self.api_key or not self.api_secret:
+            raise ValueError("SMSLeopard API key or API secret not configured")
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await self.client.get(f"/status/{message_id}")
+            observe_upstream('/status', started, response.status_code)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            if response is None:
+                observe_upstream('/status', started)
+            logger.error(f"Failed to get SMS status: {str(e)}")
+            raise
+
+    async def get_balance(self) -> Dict:
+        """
+        Get account balance
+
+        Returns:
+            Balance information dictionary
+        """
+        if not self.api_key or not self.api_secret:
+            raise ValueError("SMSLeopard API key or API secret not configured")
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await self.client.get('/balance')
+            observe_upstream('/balance', started, response.status_code)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            if response is None:
+                observe_upstream('/balance', started)
+            logger.error(f"Failed to get balance: {str(e)}")
+            raise
+
+    async def aclose(self):
+        """Close pooled upstream connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
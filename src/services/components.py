@@ -0,0 +1,179 @@
+"""
+Lazily constructed service singletons shared by the Flask and ASGI apps
+
+Nothing here is imported or built until first use, so importing the app stays
+cheap: `requests`, `httpx` and `sqlite3` are loaded, and the delivery report
+database and worker threads are started, on the first request that needs them
+(or in warmup(), which production workers call before accepting traffic).
+"""
+
+import threading
+from typing import Callable, Dict
+
+_instances: Dict[str, object] = {}
+_lock = threading.RLock()
+
+def _get(name: str, factory: Callable[[], object]):
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = _instances[name] = factory()
+    return instance
+
+def peek(name: str):
+    """Return a service if it has already been built, without building it"""
+    return _instances.get(name)
+
+def get_sms_service():
+    """Get the shared SMSLeopardService"""
+    def build():
+        from services.smsleopard_service import SMSLeopardService
+        return SMSLeopardService()
+    return _get('sms_service', build)
+
+def get_async_sms_service():
+    """Get the shared AsyncSMSLeopardService"""
+    def build():
+        from services.async_smsleopard_service import AsyncSMSLeopardService
+        return AsyncSMSLeopardService()
+    return _get('async_sms_service', build)
+
+def get_dr_store():
+    """Get the shared DeliveryReportStore"""
+    def build():
+        from services.delivery_report_store import DeliveryReportStore
+        return DeliveryReportStore()
+    return _get('dr_store', build)
+
+def get_status_cache():
+    """Get the shared StatusCache"""
+    def build():
+        from services.status_cache import StatusCache
+        return StatusCache()
+    return _get('status_cache', build)
+
+def get_delivery_analytics():
+    """Get the shared DeliveryAnalytics"""
+    def build():
+        from services.delivery_analytics import DeliveryAnalytics
+        return DeliveryAnalytics()
+    return _get('delivery_analytics', build)
+
+def get_dr_queue():
+    """Get the shared DeliveryReportQueue, wired to the status cache and analytics"""
+    def build():
+        from services.dr_ingest_queue import DeliveryReportQueue
+        queue = DeliveryReportQueue(get_dr_store())
+        queue.add_listener(get_status_cache().update_from_reports)
+        queue.add_listener(get_delivery_analytics().record_reports)
+        return queue
+    return _get('dr_queue', build)
+
+def get_job_store():
+    """Get the shared SendJobStore"""
+    def build():
+        from services.send_job_store import SendJobStore
+        return SendJobStore()
+    return _get('job_store', build)
+
+def send_alert_sms(phone_numbers, message, sender_id=None) -> bool:
+    """Send one alert through the SMS service, recording it like /sms/send does"""
+    from config import Config
+    sms_service = get_sms_service()
+    formatted_numbers = sms_service.format_phone_numbers(phone_numbers)
+    if not formatted_numbers:
+        # Retrying cannot fix invalid numbers. TelemetryProcessor drops and
+        # counts alerts for such groups before queueing them; this covers
+        # alerts queued without that check
+        from utils.logger import setup_logger
+        setup_logger(__name__).warning(f"Dropping alert, no valid phone numbers in {phone_numbers}: {message[:60]}")
+        return True
+    result = sms_service.send_sms(formatted_numbers, message, sender_id=sender_id)
+    get_status_cache().update_from_send_response(result)
+    get_delivery_analytics().record_send(result, sender_id or Config.DEFAULT_SENDER_ID, formatted_numbers)
+    return True
+
+def get_telemetry():
+    """Get the shared TelemetryProcessor, sending alerts through the SMS service
+
+    Every worker process builds its own processor on the same
+    TELEMETRY_QUEUE_PATH; the queue's senders claim rows before sending, so
+    each alert goes out once and queued alerts survive a worker restart.
+    """
+    def build():
+        from services.telemetry import TelemetryProcessor
+        return TelemetryProcessor(send_alert_sms,
+                                  format_numbers=lambda numbers: get_sms_service().format_phone_numbers(numbers))
+    return _get('telemetry', build)
+
+def get_profile_store():
+    """Get the shared ProfileStore"""
+    def build():
+        from utils.profiling import ProfileStore
+        return ProfileStore()
+    return _get('profile_store', build)
+
+def warmup():
+    """Build the synchronous services ahead of the first request"""
+    get_sms_service()
+    get_dr_queue()
+
+def shutdown():
+    """Flush telemetry alerts, drain the delivery report queue and close the databases, if they were opened"""
+    with _lock:
+        queue = _instances.pop('dr_queue', None)
+        store = _instances.pop('dr_store', None)
+        job_store = _instances.pop('job_store', None)
+        telemetry = _instances.pop('telemetry', None)
+    if telemetry is not None:
+        telemetry.close()
+    if queue is not None:
+        queue.close()
+    if store is not None:
+        store.close()
+    if job_store is not None:
+        job_store.close()
+
+async def ashutdown():
+    """Close the async upstream client, then run shutdown()"""
+    with _lock:
+        service = _instances.pop('async_sms_service', None)
+    if service is not None:
+        await service.aclose()
+    shutdown()
+
+def _stat(name: str, key: str, read=lambda instance: instance.stats()):
+    """Callback reading one stat from a service, or None if it was never built"""
+    def callback():
+        instance = peek(name)
+        return None if instance is None else read(instance)[key]
+    return callback
+
+def _register_service_metrics():
+    from utils.metrics import REGISTRY
+    gauges = [
+        ('fruitguard_dr_queue_depth', 'Delivery reports waiting in the ingestion queue', 'dr_queue', 'depth'),
+        ('fruitguard_status_cache_entries', 'Message statuses held in the cache', 'status_cache', 'entries'),
+        ('fruitguard_telemetry_queue_depth', 'Telemetry alerts waiting to be sent', 'telemetry', 'queue_depth')
+    ]
+    # Running totals kept by the services, exposed as counters
+    counters = [
+        ('fruitguard_dr_queue_dropped_total', 'Delivery reports rejected because the queue was full',
+         'dr_queue', 'dropped'),
+        ('fruitguard_dr_queue_stored_total', 'Delivery reports written to the store', 'dr_queue', 'stored'),
+        ('fruitguard_status_cache_hits_total', 'Status lookups answered from the cache', 'status_cache', 'hits'),
+        ('fruitguard_status_cache_misses_total', 'Status lookups not found in the cache', 'status_cache', 'misses'),
+        ('fruitguard_telemetry_readings_total', 'Telemetry readings accepted', 'telemetry', 'accepted'),
+        ('fruitguard_telemetry_alerts_total', 'Alerts raised by telemetry readings', 'telemetry', 'alerts')
+    ]
+    for metric, help_text, name, key in gauges:
+        REGISTRY.gauge_callback(metric, help_text, _stat(name, key))
+    for metric, help_text, name, key in counters:
+        REGISTRY.counter_callback(metric, help_text, _stat(name, key))
+    REGISTRY.gauge_callback(
+        'fruitguard_delivery_pending', 'Sent messages awaiting a final delivery report',
+        _stat('delivery_analytics', 'pending', lambda analytics: analytics.snapshot(last=0)['totals']))
+
+_register_service_metrics()
@@ -0,0 +1,207 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import Config
+from services.status_cache import extract_message_statuses
+
+# Upper bounds (seconds) of the send-to-delivery latency histogram buckets
+LATENCY_BUCKETS = (1, 2, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+DELIVERED_STATUSES = frozenset({'delivered', 'success'})
+FAILED_STATUSES = frozenset({'failed', 'rejected', 'expired', 'undelivered'})
+
+SENT, DELIVERED, FAILED = 0, 1, 2
+
+def _build_operator_prefixes() -> Dict[str, str]:
+    """Map the three digits after 254 to a Kenyan mobile operator"""
+    ranges = {
+        'safaricom': [(700, 729), (740, 746), (748, 748), (757, 759), (768, 769), (790, 799), (110, 115)],
+        'airtel': [(730, 739), (750, 756), (762, 762), (780, 789), (100, 102)],
+        'telkom': [(770, 779)]
+    }
+    prefixes = {}
+    for operator, spans in ranges.items():
+        for start, end in spans:
+            for code in range(start, end + 1):
+                prefixes[str(code)] = operator
+    return prefixes
+
+OPERATOR_PREFIXES = _build_operator_prefixes()
+
+def operator_for_number(phone_number: Optional[str]) -> str:
+    """
+    Identify the mobile operator of a Kenyan phone number
+
+    Args:
+        phone_number: Phone number in any format accepted by format_phone_numbers
+
+    Returns:
+        Operator name, or 'other' if it cannot be determined
+    """
+    if not phone_number:
+        return 'other'
+    digits = ''.join(filter(str.isdigit, str(phone_number)))
+    if digits.startswith('254'):
+        digits = digits[3:]
+    elif digits.startswith('0'):
+        digits = digits[1:]
+    if len(digits) != 9:
+        return 'other'
+    return OPERATOR_PREFIXES.get(digits[:3], 'other')
+
+class _Rollup:
+    """Fixed-retention time buckets of [sent, delivered, failed] counts per dimension"""
+
+    def __init__(self, width: int, retention: int):
+        self.width = width
+        self.retention = retention
+        self.buckets: Dict[int, Dict[Tuple[str, str], List[int]]] = {}
+        self.order: "deque[int]" = deque()
+
+    def add(self, now: float, keys: Tuple[Tuple[str, str], ...], field: int, amount: int):
+        start = int(now) - int(now) % self.width
+        bucket = self.buckets.get(start)
+        if bucket is None:
+            if self.order and start < self.order[0]:
+                return  # Older than anything retained
+            bucket = self.buckets[start] = {}
+            if not self.order or start > self.order[-1]:
+                self.order.append(start)
+            else:
+                insort(self.order, start)
+            while len(self.order) > self.retention:
+                del self.buckets[self.order.popleft()]
+        for key in keys:
+            counts = bucket.get(key)
+            if counts is None:
+                counts = bucket[key] = [0, 0, 0]
+            counts[field] += amount
+
+    def snapshot(self, last: int) -> List[Dict]:
+        result = []
+        for start in (islice(self.order, max(len(self.order) - last, 0), None) if last > 0 else []):
+            dimensions: Dict[str, Dict[str, Dict[str, int]]] = {'sender_id': {}, 'operator': {}}
+            for (dimension, value), (sent, delivered, failed) in self.buckets[start].items():
+                dimensions[dimension][value] = {'sent': sent, 'delivered': delivered, 'failed': failed}
+            result.append({'start': start, **dimensions})
+        return result
+
+class DeliveryAnalytics:
+    """Incremental delivery rollups and send-to-delivery latency histogram"""
+
+    def __init__(self,
+                 minute_retention: Optional[int] = None,
+                 hour_retention: Optional[int] = None,
+                 max_pending: Optional[int] = None):
+        self._minutes = _Rollup(60, minute_retention or Config.ANALYTICS_MINUTE_RETENTION)
+        self._hours = _Rollup(3600, hour_retention or Config.ANALYTICS_HOUR_RETENTION)
+        self.max_pending = max_pending or Config.ANALYTICS_MAX_PENDING
+        # message_id -> (sent_at, sender_id, operator) for messages awaiting a final report
+        self._pending: "OrderedDict[str, Tuple[float, str, str]]" = OrderedDict()
+        self._latency_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self._latency_sum = 0.0
+        self._totals = [0, 0, 0]
+        self._lock = threading.Lock()
+
+    def _count(self, now: float, sender_id: str, operator: str, field: int, amount: int = 1):
+        keys = (('sender_id', sender_id), ('operator', operator))
+        self._minutes.add(now, keys, field, amount)
+        self._hours.add(now, keys, field, amount)
+        self._totals[field] += amount
+
+    def record_send(self, result: Dict, sender_id: str, phone_numbers: Iterable[str],
+                    sent_at: Optional[float] = None):
+        """
+        Count a successful send and start latency tracking for its messages
+
+        Args:
+            result: Response dictionary returned by SMSLeopard /sms/send
+            sender_id: Sender ID the message was sent with
+            phone_numbers: Formatted recipient phone numbers
+            sent_at: Epoch seconds of the send (defaults to now)
+        """
+        now = sent_at if sent_at is not None else time.time()
+        operators: Dict[str, int] = {}
+        for number in phone_numbers:
+            operator = operator_for_number(number)
+            operators[operator] = operators.get(operator, 0) + 1
+        entries = extract_message_statuses(result)
+        with self._lock:
+            for operator, count in operators.items():
+                self._count(now, sender_id, operator, SENT, count)
+            for entry in entries:
+                self._pending[entry['message_id']] = (now, sender_id, operator_for_number(entry['to']))
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+
+    def record_reports(self, reports: Iterable[Dict]):
+        """
+        Count final delivery outcomes from delivery report payloads
+
+        Args:
+            reports: Delivery report payloads
+        """
+        now = time.time()
+        with self._lock:
+            for report in reports:
+                status = str(report.get('status') or '').lower()
+                if status in DELIVERED_STATUSES:
+                    field = DELIVERED
+                elif status in FAILED_STATUSES:
+                    field = FAILED
+                else:
+                    continue
+                pending = self._pending.pop(str(report.get('message_id')), None)
+                if pending is not None:
+                    sent_at, sender_id, operator = pending
+                    if field == DELIVERED:
+                        latency = max(now - sent_at, 0.0)
+                        self._latency_counts[bisect_left(LATENCY_BUCKETS, latency)] += 1
+                        self._latency_sum += latency
+                else:
+                    sender_id = 'unknown'
+                    operator = operator_for_number(report.get('to'))
+                self._count(now, sender_id, operator, field)
+
+    def snapshot(self, granularity: str = 'minute', last: int = 60) -> Dict:
+        """
+        Get rollups, totals and the latency histogram
+
+        Args:
+            granularity: 'minute' or 'hour'
+            last: Number of most recent buckets to return
+
+        Returns:
+            Analytics dictionary
+        """
+        rollup = self._hours if granularity == 'hour' else self._minutes
+        with self._lock:
+            buckets = rollup.snapshot(last)
+            sent, delivered, failed = self._totals
+            counts = list(self._latency_counts)
+            latency_sum = self._latency_sum
+            pending = len(self._pending)
+        histogram = []
+        cumulative = 0
+        for bound, count in zip(list(LATENCY_BUCKETS) + ['+Inf'], counts):
+            cumulative += count
+            histogram.append({'le': bound, 'count': cumulative})
+        return {
+            'granularity': 'hour' if granularity == 'hour' else 'minute',
+            'totals': {
+                'sent': sent,
+                'delivered': delivered,
+                'failed': failed,
+                'pending': pending,
+                'delivery_rate': round(delivered / sent, 4) if sent else 0.0
+            },
+            'latency_seconds': {
+                'buckets': histogram,
+                'count': cumulative,
+                'sum': round(latency_sum, 3)
+            },
+            'buckets': buckets
+        }
@@ -0,0 +1,231 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import Config
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS delivery_reports (
+    id INTEGER PRIMARY KEY,
+    message_id TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT '',
+    recipient TEXT NOT NULL DEFAULT '',
+    reported_at TEXT,
+    received_at REAL NOT NULL,
+    payload TEXT,
+    UNIQUE (message_id, recipient, status)
+);
+CREATE INDEX IF NOT EXISTS idx_delivery_reports_recipient
+    ON delivery_reports (recipient, received_at);
+CREATE INDEX IF NOT EXISTS idx_delivery_reports_received_at
+    ON delivery_reports (received_at);
+"""
+
+COLUMNS = ('message_id', 'status', 'recipient', 'reported_at', 'received_at', 'payload')
+
+def normalize_report(payload: Dict, received_at: Optional[float] = None) -> Optional[Tuple]:
+    """
+    Convert a delivery report payload into a database row
+
+    Args:
+        payload: Delivery report JSON payload from SMSLeopard
+        received_at: Epoch seconds the report was received (defaults to now)
+
+    Returns:
+        Row tuple, or None if the payload has no message ID
+    """
+    if not isinstance(payload, dict):
+        return None
+    message_id = payload.get('message_id')
+    if not message_id:
+        return None
+    return (
+        str(message_id),
+        str(payload.get('status') or ''),
+        str(payload.get('to') or ''),
+        payload.get('timestamp'),
+        received_at if received_at is not None else time.time(),
+        json.dumps(payload, separators=(',', ':'))
+    )
+
+class DeliveryReportStore:
+    """Embedded SQLite store for delivery reports with group commit"""
+
+    def __init__(self,
+                 db_path: Optional[str] = None,
+                 batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None):
+        self.db_path = db_path or Config.DR_DB_PATH
+        self.batch_size = batch_size or Config.DR_BATCH_SIZE
+        self.flush_interval = flush_interval or Config.DR_FLUSH_INTERVAL
+
+        # A single connection shared by all threads; access is serialized by _db_lock
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        if self.db_path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+        self._pending: List[Tuple] = []
+        self._pending_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._closed = threading.Event()
+
+        # Commit trickle traffic that never fills a whole batch
+        self._flusher = threading.Thread(target=self._flush_loop, name='dr-store-flusher', daemon=True)
+        self._flusher.start()
+
+    def add(self, payload: Dict) -> bool:
+        """
+        Queue a delivery report for the next group commit
+
+        Args:
+            payload: Delivery report JSON payload
+
+        Returns:
+            True if the report was queued, False if it was not a valid report
+        """
+        row = normalize_report(payload)
+        if row is None:
+            return False
+        with self._pending_lock:
+            self._pending.append(row)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+        return True
+
+    def add_many(self, payloads: Iterable[Dict]) -> Tuple[List[Dict], int]:
+        """
+        Insert delivery reports immediately in a single transaction
+
+        Args:
+            payloads: Iterable of delivery report payloads
+
+        Returns:
+            Tuple of (payloads that were new and inserted, duplicates); invalid
+            payloads are skipped
+        """
+        valid = []
+        rows = []
+        for payload in payloads:
+            row = normalize_report(payload)
+            if row is not None:
+                valid.append(payload)
+                rows.append(row)
+        inserted = self._write_batch(rows)
+        return [valid[i] for i in inserted], len(rows) - len(inserted)
+
+    def flush(self) -> int:
+        """
+        Commit all queued delivery reports in one transaction
+
+        Returns:
+            Number of new reports written
+        """
+        with self._pending_lock:
+            rows, self._pending = self._pending, []
+        return len(self._write_batch(rows))
+
+    def _write_batch(self, rows: List[Tuple]) -> List[int]:
+        """Insert rows in one transaction; returns the indexes of the rows that were not duplicates"""
+        if not rows:
+            return []
+        sql = (f"INSERT OR IGNORE INTO delivery_reports ({', '.join(COLUMNS)}) "
+               f"VALUES ({', '.join('?' * len(COLUMNS))})")
+        with self._db_lock:
+            try:
+                self._conn.execute('BEGIN')
+                # One statement per row so each row's rowcount tells whether it was new
+                cursor = self._conn.cursor()
+                inserted = [i for i, row in enumerate(rows) if cursor.execute(sql, row).rowcount]
+                self._conn.execute('COMMIT')
+            except sqlite3.Error as e:
+                self._conn.execute('ROLLBACK')
+                logger.error(f"Failed to store {len(rows)} delivery reports: {str(e)}")
+                raise
+        logger.debug(f"Committed {len(inserted)} delivery reports ({len(rows) - len(inserted)} duplicates)")
+        return inserted
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Background delivery report flush failed: {str(e)}")
+
+    def _query(self, sql: str, params: Tuple) -> List[Dict]:
+        self.flush()
+        with self._db_lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        reports = []
+        for row in rows:
+            report = dict(zip(COLUMNS, row))
+            report['payload'] = json.loads(report['payload']) if report['payload'] else None
+            reports.append(report)
+        return reports
+
+    def get_by_message_id(self, message_id: str) -> List[Dict]:
+        """
+        Get all delivery reports for a message, oldest first
+
+        Args:
+            message_id: The message ID to look up
+
+        Returns:
+            List of delivery report dictionaries
+        """
+        return self._query(
+            f"SELECT {', '.join(COLUMNS)} FROM delivery_reports "
+            "WHERE message_id = ? ORDER BY received_at",
+            (str(message_id),)
+        )
+
+    def get_by_recipient(self, recipient: str, since: float = 0.0, limit: int = 100) -> List[Dict]:
+        """
+        Get the most recent delivery reports for a recipient
+
+        Args:
+            recipient: Recipient phone number as reported by SMSLeopard
+            since: Only return reports received after this epoch time
+            limit: Maximum number of reports to return
+
+        Returns:
+            List of delivery report dictionaries, newest first
+        """
+        return self._query(
+            f"SELECT {', '.join(COLUMNS)} FROM delivery_reports "
+            "WHERE recipient = ? AND received_at >= ? ORDER BY received_at DESC LIMIT ?",
+            (recipient, since, limit)
+        )
+
+    def get_between(self, start: float, end: float, limit: int = 1000) -> List[Dict]:
+        """
+        Get delivery reports received within a time range
+
+        Args:
+            start: Range start in epoch seconds (inclusive)
+            end: Range end in epoch seconds (exclusive)
+            limit: Maximum number of reports to return
+
+        Returns:
+            List of delivery report dictionaries, oldest first
+        """
+        return self._query(
+            f"SELECT {', '.join(COLUMNS)} FROM delivery_reports "
+            "WHERE received_at >= ? AND received_at < ? ORDER BY received_at LIMIT ?",
+            (start, end, limit)
+        )
+
+    def close(self):
+        """Flush pending reports and close the database"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
@@ -0,0 +1,192 @@
+import queue
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from config import Config
+from services.delivery_report_store import DeliveryReportStore
+from utils.logger import setup_logger
+from utils.json_stream import MALFORMED
+from utils.json_provider import loads
+
+logger = setup_logger(__name__)
+
+class DeliveryReportQueue:
+    """Bounded in-process queue that lets /dr ack before reports are persisted"""
+
+    def __init__(self,
+                 store: DeliveryReportStore,
+                 maxsize: Optional[int] = None,
+                 batch_size: Optional[int] = None):
+        self.store = store
+        self.maxsize = maxsize or Config.DR_QUEUE_SIZE
+        self.batch_size = batch_size or Config.DR_QUEUE_BATCH_SIZE
+        self._queue = queue.Queue(self.maxsize)
+        self._listeners: List[Callable[[List[Dict]], None]] = []
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'enqueued': 0,
+            'dropped': 0,
+            'processed': 0,
+            'stored': 0,
+            'duplicates': 0,
+            'malformed': 0,
+            'batches': 0,
+            'errors': 0,
+            'high_water_mark': 0
+        }
+        self._closed = threading.Event()
+        self._worker = threading.Thread(target=self._run, name='dr-ingest-worker', daemon=True)
+        self._worker.start()
+
+    def add_listener(self, callback: Callable[[List[Dict]], None]):
+        """
+        Register a callback that receives each batch after it is persisted
+
+        Args:
+            callback: Function called with the payloads that were newly stored;
+                duplicates of stored reports are left out
+        """
+        self._listeners.append(callback)
+
+    def submit(self, raw: bytes) -> bool:
+        """
+        Enqueue a raw delivery report body without parsing it
+
+        Args:
+            raw: Request body as received by the webhook
+
+        Returns:
+            True if queued, False if the queue is full and the report was dropped
+        """
+        try:
+            self._queue.put_nowait(raw)
+        except queue.Full:
+            self._incr('dropped')
+            return False
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._stats['enqueued'] += 1
+            if depth > self._stats['high_water_mark']:
+                self._stats['high_water_mark'] = depth
+        return True
+
+    def _incr(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _next_batch(self) -> List[bytes]:
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _parse(self, batch: List[bytes]) -> List[Dict]:
+        reports = []
+        for raw in batch:
+            try:
+                payload = loads(raw)
+            except ValueError:
+                self._incr('malformed')
+                continue
+            items = payload if isinstance(payload, list) else [payload]
+            for item in items:
+                if isinstance(item, dict) and item.get('message_id'):
+                    reports.append(item)
+                else:
+                    self._incr('malformed')
+        return reports
+
+    def _run(self):
+        while not (self._closed.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                reports = self._parse(batch)
+                self.process(reports)
+            except Exception as e:
+                self._incr('errors')
+                logger.error(f"Failed to persist {len(batch)} delivery reports: {str(e)}")
+            finally:
+                self._incr('batches')
+                for _ in batch:
+                    self._queue.task_done()
+
+    def process(self, reports: List[Dict]) -> Tuple[int, int]:
+        """
+        Persist a parsed batch of delivery reports and notify listeners of the new ones
+
+        Args:
+            reports: Delivery report payloads that carry a message ID
+
+        Returns:
+            Tuple of (inserted, duplicates)
+        """
+        stored, duplicates = self.store.add_many(reports)
+        with self._stats_lock:
+            self._stats['processed'] += len(reports)
+            self._stats['stored'] += len(stored)
+            self._stats['duplicates'] += duplicates
+        logger.debug(f"Persisted {len(stored)} delivery reports ({duplicates} duplicates)")
+        if stored:
+            for callback in self._listeners:
+                callback(stored)
+        return len(stored), duplicates
+
+    def ingest(self, items: Iterable[object], batch_size: Optional[int] = None) -> Dict:
+        """
+        Synchronously persist a stream of parsed reports in large transactions
+
+        Args:
+            items: Parsed values from utils.json_stream (may include MALFORMED)
+            batch_size: Reports per transaction (defaults to DR_BULK_BATCH_SIZE)
+
+        Returns:
+            Dictionary of received, accepted, duplicates and malformed counts
+        """
+        batch_size = batch_size or Config.DR_BULK_BATCH_SIZE
+        counts = {'received': 0, 'accepted': 0, 'duplicates': 0, 'malformed': 0}
+        batch = []
+        for item in items:
+            counts['received'] += 1
+            if item is MALFORMED or not isinstance(item, dict) or not item.get('message_id'):
+                counts['malformed'] += 1
+                continue
+            batch.append(item)
+            if len(batch) >= batch_size:
+                inserted, duplicates = self.process(batch)
+                counts['accepted'] += inserted
+                counts['duplicates'] += duplicates
+                batch = []
+        if batch:
+            inserted, duplicates = self.process(batch)
+            counts['accepted'] += inserted
+            counts['duplicates'] += duplicates
+        return counts
+
+    def join(self):
+        """Block until every queued report has been processed"""
+        self._queue.join()
+
+    def stats(self) -> Dict:
+        """
+        Get queue counters
+
+        Returns:
+            Dictionary of ingestion counters plus current depth and capacity
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['depth'] = self._queue.qsize()
+        stats['capacity'] = self.maxsize
+        return stats
+
+    def close(self):
+        """Stop accepting work once the queue has drained"""
+        self._closed.set()
+        self._worker.join(timeout=5)
@@ -0,0 +1,148 @@
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from typing import Dict, Optional
+from config import Config
+from utils.json_provider import dumps_bytes, loads
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS send_jobs (
+    job_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    sender_id TEXT,
+    recipients INTEGER NOT NULL,
+    summary BLOB NOT NULL,
+    result BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_send_jobs_created_at
+    ON send_jobs (created_at);
+"""
+
+FAILED_STATUSES = frozenset({'failed', 'rejected', 'undeliverable', 'invalid', 'error', 'blacklisted'})
+
+PRUNE_INTERVAL = 60  # seconds between retention sweeps
+
+def summarize_send_result(result: Dict, requested: int, formatted: int) -> Dict:
+    """
+    Reduce a provider send response to counts, message IDs and failures
+
+    Args:
+        result: Response dictionary returned by SMSLeopard /sms/send
+        requested: Number of phone numbers in the request
+        formatted: Number of them that passed formatting and validation
+
+    Returns:
+        Summary dictionary
+    """
+    recipients = [r for r in (result.get('recipients') or []) if isinstance(r, dict)] \
+        if isinstance(result, dict) else []
+    message_ids = []
+    failed = []
+    cost = 0.0
+    for recipient in recipients:
+        message_id = recipient.get('id') or recipient.get('message_id')
+        status = str(recipient.get('status') or '').lower()
+        if message_id and status not in FAILED_STATUSES:
+            message_ids.append(str(message_id))
+        else:
+            failed.append({
+                'number': recipient.get('number') or recipient.get('to'),
+                'status': status or 'unknown',
+                'reason': recipient.get('reason') or recipient.get('message')
+            })
+        try:
+            cost += float(recipient.get('cost') or 0)
+        except (TypeError, ValueError):
+            pass
+    if not recipients and isinstance(result, dict) and result.get('message_id'):
+        message_ids.append(str(result['message_id']))
+    return {
+        'requested': requested,
+        'invalid_numbers': requested - formatted,
+        'submitted': formatted,
+        'accepted': len(message_ids),
+        'failed': len(failed),
+        'cost': round(cost, 4),
+        'message_ids': message_ids,
+        'failed_recipients': failed
+    }
+
+class SendJobStore:
+    """SQLite store for the full provider response of summary-mode sends"""
+
+    def __init__(self, db_path: Optional[str] = None, retention: Optional[float] = None):
+        self.db_path = db_path or Config.JOB_DB_PATH
+        self.retention = retention if retention is not None else Config.JOB_RETENTION_HOURS * 3600
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        if self.db_path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        self._closed = False
+
+    def save(self, result: Dict, summary: Dict, sender_id: Optional[str] = None) -> str:
+        """
+        Store a send result and its summary
+
+        Args:
+            result: Full provider response
+            summary: Output of summarize_send_result()
+            sender_id: Sender ID used for the send
+
+        Returns:
+            Job ID
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        # Per-recipient responses are repetitive JSON and compress well
+        row = (job_id, now, sender_id, summary['submitted'],
+               zlib.compress(dumps_bytes(summary), 1), zlib.compress(dumps_bytes(result), 1))
+        with self._lock:
+            self._conn.execute('INSERT INTO send_jobs VALUES (?, ?, ?, ?, ?, ?)', row)
+            if self.retention > 0 and now - self._last_prune >= PRUNE_INTERVAL:
+                self._last_prune = now
+                deleted = self._conn.execute('DELETE FROM send_jobs WHERE created_at < ?',
+                                             (now - self.retention,)).rowcount
+                if deleted:
+                    logger.info(f"Pruned {deleted} send jobs older than {self.retention}s")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Get a stored job with its full provider response
+
+        Args:
+            job_id: ID returned by save()
+
+        Returns:
+            Job dictionary, or None if it does not exist or has expired
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT created_at, sender_id, summary, result FROM send_jobs WHERE job_id = ?',
+                (job_id,)).fetchone()
+        if row is None:
+            return None
+        created_at, sender_id, summary, result = row
+        return {
+            'job_id': job_id,
+            'created_at': created_at,
+            'sender_id': sender_id,
+            'summary': loads(zlib.decompress(summary)),
+            'data': loads(zlib.decompress(result))
+        }
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._conn.close()
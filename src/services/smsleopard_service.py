@@ -4,6 +4,9 @@ import re
 from typing import Dict, List, Optional, Tuple
 from config import Config
 from utils.logger import setup_logger
+from utils.json_provider import dumps_bytes
+from utils.metrics import SEND_RECIPIENTS, SEND_RETRIES, observe_upstream
+from utils.profiling import stage
 
 logger = setup_logger(__name__)
 
@@ -65,32 +68,45 @@ class SMSLeopardService:
             raise ValueError("Message cannot be empty")
         
         # SMSLeopard API payload format
-        destinations = [{"number": number} for number in phone_numbers]
-        payload = {
-            'source': sender_id or Config.DEFAULT_SENDER_ID,
-            'message': message,
-            'destination': destinations
-        }
-        if schedule_time:
-            payload['schedule_time'] = schedule_time
-        logger.info(f"Sending SMS to {len(phone_numbers)} recipients")
-        logger.info(f"API URL: {self.api_url}/sms/send")
-        logger.info(f"Headers: {self.headers}")
-        logger.info(f"Payload: {payload}")
+        with stage('build_payload'):
+            destinations = [{"number": number} for number in phone_numbers]
+            payload = {
+                'source': sender_id or Config.DEFAULT_SENDER_ID,
+                'message': message,
+                'destination': destinations
+            }
+            if schedule_time:
+                payload['schedule_time'] = schedule_time
+        with stage('log_request'):
+            logger.info(f"Sending SMS to {len(phone_numbers)} recipients")
+            logger.info(f"API URL: {self.api_url}/sms/send")
+            logger.info(f"Headers: {self.headers}")
+            logger.info(f"Payload: {payload}")
+        SEND_RECIPIENTS.observe(len(phone_numbers))
+        with stage('encode_payload'):
+            body = dumps_bytes(payload)
+        started = time.perf_counter()
+        response = None
         try:
-            response = requests.post(
-                f"{self.api_url}/sms/send",
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
+            with stage('upstream_call'):
+                response = requests.post(
+                    f"{self.api_url}/sms/send",
+                    headers=self.headers,
+                    data=body,
+                    timeout=30
+                )
+            observe_upstream('/sms/send', started, response.status_code)
             response.raise_for_status()
-            result = response.json()
-            logger.info(f"Response status: {response.status_code}")
-            logger.info(f"Response headers: {dict(response.headers)}")
-            logger.info(f"SMS sent successfully. Response: {result}")
+            with stage('decode_response'):
+                result = response.json()
+            with stage('log_response'):
+                logger.info(f"Response status: {response.status_code}")
+                logger.info(f"Response headers: {dict(response.headers)}")
+                logger.info(f"SMS sent successfully. Response: {result}")
             return result
         except requests.exceptions.RequestException as e:
+            if response is None:
+                observe_upstream('/sms/send', started)
             logger.error(f"Failed to send SMS: {str(e)}")
             raise
     
@@ -119,6 +135,7 @@ class SMSLeopardService:
                 if attempt == max_retries:
                     logger.error(f"Failed to send SMS after {max_retries} retries")
                     raise
+                SEND_RETRIES.inc()
                 logger.warning(f"SMS send attempt {attempt + 1} failed, retrying in {Config.RETRY_DELAY}s")
                 time.sleep(Config.RETRY_DELAY)
     
@@ -134,15 +151,20 @@ class SMSLeopardService:
         """
         if not self.api_key or not self.api_secret:
             raise ValueError("SMSLeopard API key or API secret not configured")
+        started = time.perf_counter()
+        response = None
         try:
             response = requests.get(
                 f"{self.api_url}/status/{message_id}",
                 headers=self.headers,
                 timeout=30
             )
+            observe_upstream('/status', started, response.status_code)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
+            if response is None:
+                observe_upstream('/status', started)
             logger.error(f"Failed to get SMS status: {str(e)}")
             raise
     
@@ -155,15 +177,20 @@ class SMSLeopardService:
         """
         if not self.api_key or not self.api_secret:
             raise ValueError("SMSLeopard API key or API secret not configured")
+        started = time.perf_counter()
+        response = None
         try:
             response = requests.get(
                 f"{self.api_url}/balance",
                 headers=self.headers,
                 timeout=30
             )
+            observe_upstream('/balance', started, response.status_code)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
+            if response is None:
+                observe_upstream('/balance', started)
             logger.error(f"Failed to get balance: {str(e)}")
             raise
     
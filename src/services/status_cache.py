@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+from config import Config
+
+# Statuses after which SMSLeopard never reports another update
+TERMINAL_STATUSES = frozenset({'delivered', 'failed', 'rejected', 'expired', 'undelivered'})
+
+def extract_message_statuses(result: Dict) -> List[Dict]:
+    """
+    Pull per-message status entries out of a send response
+
+    Args:
+        result: Response dictionary returned by SMSLeopard /sms/send
+
+    Returns:
+        List of dictionaries with message_id, status and to keys
+    """
+    if not isinstance(result, dict):
+        return []
+    entries = []
+    if result.get('message_id'):
+        entries.append({
+            'message_id': str(result['message_id']),
+            'status': result.get('status') or 'sent',
+            'to': result.get('to')
+        })
+    for recipient in result.get('recipients') or []:
+        if not isinstance(recipient, dict):
+            continue
+        message_id = recipient.get('id') or recipient.get('message_id')
+        if message_id:
+            entries.append({
+                'message_id': str(message_id),
+                'status': recipient.get('status') or 'sent',
+                'to': recipient.get('number') or recipient.get('to')
+            })
+    return entries
+
+def status_entry(message_id: str, data) -> Dict:
+    """
+    The status of one message in the shape /sms/status returns
+
+    Cache hits (delivery reports, send responses) and upstream /status
+    responses carry different fields; both are reduced to this one shape.
+
+    Args:
+        message_id: The message ID looked up
+        data: Delivery report payload, send response entry or upstream status response
+
+    Returns:
+        Dictionary with message_id, status and to (None when not known)
+    """
+    data = data if isinstance(data, dict) else {}
+    return {
+        'message_id': str(data.get('message_id') or data.get('id') or message_id),
+        'status': data.get('status') or None,
+        'to': data.get('to') or data.get('number') or None
+    }
+
+class StatusCache:
+    """Bounded in-memory index of the latest known status per message"""
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else Config.STATUS_CACHE_TTL
+        self.max_entries = max_entries or Config.STATUS_CACHE_SIZE
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stale': 0, 'updates': 0, 'upstream_calls': 0}
+
+    def update(self, message_id: str, data: Dict):
+        """
+        Record the latest known status for a message
+
+        Args:
+            message_id: The message ID
+            data: Status dictionary for this message, kept as status_entry()
+        """
+        data = status_entry(message_id, data)
+        with self._lock:
+            self._entries[message_id] = (time.monotonic(), data)
+            self._entries.move_to_end(message_id)
+            self._stats['updates'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def update_from_reports(self, reports: Iterable[Dict]):
+        """Record statuses carried by delivery report payloads"""
+        for report in reports:
+            message_id = report.get('message_id')
+            if message_id:
+                self.update(str(message_id), report)
+
+    def update_from_send_response(self, result: Dict):
+        """Record the initial status of every message in a send response"""
+        for entry in extract_message_statuses(result):
+            self.update(entry['message_id'], entry)
+
+    def get(self, message_id: str) -> Optional[Dict]:
+        """
+        Get a cached status if it is still fresh
+
+        Terminal statuses never go stale; anything else is served for at most
+        ``ttl`` seconds after it was recorded.
+
+        Args:
+            message_id: The message ID to look up
+
+        Returns:
+            Cached status_entry() dictionary, or None on a miss or stale entry
+        """
+        with self._lock:
+            entry = self._entries.get(message_id)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            recorded_at, data = entry
+            status = str(data.get('status') or '').lower()
+            if status not in TERMINAL_STATUSES and time.monotonic() - recorded_at > self.ttl:
+                self._stats['stale'] += 1
+                return None
+            self._entries.move_to_end(message_id)
+            self._stats['hits'] += 1
+            return data
+
+    def record_upstream_call(self):
+        """Count a status lookup that had to go to SMSLeopard"""
+        with self._lock:
+            self._stats['upstream_calls'] += 1
+
+    def stats(self) -> Dict:
+        """
+        Get cache counters
+
+        Returns:
+            Dictionary of hit/miss counters; upstream_calls_saved equals hits
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        stats['upstream_calls_saved'] = stats['hits']
+        lookups = stats['hits'] + stats['misses'] + stats['stale']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
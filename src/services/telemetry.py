@@ -0,0 +1,327 @@
+"""
+Server-side sensor telemetry ingestion
+
+Readings posted to /telemetry are parsed incrementally, collected into
+columns of TELEMETRY_BATCH_SIZE and evaluated against the compiled alert
+rules (iot.rules: the built-in rules, or TELEMETRY_RULES_PATH) with each
+device's thresholds, using the same code the IoT client uses (iot.rules,
+iot.registry, iot.debounce). A rules file is checked for changes before each
+request and reloaded without a restart. Alerts are coalesced per recipient and handed to a disk-backed
+background queue that sends them through the SMS service, so ingestion never
+waits on SMSLeopard.
+
+Recipient groups and device settings are kept in a SQLite file
+(TELEMETRY_CONFIG_PATH) shared by every worker process: a change made through
+one worker is picked up by the others before their next batch, and survives
+a restart.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from config import Config
+from iot.coalescer import AlertCoalescer
+from iot.debounce import AlertDebouncer
+from iot.registry import DEFAULT_GROUP, DeviceRegistry
+from iot.rules import DEFAULT_RULES, RuleSet, compile_rules, load_rules
+from iot.sender import BackgroundAlertSender
+from services.telemetry_config_store import TelemetryConfigStore
+from utils.json_stream import MALFORMED
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+NAN = float('nan')
+
+def _number(value) -> float:
+    """A reading value as float, NaN when absent; raises ValueError when not numeric"""
+    if value is None:
+        return NAN
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"Not a number: {value!r}")
+    return float(value)
+
+def _reading_fields(rules: RuleSet) -> Tuple[Tuple[str, bool], ...]:
+    """(metric, is_flag) for each metric the rules check; a flag metric only has "true" rules"""
+    return tuple((metric, all(rule.op == 'true' for rule in rules.rules if rule.metric == metric))
+                 for metric in rules.metrics)
+
+class TelemetryProcessor:
+    """Evaluates device readings and queues the resulting alerts for sending"""
+
+    def __init__(self,
+                 send_fn: Callable[[List[str], str], bool],
+                 batch_size: Optional[int] = None,
+                 coalesce_window: Optional[float] = None,
+                 queue_path: Optional[str] = None,
+                 queue_size: Optional[int] = None,
+                 min_interval: Optional[float] = None,
+                 recipients: Optional[List[str]] = None,
+                 config_path: Optional[str] = None,
+                 rules=None,
+                 rules_check_interval: float = 5.0,
+                 format_numbers: Optional[Callable[[List[str]], List[str]]] = None):
+        """
+        Args:
+            send_fn: Called as send_fn(phone_numbers, message) from the queue worker;
+                returns True once sent
+            batch_size: Readings evaluated together (defaults to TELEMETRY_BATCH_SIZE)
+            coalesce_window: Seconds alerts are held per recipient (defaults to
+                TELEMETRY_COALESCE_WINDOW)
+            queue_path: SQLite file of the outgoing alert queue (defaults to TELEMETRY_QUEUE_PATH)
+            queue_size: Most queued alerts (defaults to TELEMETRY_QUEUE_SIZE)
+            min_interval: Seconds before an alert repeats for a device (defaults to
+                TELEMETRY_MIN_INTERVAL)
+            recipients: Phone numbers of the default group unless one is stored
+                (defaults to TELEMETRY_RECIPIENTS)
+            config_path: SQLite file of the groups and device settings (defaults to
+                TELEMETRY_CONFIG_PATH)
+            rules: Alert rules (see iot/rules.py) as a list of rule dictionaries or
+                the path of a JSON rules file (defaults to TELEMETRY_RULES_PATH, or
+                the built-in rules when that is empty)
+            rules_check_interval: Seconds between checks of a rules file for changes
+            format_numbers: Returns the valid numbers of a recipient list (e.g.
+                SMSLeopardService.format_phone_numbers); alerts for a group with
+                none are dropped and counted as unrouted instead of queued
+
+        Raises:
+            ValueError: If the rules are invalid
+        """
+        self.batch_size = batch_size or Config.TELEMETRY_BATCH_SIZE
+        self.format_numbers = format_numbers
+        if recipients is None:
+            recipients = [n.strip() for n in Config.TELEMETRY_RECIPIENTS.split(',') if n.strip()]
+        self.registry = DeviceRegistry()
+        self.registry.set_group(DEFAULT_GROUP, recipients)
+        # Latched rule name -> devices it has fired for; motion and intrusion
+        # use the registry's latch bits
+        self._latches = dict(self.registry.latched)
+        self._rules_path = None
+        self._rules_mtime = None
+        self._rules_check_interval = rules_check_interval
+        self._rules_checked = 0.0
+        if rules is None:
+            rules = Config.TELEMETRY_RULES_PATH or DEFAULT_RULES
+        self.load_rules(rules)
+        self.config = TelemetryConfigStore(config_path)
+        self._config_version = None
+        self.debouncer = AlertDebouncer(
+            min_interval=Config.TELEMETRY_MIN_INTERVAL if min_interval is None else min_interval)
+        self.sender = BackgroundAlertSender(
+            send_fn,
+            db_path=queue_path or Config.TELEMETRY_QUEUE_PATH,
+            maxsize=queue_size or Config.TELEMETRY_QUEUE_SIZE)
+        self.coalescer = AlertCoalescer(
+            self.sender.submit,
+            window=Config.TELEMETRY_COALESCE_WINDOW if coalesce_window is None else coalesce_window)
+        self.coalescer.start()
+        # The registry and debouncer are not thread-safe; one batch is evaluated at a time
+        self._lock = threading.Lock()
+        self._stats = {'received': 0, 'accepted': 0, 'malformed': 0, 'alerts': 0, 'unrouted': 0, 'batches': 0}
+        with self._lock:
+            self._sync_config()
+
+    def _sync_config(self):
+        """Reload groups and devices if another process changed them; call with the lock held"""
+        version = self.config.version()
+        if version == self._config_version:
+            return
+        self._config_version = version
+        groups, devices = self.config.load()
+        for group, recipients in groups.items():
+            self.registry.set_group(group, recipients)
+        for device_id, thresholds, group in devices:
+            try:
+                self.registry.add(device_id, thresholds, group)
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f"Skipping stored settings of device {device_id}: {str(e)}")
+
+    def load_rules(self, rules):
+        """
+        Replace the alert rules without restarting
+
+        Args:
+            rules: List of rule dictionaries, or the path of a JSON rules file
+                that is then watched for changes
+
+        Raises:
+            ValueError: If a rule is invalid; the current rules stay in place
+        """
+        path = None
+        if isinstance(rules, (str, os.PathLike)):
+            path = os.fspath(rules)
+            mtime = os.stat(path).st_mtime_ns
+            rules = load_rules(path)
+        # "metric.key" thresholds resolve against the defaults; devices' own
+        # limits replace them per reading
+        compiled = compile_rules(rules, self.registry.default_thresholds)
+        # Swapped as one tuple, so a request always parses and evaluates with the same rules
+        self._rules = (compiled, _reading_fields(compiled))
+        self._rules_path = path
+        if path is not None:
+            self._rules_mtime = mtime
+
+    @property
+    def rules(self) -> RuleSet:
+        return self._rules[0]
+
+    def _reload_rules_if_changed(self):
+        """Reload the rules file when it has changed, at most every rules_check_interval"""
+        if self._rules_path is None:
+            return
+        now = time.monotonic()
+        if now - self._rules_checked < self._rules_check_interval:
+            return
+        self._rules_checked = now
+        try:
+            mtime = os.stat(self._rules_path).st_mtime_ns
+            if mtime == self._rules_mtime:
+                return
+            # Recorded first, so a broken file is reported once rather than on every check
+            self._rules_mtime = mtime
+            self.load_rules(self._rules_path)
+            logger.info(f"Reloaded {len(self.rules)} telemetry alert rules from {self._rules_path}")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Keeping current telemetry alert rules: {str(e)}")
+
+    def configure_device(self, device_id: str, thresholds: Optional[Dict] = None, group: str = DEFAULT_GROUP):
+        """
+        Set a device's thresholds and recipient group, for every worker
+
+        Raises:
+            KeyError: If the group does not exist
+        """
+        with self._lock:
+            self._sync_config()
+            self.registry.add(device_id, thresholds, group)
+            self.config.set_device(device_id, thresholds, group)
+
+    def set_group(self, group: str, recipients: List[str]):
+        """Create or replace a recipient group, for every worker"""
+        with self._lock:
+            self._sync_config()
+            self.registry.set_group(group, list(recipients))
+            self.config.set_group(group, recipients)
+
+    def ingest(self, items: Iterable[object]) -> Dict:
+        """
+        Evaluate a stream of parsed readings
+
+        Each reading is an object with device_id and any of the metrics the
+        alert rules check (temperature, humidity, motion_detected and
+        intrusion_detected with the built-in rules). Values of metrics with
+        comparison rules must be numbers; other fields are ignored.
+
+        Args:
+            items: Parsed values from utils.json_stream (may include MALFORMED)
+
+        Returns:
+            Dictionary of received, accepted, malformed and alerts counts
+        """
+        counts = {'received': 0, 'accepted': 0, 'malformed': 0, 'alerts': 0}
+        with self._lock:
+            self._reload_rules_if_changed()
+            rules, fields = self._rules
+        device_ids = []
+        columns = {metric: [] for metric, _ in fields}
+        lists = [columns[metric] for metric, _ in fields]
+        for item in items:
+            counts['received'] += 1
+            if item is MALFORMED or not isinstance(item, dict):
+                counts['malformed'] += 1
+                continue
+            device_id = item.get('device_id')
+            try:
+                if not isinstance(device_id, str) or not device_id:
+                    raise ValueError("device_id missing")
+                values = [bool(item.get(metric)) if flag else _number(item.get(metric)) for metric, flag in fields]
+            except ValueError:
+                counts['malformed'] += 1
+                continue
+            device_ids.append(device_id)
+            for column, value in zip(lists, values):
+                column.append(value)
+            if len(device_ids) >= self.batch_size:
+                counts['alerts'] += self._evaluate(rules, device_ids, columns)
+                counts['accepted'] += len(device_ids)
+                device_ids.clear()
+                for column in lists:
+                    column.clear()
+        if device_ids:
+            counts['alerts'] += self._evaluate(rules, device_ids, columns)
+            counts['accepted'] += len(device_ids)
+        with self._lock:
+            for key, value in counts.items():
+                self._stats[key] += value
+        return counts
+
+    def _evaluate(self, rules: RuleSet, device_ids: List[str], columns: Dict[str, List]) -> int:
+        unrouted = 0
+        with self._lock:
+            self._sync_config()
+            for device_id, alert_type in self.debouncer.expired_latches():
+                held = self._latches.get(alert_type)
+                if held is not None:
+                    held.discard(device_id)
+            thresholds = self.registry.threshold_columns(device_ids)
+            events = rules.evaluate_batch(device_ids, columns, thresholds=thresholds, latched=self._latches)
+            events = self.debouncer.filter(events, device_ids, columns.get('temperature'), columns.get('humidity'),
+                                           thresholds)
+            routed = [(event, self.registry.group(event[1]) if event[1] in self.registry else DEFAULT_GROUP,
+                       self.registry.recipients(event[1])) for event in events]
+            self._stats['batches'] += 1
+        if not events:
+            return 0
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # Group -> whether any of its numbers is valid, checked once per batch
+        deliverable: Dict[str, bool] = {}
+        # Group -> alerts dropped because none of its numbers is valid
+        invalid: Dict[str, List[str]] = {}
+        with self.coalescer.batch():
+            for event, group, recipients in routed:
+                if not recipients:
+                    unrouted += 1
+                    continue
+                if self.format_numbers is not None:
+                    if group not in deliverable:
+                        deliverable[group] = bool(self.format_numbers(recipients))
+                    if not deliverable[group]:
+                        invalid.setdefault(group, []).append(f"{event[2]}:{event[1]}")
+                        continue
+                self.coalescer.add(f"{event[2]}:{event[1]}", rules.format_event(event, timestamp, thresholds),
+                                   rules[event[2]].priority, recipients)
+        if unrouted:
+            logger.warning(f"{unrouted} telemetry alerts dropped: no recipients configured")
+        for group, alerts in invalid.items():
+            logger.warning(f"{len(alerts)} telemetry alerts for group {group!r} dropped, "
+                           f"no valid phone numbers: {', '.join(alerts)}")
+            unrouted += len(alerts)
+        if unrouted:
+            with self._lock:
+                self._stats['unrouted'] += unrouted
+        return len(events)
+
+    def stats(self) -> Dict:
+        """
+        Get ingestion, debouncing, coalescing and queue counters
+
+        Returns:
+            Dictionary of counters; queue_depth is the number of alerts waiting to be sent
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['devices'] = len(self.registry)
+        sender = self.sender.stats()
+        stats['queue_depth'] = sender['depth']
+        stats['debounce'] = self.debouncer.stats()
+        stats['coalescer'] = self.coalescer.stats()
+        stats['queue'] = sender
+        return stats
+
+    def close(self, timeout: float = 10.0):
+        """Send held alerts to the queue, then give the queue up to timeout seconds to drain"""
+        self.coalescer.stop(flush=True)
+        self.sender.close(timeout)
+        self.config.close()
@@ -0,0 +1,80 @@
+import json
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+from config import Config
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS telemetry_groups (
+    name TEXT PRIMARY KEY,
+    recipients TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS telemetry_devices (
+    device_id TEXT PRIMARY KEY,
+    thresholds TEXT,
+    group_name TEXT NOT NULL
+);
+"""
+
+class TelemetryConfigStore:
+    """SQLite store of telemetry recipient groups and device settings, shared by every worker process"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Args:
+            db_path: SQLite file (defaults to TELEMETRY_CONFIG_PATH)
+        """
+        self.db_path = db_path or Config.TELEMETRY_CONFIG_PATH
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        if self.db_path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def set_group(self, name: str, recipients: List[str]):
+        """Create or replace a recipient group"""
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO telemetry_groups VALUES (?, ?)',
+                               (name, json.dumps(list(recipients))))
+
+    def set_device(self, device_id: str, thresholds: Optional[Dict], group: str):
+        """Create or replace a device's thresholds (as given, without defaults filled in) and group"""
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO telemetry_devices VALUES (?, ?, ?)',
+                               (device_id, None if thresholds is None else json.dumps(thresholds), group))
+
+    def load(self) -> Tuple[Dict[str, List[str]], List[Tuple[str, Optional[Dict], str]]]:
+        """
+        Read the whole configuration
+
+        Returns:
+            (groups by name, [(device_id, thresholds, group)])
+        """
+        with self._lock:
+            groups = self._conn.execute('SELECT name, recipients FROM telemetry_groups').fetchall()
+            devices = self._conn.execute(
+                'SELECT device_id, thresholds, group_name FROM telemetry_devices').fetchall()
+        return ({name: json.loads(recipients) for name, recipients in groups},
+                [(device_id, None if thresholds is None else json.loads(thresholds), group)
+                 for device_id, thresholds, group in devices])
+
+    def version(self) -> int:
+        """
+        Change marker: differs between two calls when another connection
+        (e.g. another worker process) wrote in between
+        """
+        with self._lock:
+            return self._conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._conn.close()
@@ -0,0 +1,68 @@
+import gzip
+from config import Config
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """
+    Check whether an Accept-Encoding header allows gzip
+
+    Args:
+        accept_encoding: Value of the request's Accept-Encoding header
+
+    Returns:
+        True if gzip is listed, or covered by "*", with a non-zero q; an explicit
+        gzip entry takes precedence over "*" wherever it appears
+    """
+    gzip_q = None
+    any_q = None
+    for part in (accept_encoding or '').lower().split(','):
+        coding, *params = part.split(';')
+        coding = coding.strip()
+        if coding not in ('gzip', '*'):
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding == 'gzip':
+            gzip_q = q
+        elif any_q is None:
+            any_q = q
+    q = gzip_q if gzip_q is not None else any_q
+    return q is not None and q > 0
+
+def gzip_response(response, accept_encoding: str, min_size: int = None, level: int = None):
+    """
+    Gzip a Flask response in place when the client accepts it and it is worth it
+
+    Streamed, already-encoded, non-textual and small responses are left alone.
+
+    Args:
+        response: Flask response object
+        accept_encoding: Value of the request's Accept-Encoding header
+        min_size: Smallest body to compress (defaults to GZIP_MIN_SIZE)
+        level: gzip compression level (defaults to GZIP_LEVEL)
+
+    Returns:
+        The same response object
+    """
+    min_size = Config.GZIP_MIN_SIZE if min_size is None else min_size
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES)):
+        return response
+    response.vary.add('Accept-Encoding')
+    if not accepts_gzip(accept_encoding):
+        return response
+    body = response.get_data()
+    if len(body) < min_size:
+        return response
+    response.set_data(gzip.compress(body, compresslevel=Config.GZIP_LEVEL if level is None else level, mtime=0))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
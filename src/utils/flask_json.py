@@ -0,0 +1,57 @@
+"""
+Flask JSON provider backed by utils.json_provider
+
+Kept apart from json_provider so that only the Flask app imports Flask.
+"""
+
+from typing import Any, Union
+from flask.json.provider import DefaultJSONProvider
+# None when orjson is missing or JSON_ENCODER=stdlib
+from utils.json_provider import orjson
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes and decodes with orjson when available
+
+    Types orjson cannot encode natively (and datetimes and dataclasses, so that
+    they keep Flask's format) go through Flask's default hook, and anything
+    that still fails is retried with the stdlib encoder. Calls with json.dumps
+    keyword arguments orjson does not support are passed straight to the
+    default provider.
+    """
+
+    _SUPPORTED_KWARGS = frozenset({'default', 'sort_keys', 'ensure_ascii', 'separators', 'indent'})
+
+    def _orjson_options(self, kwargs) -> int:
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            options |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def _dumps_bytes(self, obj: Any, **kwargs: Any) -> bytes:
+        if orjson is not None and kwargs.keys() <= self._SUPPORTED_KWARGS and kwargs.get('indent') in (None, 2):
+            try:
+                return orjson.dumps(obj, default=kwargs.get('default', self.default),
+                                    option=self._orjson_options(kwargs))
+            except TypeError:
+                pass
+        return super().dumps(obj, **kwargs).encode('utf-8')
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self._dumps_bytes(obj, **kwargs).decode('utf-8')
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        dump_args = {}
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            dump_args['indent'] = 2
+        else:
+            dump_args['separators'] = (',', ':')
+        # Hand bytes to the response directly to skip a decode/encode round trip
+        return self._app.response_class(self._dumps_bytes(obj, **dump_args) + b'\n', mimetype=self.mimetype)
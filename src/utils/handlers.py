@@ -0,0 +1,87 @@
+"""
+Request handling shared by the Flask (main.py) and ASGI (asgi.py) apps
+
+Functions here take plain values (a mimetype, a binary stream, a parsed JSON
+body) and return (payload, status) pairs or raise ValueError with the client
+error message, so both apps validate and answer the same way and only wrap
+the result in their own response type.
+"""
+
+from typing import Callable, Dict, IO, Iterable, List, Optional, Tuple
+from utils.json_stream import MAX_ITEM_SIZE, ItemTooLarge, iter_json_array, iter_ndjson
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/jsonl', 'application/json-seq')
+
+UNSUPPORTED_MEDIA_TYPE = ({'error': 'Content-Type must be application/json or application/x-ndjson'}, 415)
+
+def stream_parser(mimetype: str) -> Optional[Callable[[IO[bytes]], Iterable[object]]]:
+    """
+    Pick the incremental parser for a bulk request body
+
+    Args:
+        mimetype: Content-Type without parameters
+
+    Returns:
+        iter_ndjson or iter_json_array, or None for an unsupported type
+    """
+    if mimetype in NDJSON_TYPES:
+        return iter_ndjson
+    if mimetype == 'application/json':
+        return iter_json_array
+    return None
+
+def ingest_stream(mimetype: str, stream: IO[bytes], ingest: Callable[[Iterable[object]], Dict]) -> Tuple[Dict, int]:
+    """
+    Parse a bulk body incrementally and feed the items to an ingest function
+
+    Args:
+        mimetype: Content-Type without parameters
+        stream: Binary file-like request body, read in chunks
+        ingest: Consumer of the parsed items returning counts, e.g. DeliveryReportQueue.ingest
+
+    Returns:
+        (response payload, HTTP status); 413 for an NDJSON line longer than
+        MAX_ITEM_SIZE, keeping the batches ingest committed before it
+    """
+    parse = stream_parser(mimetype)
+    if parse is None:
+        return UNSUPPORTED_MEDIA_TYPE
+    try:
+        return {'success': True, 'data': ingest(parse(stream))}, 200
+    except ItemTooLarge:
+        return {'error': f"Each line must be at most {MAX_ITEM_SIZE} characters"}, 413
+
+def group_recipients(data) -> List[str]:
+    """
+    Recipients of a PUT /telemetry/groups/<group> body
+
+    Raises:
+        ValueError: If recipients is not a list of phone number strings
+    """
+    recipients = data.get('recipients') if isinstance(data, dict) else None
+    if not isinstance(recipients, list) or not all(isinstance(n, str) for n in recipients):
+        raise ValueError('recipients must be a list of phone numbers')
+    return recipients
+
+def configure_device(telemetry, device_id: str, data):
+    """
+    Apply a PUT /telemetry/devices/<device_id> body
+
+    Args:
+        telemetry: TelemetryProcessor
+        device_id: Device ID from the path
+        data: Parsed JSON body
+
+    Raises:
+        ValueError: With the client error message if the body is invalid
+    """
+    data = data if isinstance(data, dict) else {}
+    thresholds = data.get('thresholds')
+    if thresholds is not None and not isinstance(thresholds, dict):
+        raise ValueError('thresholds must be an object')
+    try:
+        telemetry.configure_device(device_id, thresholds, data.get('group', 'default'))
+    except KeyError:
+        raise ValueError('Unknown recipient group')
+    except (TypeError, ValueError):
+        raise ValueError('Threshold limits must be numbers')
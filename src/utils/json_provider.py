@@ -0,0 +1,54 @@
+"""
+JSON encoding helpers with an optional fast backend
+
+orjson is used when it is installed and JSON_ENCODER is not 'stdlib';
+otherwise everything falls back to the standard library json module. This
+module does not import Flask, so the ASGI app and the services can use it;
+the Flask JSON provider built on it is in utils/flask_json.py.
+"""
+
+import json
+from typing import Any, Union
+from config import Config
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+if Config.JSON_ENCODER == 'stdlib':
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'stdlib'
+
+def dumps_bytes(obj: Any) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON bytes
+
+    Args:
+        obj: JSON-serializable object
+
+    Returns:
+        Encoded JSON
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def dumps(obj: Any) -> str:
+    """Serialize to a compact JSON string"""
+    return dumps_bytes(obj).decode('utf-8')
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """
+    Deserialize JSON text or UTF-8 bytes
+
+    Raises:
+        ValueError: If the input is not valid JSON
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
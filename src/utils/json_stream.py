@@ -0,0 +1,154 @@
+import codecs
+import json
+from typing import IO, Iterator, List
+from utils.json_provider import loads
+
+# Yielded in place of an item that could not be parsed
+MALFORMED = object()
+
+CHUNK_SIZE = 64 * 1024
+MAX_ITEM_SIZE = 1024 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+class ItemTooLarge(ValueError):
+    """Raised by iter_ndjson for a line longer than MAX_ITEM_SIZE characters"""
+
+def _read_text(stream: IO[bytes], chunk_size: int) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                yield tail
+            return
+        yield decoder.decode(chunk)
+
+def _parse_line(line: str):
+    if len(line) > MAX_ITEM_SIZE:
+        raise ItemTooLarge(f"NDJSON line longer than {MAX_ITEM_SIZE} characters")
+    try:
+        return loads(line)
+    except ValueError:
+        return MALFORMED
+
+def iter_ndjson(stream: IO[bytes], chunk_size: int = CHUNK_SIZE) -> Iterator[object]:
+    """
+    Incrementally parse newline-delimited JSON from a byte stream
+
+    Only the new chunk is split into lines; the unterminated tail is kept as
+    pieces and joined once its newline arrives, so a long line costs linear
+    time.
+
+    Args:
+        stream: Binary file-like object (e.g. a Flask request stream)
+        chunk_size: Number of bytes read per call
+
+    Yields:
+        Parsed values, or MALFORMED for lines that are not valid JSON
+
+    Raises:
+        ItemTooLarge: Once a line grows past MAX_ITEM_SIZE characters; lines
+            before it have already been yielded
+    """
+    pending: List[str] = []
+    pending_size = 0
+    for text in _read_text(stream, chunk_size):
+        *lines, tail = text.split('\n')
+        if lines and pending:
+            lines[0] = ''.join(pending) + lines[0]
+            pending = []
+            pending_size = 0
+        for line in lines:
+            line = line.strip()
+            if line:
+                yield _parse_line(line)
+        if tail:
+            pending.append(tail)
+            pending_size += len(tail)
+            if pending_size > MAX_ITEM_SIZE:
+                raise ItemTooLarge(f"NDJSON line longer than {MAX_ITEM_SIZE} characters")
+    line = ''.join(pending).strip()
+    if line:
+        yield _parse_line(line)
+
+def iter_json_array(stream: IO[bytes], chunk_size: int = CHUNK_SIZE) -> Iterator[object]:
+    """
+    Incrementally parse the elements of a top-level JSON array
+
+    Only one element at a time is held in memory beyond the read buffer. A
+    body that is not an array, or an element that cannot be parsed, yields a
+    single MALFORMED and ends the iteration since the array cannot be resynced.
+
+    Args:
+        stream: Binary file-like object (e.g. a Flask request stream)
+        chunk_size: Number of bytes read per call
+
+    Yields:
+        Parsed array elements, or MALFORMED on a parse error
+    """
+    chunks = _read_text(stream, chunk_size)
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        try:
+            text = next(chunks)
+        except StopIteration:
+            eof = True
+            return False
+        # Drop consumed text so the buffer never grows past one element
+        buffer = buffer[pos:] + text
+        pos = 0
+        return True
+
+    def skip(chars: str) -> bool:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or not fill():
+                return pos < len(buffer)
+
+    if not skip(_WHITESPACE) or buffer[pos] != '[':
+        if buffer.strip():
+            yield MALFORMED
+        return
+    pos += 1
+    first = True
+    while True:
+        if not skip(_WHITESPACE):
+            yield MALFORMED
+            return
+        if buffer[pos] == ']':
+            return
+        if not first:
+            if buffer[pos] != ',':
+                yield MALFORMED
+                return
+            pos += 1
+            if not skip(_WHITESPACE):
+                yield MALFORMED
+                return
+        first = False
+        while True:
+            try:
+                item, end = _decoder.raw_decode(buffer, pos)
+            except ValueError:
+                item, end = MALFORMED, -1
+            # A value ending exactly at the buffer edge may be truncated (e.g. a number)
+            if end == len(buffer) or item is MALFORMED:
+                if len(buffer) - pos <= MAX_ITEM_SIZE and fill():
+                    continue
+            break
+        if item is MALFORMED:
+            yield MALFORMED
+            return
+        pos = end
+        yield item
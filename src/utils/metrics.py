@@ -0,0 +1,253 @@
+"""
+Low-overhead metrics registry with Prometheus text exposition
+
+Counters and histograms keep one cell per thread, so the hot path never
+takes a lock: a thread only writes to its own cell and a scrape sums the cells
+of all threads. Histograms use fixed buckets, so an observation is a bisect
+plus two additions.
+
+Metrics are per process and there is no multiprocess aggregation: under
+gunicorn (WORKERS > 1) a /metrics scrape is answered by whichever worker
+accepts it and reports only that worker's values. Keep WORKERS=1 when
+scraping, or scrape each worker separately and sum by instance.
+"""
+
+import abc
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _Metric(abc.ABC):
+    """Base class for labelled metrics with per-thread cells"""
+
+    type_name = ''
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        # label values -> {thread ident -> cell}
+        self._children: Dict[Tuple[str, ...], Dict[int, list]] = {}
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def _new_cell(self) -> list:
+        """A fresh per-thread cell"""
+
+    def _cell(self, labelvalues: Tuple[str, ...]) -> list:
+        cells = self._children.get(labelvalues)
+        if cells is None:
+            with self._lock:
+                cells = self._children.setdefault(labelvalues, {})
+        ident = threading.get_ident()
+        cell = cells.get(ident)
+        if cell is None:
+            with self._lock:
+                cell = cells.setdefault(ident, self._new_cell())
+        return cell
+
+    def _snapshot(self) -> List[Tuple[Tuple[str, ...], List[list]]]:
+        with self._lock:
+            return [(labels, list(cells.values())) for labels, cells in self._children.items()]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    @abc.abstractmethod
+    def _render_samples(self) -> List[str]:
+        """Sample lines summed over all threads' cells"""
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+
+    type_name = 'counter'
+
+    def _new_cell(self) -> list:
+        return [0.0]
+
+    def inc(self, *labelvalues: str, amount: float = 1.0):
+        """
+        Increment the counter for the given label values
+
+        Args:
+            labelvalues: One value per label name, in order
+            amount: Amount to add
+        """
+        self._cell(labelvalues)[0] += amount
+
+    def value(self, *labelvalues: str) -> float:
+        """Current total for the given label values"""
+        with self._lock:
+            cells = list(self._children.get(labelvalues, {}).values())
+        return sum(cell[0] for cell in cells)
+
+    def _render_samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(sum(c[0] for c in cells))}"
+                for labels, cells in self._snapshot()]
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_cell(self) -> list:
+        # One count per bucket, one for +Inf, then the running sum
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value: float, *labelvalues: str):
+        """
+        Record an observation for the given label values
+
+        Args:
+            value: Observed value (seconds for latency histograms)
+            labelvalues: One value per label name, in order
+        """
+        cell = self._cell(labelvalues)
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        for labels, cells in self._snapshot():
+            counts = [0] * (len(self.buckets) + 1)
+            total = 0.0
+            for cell in cells:
+                for i in range(len(counts)):
+                    counts[i] += cell[i]
+                total += cell[-1]
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+class CallbackGauge:
+    """Gauge whose value is read from a callback at scrape time"""
+
+    type_name = 'gauge'
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], Optional[float]]):
+        self.name = name
+        self.help = help_text
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        try:
+            value = self.callback()
+        except Exception:
+            value = None
+        if value is None:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}",
+                f"{self.name} {_format_value(value)}"]
+
+class CallbackCounter(CallbackGauge):
+    """Counter whose running total is read from a callback at scrape time"""
+
+    type_name = 'counter'
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Register a metric, returning the existing one if the name is taken"""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge_callback(self, name: str, help_text: str, callback: Callable[[], Optional[float]]) -> CallbackGauge:
+        return self.register(CallbackGauge(name, help_text, callback))
+
+    def counter_callback(self, name: str, help_text: str,
+                         callback: Callable[[], Optional[float]]) -> CallbackCounter:
+        return self.register(CallbackCounter(name, help_text, callback))
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format 0.0.4"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Inbound HTTP
+HTTP_REQUESTS = REGISTRY.counter(
+    'fruitguard_http_requests_total', 'HTTP requests handled', ('method', 'route', 'status'))
+HTTP_LATENCY = REGISTRY.histogram(
+    'fruitguard_http_request_duration_seconds', 'HTTP request latency', ('method', 'route'))
+
+# Upstream SMSLeopard calls
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    'fruitguard_upstream_requests_total', 'SMSLeopard API calls', ('endpoint', 'status_class'))
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    'fruitguard_upstream_request_duration_seconds', 'SMSLeopard API call latency', ('endpoint', 'status_class'))
+SEND_RETRIES = REGISTRY.counter(
+    'fruitguard_sms_send_retries_total', 'SMS send attempts retried after a failure')
+SEND_RECIPIENTS = REGISTRY.histogram(
+    'fruitguard_sms_send_recipients', 'Recipients per upstream send request', (),
+    buckets=(1, 10, 100, 1000, 10000, 100000))
+
+def status_class(status_code) -> str:
+    """Map an HTTP status code to 2xx/3xx/4xx/5xx, or 'error' if there was no response"""
+    if isinstance(status_code, int):
+        return f"{status_code // 100}xx"
+    return 'error'
+
+def observe_upstream(endpoint: str, started: float, status_code=None):
+    """
+    Record one upstream API call
+
+    Args:
+        endpoint: Endpoint template, e.g. '/sms/send' or '/status'
+        started: time.perf_counter() value taken before the call
+        status_code: HTTP status of the response, or None if the call raised
+    """
+    elapsed = time.perf_counter() - started
+    cls = status_class(status_code)
+    UPSTREAM_REQUESTS.inc(endpoint, cls)
+    UPSTREAM_LATENCY.observe(elapsed, endpoint, cls)
@@ -0,0 +1,227 @@
+"""
+Opt-in per-request profiling
+
+A request is profiled when PROFILING_ENABLED is set and it either carries an
+`X-Profile: 1` header or is picked by PROFILE_SAMPLE_RATE. A profiled request
+runs under cProfile and records the wall time of each stage() block on the
+send path. The result is written as JSON to a ring of at most
+PROFILE_MAX_FILES files in PROFILE_DIR, so profiles survive worker restarts and
+are shared by all gunicorn workers on the host.
+
+When a request is not profiled, stage() costs one context variable lookup,
+and cProfile is not imported until the first profiled request.
+"""
+
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from config import Config
+
+PROFILE_HEADER = 'X-Profile'
+TOP_FUNCTIONS = 40
+
+_ID_PATTERN = re.compile(r'^[0-9]+-[0-9]+-[0-9]+$')
+_current: ContextVar[Optional['RequestProfile']] = ContextVar('request_profile', default=None)
+
+class _Stage:
+    __slots__ = ('name', 'profile', 'started')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.profile = _current.get()
+
+    def __enter__(self):
+        if self.profile is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.profile is not None:
+            self.profile.add_stage(self.name, time.perf_counter() - self.started)
+        return False
+
+def stage(name: str) -> _Stage:
+    """
+    Time a block of the request if the request is being profiled
+
+    Args:
+        name: Stage name, e.g. 'format_numbers'
+
+    Returns:
+        Context manager; a no-op when no profile is active
+    """
+    return _Stage(name)
+
+class RequestProfile:
+    """cProfile run and stage timings for one request"""
+
+    def __init__(self, method: str, path: str, use_cprofile: bool = True):
+        self.method = method
+        self.path = path
+        self.stages: List[Dict] = []
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._profiler = None
+        if use_cprofile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+        self._token = None
+
+    def add_stage(self, name: str, seconds: float):
+        self.stages.append({'stage': name, 'ms': round(seconds * 1000, 3)})
+
+    def start(self):
+        """Activate the profile for the current request"""
+        self._token = _current.set(self)
+        if self._profiler is not None:
+            try:
+                self._profiler.enable()
+            except ValueError:
+                # Another profiler is already active on this thread
+                self._profiler = None
+
+    def stop(self, status_code: int) -> Dict:
+        """
+        Deactivate the profile and build its report
+
+        Args:
+            status_code: Response status of the request
+
+        Returns:
+            Report dictionary
+        """
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._token is not None:
+            _current.reset(self._token)
+            self._token = None
+        report = {
+            'method': self.method,
+            'path': self.path,
+            'status': status_code,
+            'started_at': self.started_at,
+            'duration_ms': round((time.perf_counter() - self._started) * 1000, 3),
+            'stages': self.stages,
+            'functions': None,
+            'cprofile': None
+        }
+        if self._profiler is not None:
+            import io
+            import pstats
+            text = io.StringIO()
+            stats = pstats.Stats(self._profiler, stream=text)
+            report['functions'] = _top_functions(stats)
+            stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+            report['cprofile'] = text.getvalue()
+        return report
+
+def _top_functions(stats) -> List[Dict]:
+    rows = []
+    for (filename, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+        rows.append({
+            'function': f"{os.path.basename(filename)}:{line}({function})",
+            'calls': calls,
+            'total_ms': round(total * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3)
+        })
+    rows.sort(key=lambda row: row['cumulative_ms'], reverse=True)
+    return rows[:TOP_FUNCTIONS]
+
+class ProfileStore:
+    """Bounded on-disk ring of profile reports"""
+
+    def __init__(self, directory: Optional[str] = None, max_files: Optional[int] = None):
+        self.directory = directory or Config.PROFILE_DIR
+        self.max_files = max(1, max_files or Config.PROFILE_MAX_FILES)
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _ids(self) -> List[str]:
+        names = [name[:-5] for name in os.listdir(self.directory) if name.endswith('.json')]
+        return sorted((name for name in names if _ID_PATTERN.match(name)),
+                      key=lambda name: tuple(int(part) for part in name.split('-')))
+
+    def _path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.json")
+
+    def save(self, report: Dict) -> str:
+        """
+        Write a report and delete the oldest ones beyond max_files
+
+        Args:
+            report: Report from RequestProfile.stop()
+
+        Returns:
+            Profile ID
+        """
+        profile_id = f"{int(report['started_at'] * 1000)}-{os.getpid()}-{next(self._counter)}"
+        report = dict(report, id=profile_id)
+        path = self._path(profile_id)
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(report, f)
+        os.replace(f"{path}.tmp", path)
+        with self._lock:
+            for old_id in self._ids()[:-self.max_files]:
+                try:
+                    os.remove(self._path(old_id))
+                except FileNotFoundError:
+                    pass
+        return profile_id
+
+    def list(self) -> List[Dict]:
+        """
+        Summaries of the stored profiles, newest first
+
+        Returns:
+            List of dictionaries without the cProfile output
+        """
+        summaries = []
+        for profile_id in reversed(self._ids()):
+            report = self.get(profile_id)
+            if report is not None:
+                summaries.append({key: report[key] for key in
+                                  ('id', 'method', 'path', 'status', 'started_at', 'duration_ms')})
+        return summaries
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        """
+        Get one stored profile
+
+        Args:
+            profile_id: ID returned by save()
+
+        Returns:
+            Report dictionary, or None if it does not exist
+        """
+        if not _ID_PATTERN.match(profile_id):
+            return None
+        try:
+            with open(self._path(profile_id)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+def should_profile(header_value: Optional[str], sample_rate: Optional[float] = None) -> bool:
+    """
+    Decide whether to profile a request
+
+    Args:
+        header_value: Value of the X-Profile request header, if any
+        sample_rate: Fraction of requests to profile (defaults to PROFILE_SAMPLE_RATE)
+
+    Returns:
+        True if profiling is enabled and the request was requested or sampled
+    """
+    if not Config.PROFILING_ENABLED:
+        return False
+    if header_value is not None and header_value.strip().lower() in ('1', 'true', 'yes'):
+        return True
+    rate = Config.PROFILE_SAMPLE_RATE if sample_rate is None else sample_rate
+    return rate > 0 and random.random() < rate
@@ -0,0 +1,140 @@
+import unittest
+import json
+from unittest.mock import AsyncMock, Mock, patch
+from starlette.testclient import TestClient
+from src.asgi import app
+from src.services.delivery_report_store import DeliveryReportStore
+from src.services.dr_ingest_queue import DeliveryReportQueue
+
+class TestASGIApp(unittest.TestCase):
+    """Test cases for the ASGI application"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Delivery reports go to an in-memory store, not a file in the working directory
+        cls.store = DeliveryReportStore(db_path=':memory:', flush_interval=60)
+        cls.queue = DeliveryReportQueue(cls.store, maxsize=10)
+        cls.patcher = patch.dict('src.asgi.components._instances', {'dr_store': cls.store, 'dr_queue': cls.queue})
+        cls.patcher.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.patcher.stop()
+        cls.queue.close()
+        cls.store.close()
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.client = TestClient(app)
+
+    def test_health_check(self):
+        """Test health check endpoint"""
+        response = self.client.get('/health')
+        data = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['status'], 'healthy')
+        self.assertEqual(data['service'], 'fruitguard-sms')
+
+    def test_send_sms_missing_data(self):
+        """Test SMS endpoint with missing data"""
+        response = self.client.post('/sms/send', json={})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+    def test_send_sms_invalid_data(self):
+        """Test SMS endpoint with invalid data"""
+        response = self.client.post('/sms/send', json={'phone_numbers': 'not_a_list', 'message': 'Test'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+    @patch('src.asgi.sms_service.send_sms_with_retry', new_callable=AsyncMock)
+    def test_send_sms_success(self, mock_send):
+        """Test successful SMS sending via API"""
+        mock_send.return_value = {'message_id': 'test_id', 'status': 'sent'}
+
+        response = self.client.post('/sms/send', json={
+            'phone_numbers': ['0712345678'],
+            'message': 'Test message'
+        })
+        data = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(data['success'])
+        self.assertEqual(data['data']['message_id'], 'test_id')
+        mock_send.assert_awaited_once()
+
+    @patch('src.asgi.sms_service.get_sms_status', new_callable=AsyncMock)
+    def test_get_sms_status(self, mock_status):
+        """Test status lookups go upstream on a cache miss"""
+        mock_status.return_value = {'status': 'sent'}
+
+        response = self.client.get('/sms/status/asgi-status-test')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Status-Source'], 'upstream')
+        self.assertEqual(response.json()['data']['status'], 'sent')
+
+    def test_validate_phone_numbers(self):
+        """Test phone number validation endpoint"""
+        response = self.client.post('/sms/validate', json={
+            'phone_numbers': ['1234567890', 'invalid', '+1234567890']
+        })
+        data = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(data['success'])
+        self.assertEqual(data['validation_results']['invalid'], False)
+        self.assertIn('formatted_numbers', data)
+
+    def test_delivery_report_webhook(self):
+        """Test delivery report webhook endpoint"""
+        response = self.client.post('/dr', content=json.dumps({
+            'message_id': 'test_id',
+            'status': 'delivered',
+            'to': '+1234567890'
+        }), headers={'Content-Type': 'application/json'})
+
+        self.assertEqual(response.status_code, 204)
+
+    def test_bulk_body_is_parsed_as_it_streams(self):
+        """Test bulk ingestion reads a chunked body incrementally, splitting items across chunks"""
+        received = []
+        queue = Mock()
+        queue.ingest.side_effect = lambda items: received.extend(items) or {'received': len(received)}
+
+        def body():
+            yield b'[{"message_id": "a", "sta'
+            yield b'tus": "delivered"}, {"message_id": "b",'
+            yield b' "status": "failed"}]'
+
+        with patch.dict('src.asgi.components._instances', {'dr_queue': queue}):
+            response = self.client.post('/dr/bulk', content=body(), headers={'Content-Type': 'application/json'})
+            rejected = self.client.post('/dr/bulk', content=b'x', headers={'Content-Type': 'text/plain'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'success': True, 'data': {'received': 2}})
+        self.assertEqual([item['message_id'] for item in received], ['a', 'b'])
+        self.assertEqual(rejected.status_code, 415)
+        queue.ingest.assert_called_once()
+
+    def test_telemetry_ndjson_stream(self):
+        """Test telemetry readings stream into the processor line by line"""
+        telemetry = Mock()
+        telemetry.ingest.side_effect = lambda items: {'received': len(list(items))}
+        with patch.dict('src.asgi.components._instances', {'telemetry': telemetry}):
+            response = self.client.post('/telemetry', content=iter([b'{"device_id": "n1"}\n{"devi', b'ce_id": "n2"}\n']),
+                                        headers={'Content-Type': 'application/x-ndjson'})
+        self.assertEqual(response.json()['data'], {'received': 2})
+
+    def test_not_found_error(self):
+        """Test 404 error handler"""
+        response = self.client.get('/nonexistent')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('error', response.json())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,345 @@
+import unittest
+import io
+import json
+import queue
+from unittest.mock import patch
+from src.services.delivery_report_store import DeliveryReportStore
+from src.services.dr_ingest_queue import DeliveryReportQueue
+from src.services.status_cache import StatusCache
+from src.services.delivery_analytics import DeliveryAnalytics, operator_for_number
+from src.main import app
+from src.utils import json_stream
+
+class TestDeliveryReportStore(unittest.TestCase):
+    """Test cases for DeliveryReportStore"""
+
+    def setUp(self):
+        """Set up an in-memory store"""
+        self.store = DeliveryReportStore(db_path=':memory:', batch_size=3, flush_interval=60)
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_add_and_get_by_message_id(self):
+        """Test queued reports are visible after a read"""
+        self.assertTrue(self.store.add({'message_id': 'm1', 'status': 'sent', 'to': '+254712345678'}))
+        self.assertTrue(self.store.add({'message_id': 'm1', 'status': 'delivered', 'to': '+254712345678'}))
+
+        reports = self.store.get_by_message_id('m1')
+
+        self.assertEqual([r['status'] for r in reports], ['sent', 'delivered'])
+        self.assertEqual(reports[0]['payload']['to'], '+254712345678')
+
+    def test_add_rejects_report_without_message_id(self):
+        """Test reports without a message ID are not stored"""
+        self.assertFalse(self.store.add({'status': 'delivered'}))
+        self.assertFalse(self.store.add(['not', 'a', 'dict']))
+
+    def test_group_commit_on_full_batch(self):
+        """Test a full batch is committed without an explicit flush"""
+        for i in range(3):
+            self.store.add({'message_id': f'm{i}', 'status': 'delivered', 'to': '+254712345678'})
+
+        self.assertEqual(self.store._pending, [])
+
+    def test_duplicates_are_ignored(self):
+        """Test identical reports are stored once"""
+        report = {'message_id': 'm1', 'status': 'delivered', 'to': '+254712345678'}
+
+        inserted, duplicates = self.store.add_many([report, report, {'status': 'bad'}])
+
+        self.assertEqual((inserted, duplicates), ([report], 1))
+        self.assertEqual(self.store.add_many([report]), ([], 1))
+        self.assertEqual(len(self.store.get_by_message_id('m1')), 1)
+
+    def test_get_by_recipient(self):
+        """Test lookup by recipient returns newest first"""
+        self.store.add_many([
+            {'message_id': 'm1', 'status': 'delivered', 'to': '+254712345678'},
+            {'message_id': 'm2', 'status': 'failed', 'to': '+254712345678'},
+            {'message_id': 'm3', 'status': 'delivered', 'to': '+254798765432'}
+        ])
+
+        reports = self.store.get_by_recipient('+254712345678')
+
+        self.assertEqual({r['message_id'] for r in reports}, {'m1', 'm2'})
+
+class TestStatusCache(unittest.TestCase):
+    """Test cases for StatusCache"""
+
+    def test_terminal_status_never_goes_stale(self):
+        """Test delivered reports are served regardless of TTL"""
+        cache = StatusCache(ttl=0, max_entries=10)
+        cache.update_from_reports([{'message_id': 'm1', 'status': 'delivered'}])
+
+        self.assertEqual(cache.get('m1')['status'], 'delivered')
+        self.assertEqual(cache.stats()['upstream_calls_saved'], 1)
+
+    def test_non_terminal_status_goes_stale(self):
+        """Test non-terminal statuses expire after the TTL"""
+        cache = StatusCache(ttl=0, max_entries=10)
+        cache.update('m1', {'message_id': 'm1', 'status': 'sent'})
+
+        self.assertIsNone(cache.get('m1'))
+        self.assertIsNone(cache.get('m2'))
+        self.assertEqual(cache.stats()['stale'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_update_from_send_response(self):
+        """Test message IDs are indexed from a send response"""
+        cache = StatusCache(ttl=60, max_entries=10)
+        cache.update_from_send_response({
+            'success': True,
+            'recipients': [{'id': 'm1', 'number': '254712345678', 'status': 'queued'}]
+        })
+
+        self.assertEqual(cache.get('m1')['status'], 'queued')
+
+    def test_evicts_least_recently_used(self):
+        """Test the cache stays within max_entries"""
+        cache = StatusCache(ttl=60, max_entries=2)
+        for i in range(3):
+            cache.update(f'm{i}', {'status': 'delivered'})
+
+        self.assertIsNone(cache.get('m0'))
+        self.assertEqual(cache.stats()['entries'], 2)
+
+class TestDeliveryAnalytics(unittest.TestCase):
+    """Test cases for DeliveryAnalytics"""
+
+    def test_operator_for_number(self):
+        """Test Kenyan operator detection from number prefixes"""
+        self.assertEqual(operator_for_number('+254712345678'), 'safaricom')
+        self.assertEqual(operator_for_number('0733123456'), 'airtel')
+        self.assertEqual(operator_for_number('772123456'), 'telkom')
+        self.assertEqual(operator_for_number('+1234567890'), 'other')
+
+    def test_send_and_delivery_rollups(self):
+        """Test sends and reports update rollups and the latency histogram"""
+        analytics = DeliveryAnalytics(minute_retention=10, hour_retention=10, max_pending=10)
+        result = {'recipients': [
+            {'id': 'm1', 'number': '254712345678'},
+            {'id': 'm2', 'number': '254733123456'}
+        ]}
+        analytics.record_send(result, 'FruitGuard', ['+254712345678', '+254733123456'])
+        analytics.record_reports([
+            {'message_id': 'm1', 'status': 'delivered'},
+            {'message_id': 'm2', 'status': 'failed'},
+            {'message_id': 'm3', 'status': 'sent'}
+        ])
+
+        snapshot = analytics.snapshot('minute', 5)
+
+        self.assertEqual(snapshot['totals']['sent'], 2)
+        self.assertEqual(snapshot['totals']['delivered'], 1)
+        self.assertEqual(snapshot['totals']['failed'], 1)
+        self.assertEqual(snapshot['totals']['pending'], 0)
+        self.assertEqual(snapshot['latency_seconds']['count'], 1)
+        bucket = snapshot['buckets'][-1]
+        self.assertEqual(bucket['sender_id']['FruitGuard'], {'sent': 2, 'delivered': 1, 'failed': 1})
+        self.assertEqual(bucket['operator']['airtel']['failed'], 1)
+
+    def test_minute_buckets_are_bounded(self):
+        """Test old buckets are evicted beyond the retention"""
+        analytics = DeliveryAnalytics(minute_retention=3, hour_retention=3, max_pending=10)
+        for minute in range(5):
+            analytics.record_send({}, 'FruitGuard', ['+254712345678'], sent_at=minute * 60)
+
+        buckets = analytics.snapshot('minute', 10)['buckets']
+
+        self.assertEqual([b['start'] for b in buckets], [120, 180, 240])
+
+    def test_duplicate_reports_are_counted_once(self):
+        """Test listeners only see newly stored reports, so analytics ignores duplicates"""
+        analytics = DeliveryAnalytics(minute_retention=10, hour_retention=10, max_pending=10)
+        store = DeliveryReportStore(db_path=':memory:', flush_interval=60)
+        dr_queue = DeliveryReportQueue(store, maxsize=10)
+        dr_queue.add_listener(analytics.record_reports)
+        analytics.record_send({'recipients': [{'id': 'm1', 'number': '254712345678'}]}, 'FruitGuard',
+                              ['+254712345678'])
+        report = {'message_id': 'm1', 'status': 'delivered', 'to': '+254712345678'}
+
+        self.assertEqual(dr_queue.process([report, report]), (1, 1))
+        self.assertEqual(dr_queue.process([report]), (0, 1))
+        dr_queue.close()
+        store.close()
+
+        totals = analytics.snapshot('minute', 5)['totals']
+        self.assertEqual((totals['sent'], totals['delivered']), (1, 1))
+
+    def test_late_bucket_keeps_order(self):
+        """Test a bucket older than the newest one is inserted in order"""
+        analytics = DeliveryAnalytics(minute_retention=3, hour_retention=3, max_pending=10)
+        for minute in (0, 2, 1):
+            analytics.record_send({}, 'FruitGuard', ['+254712345678'], sent_at=minute * 60)
+
+        buckets = analytics.snapshot('minute', 2)['buckets']
+
+        self.assertEqual([b['start'] for b in buckets], [60, 120])
+
+class TestDeliveryReportEndpoints(unittest.TestCase):
+    """Test cases for delivery report endpoints"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.store = DeliveryReportStore(db_path=':memory:', flush_interval=60)
+        self.queue = DeliveryReportQueue(self.store, maxsize=10)
+        self.cache = StatusCache(ttl=60, max_entries=100)
+        self.queue.add_listener(self.cache.update_from_reports)
+        self.patcher = patch.dict('src.main.components._instances', {
+            'dr_store': self.store,
+            'dr_queue': self.queue,
+            'status_cache': self.cache
+        })
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.queue.close()
+        self.store.close()
+
+    def test_delivery_report_is_stored(self):
+        """Test /dr persists the report and it can be queried"""
+        payload = {'message_id': 'abc', 'status': 'delivered', 'to': '+254712345678'}
+        response = self.client.post('/dr', data=json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 204)
+        self.queue.join()
+
+        response = self.client.get('/sms/reports/abc')
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['data'][0]['status'], 'delivered')
+
+    def test_malformed_reports_are_counted(self):
+        """Test malformed bodies are acked and counted by the worker"""
+        response = self.client.post('/dr', data='{not json', content_type='application/json')
+        self.assertEqual(response.status_code, 204)
+        self.client.post('/dr', data=json.dumps({'status': 'delivered'}), content_type='application/json')
+        self.queue.join()
+
+        response = self.client.get('/dr/stats')
+        data = json.loads(response.data)
+
+        self.assertEqual(data['data']['malformed'], 2)
+        self.assertEqual(data['data']['stored'], 0)
+
+    def test_full_queue_applies_backpressure(self):
+        """Test /dr asks the provider to retry when the queue is full"""
+        with patch.object(self.queue._queue, 'put_nowait', side_effect=queue.Full):
+            response = self.client.post('/dr', data=json.dumps({'message_id': 'x'}), content_type='application/json')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+        self.assertEqual(self.queue.stats()['dropped'], 1)
+
+    @patch('src.main.sms_service.get_sms_status')
+    def test_status_served_from_delivery_report(self, mock_status):
+        """Test /sms/status skips the upstream call after a delivery report"""
+        payload = {'message_id': 'abc', 'status': 'delivered', 'to': '+254712345678'}
+        self.client.post('/dr', data=json.dumps(payload), content_type='application/json')
+        self.queue.join()
+
+        response = self.client.get('/sms/status/abc')
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Status-Source'], 'cache')
+        self.assertEqual(data['data']['status'], 'delivered')
+        mock_status.assert_not_called()
+
+    @patch('src.main.sms_service.get_sms_status')
+    def test_status_falls_back_to_upstream(self, mock_status):
+        """Test /sms/status calls the provider on a cache miss"""
+        mock_status.return_value = {'status': 'sent'}
+
+        response = self.client.get('/sms/status/xyz')
+
+        self.assertEqual(response.headers['X-Status-Source'], 'upstream')
+        self.assertEqual(self.cache.stats()['upstream_calls'], 1)
+        mock_status.assert_called_once_with('xyz')
+
+    @patch('src.main.sms_service.get_sms_status')
+    def test_status_shape_is_the_same_for_cache_and_upstream(self, mock_status):
+        """Test /sms/status answers with the same fields whichever source served it"""
+        mock_status.return_value = {'id': 'up', 'status': 'sent', 'number': '+254700000001', 'cost': 1.2}
+        self.client.post('/dr', data=json.dumps({'message_id': 'dr', 'status': 'delivered',
+                                                 'to': '+254700000002', 'timestamp': 1}),
+                         content_type='application/json')
+        self.queue.join()
+
+        cached = json.loads(self.client.get('/sms/status/dr').data)['data']
+        upstream = json.loads(self.client.get('/sms/status/up').data)['data']
+
+        self.assertEqual(cached, {'message_id': 'dr', 'status': 'delivered', 'to': '+254700000002'})
+        self.assertEqual(upstream, {'message_id': 'up', 'status': 'sent', 'to': '+254700000001'})
+        self.assertEqual(json.loads(self.client.get('/sms/status/up').data)['data'], upstream)
+
+    def test_bulk_json_array(self):
+        """Test bulk ingestion of a JSON array"""
+        reports = [{'message_id': f'm{i}', 'status': 'delivered', 'to': '+254712345678'} for i in range(5)]
+        body = json.dumps(reports + [reports[0], {'status': 'no id'}])
+
+        with patch('src.main.Config.DR_BULK_BATCH_SIZE', 2):
+            response = self.client.post('/dr/bulk', data=body, content_type='application/json')
+        data = json.loads(response.data)['data']
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((data['accepted'], data['duplicates'], data['malformed']), (5, 1, 1))
+        self.assertEqual(self.cache.get('m4')['status'], 'delivered')
+
+    def test_bulk_ndjson(self):
+        """Test bulk ingestion of newline-delimited JSON"""
+        body = '{"message_id": "a", "status": "delivered"}\nnot json\n\n{"message_id": "b", "status": "failed"}'
+
+        response = self.client.post('/dr/bulk', data=body, content_type='application/x-ndjson')
+        data = json.loads(response.data)['data']
+
+        self.assertEqual((data['received'], data['accepted'], data['malformed']), (3, 2, 1))
+        self.assertEqual(len(self.store.get_by_message_id('b')), 1)
+
+    def test_bulk_ndjson_line_too_long(self):
+        """Test a line past MAX_ITEM_SIZE ends the ingest with 413"""
+        body = '{"message_id": "a", "status": "delivered"}\n{"message_id": "' + 'x' * (json_stream.MAX_ITEM_SIZE + 1)
+
+        response = self.client.post('/dr/bulk', data=body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 413)
+        self.assertIn('at most', json.loads(response.data)['error'])
+
+    def test_ndjson_lines_across_chunks(self):
+        """Test lines split over many reads are joined, and the pending tail is capped"""
+        body = b'{"a": 1}\n{"b": "\xc3\xa9"}\n\n[1, 2]'
+        self.assertEqual(list(json_stream.iter_ndjson(io.BytesIO(body), chunk_size=3)),
+                         [{'a': 1}, {'b': 'é'}, [1, 2]])
+        with patch.object(json_stream, 'MAX_ITEM_SIZE', 10):
+            items = json_stream.iter_ndjson(io.BytesIO(b'{"a": 1}\n' + b'1' * 100), chunk_size=4)
+            self.assertEqual(next(items), {'a': 1})
+            with self.assertRaises(ValueError):
+                next(items)
+
+    def test_bulk_rejects_unknown_content_type(self):
+        """Test bulk ingestion requires a JSON content type"""
+        response = self.client.post('/dr/bulk', data='x', content_type='text/plain')
+
+        self.assertEqual(response.status_code, 415)
+
+    def test_delivery_analytics_endpoint(self):
+        """Test the analytics endpoint validates its parameters"""
+        response = self.client.get('/analytics/delivery?granularity=hour&last=2')
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['data']['granularity'], 'hour')
+        self.assertEqual(self.client.get('/analytics/delivery?granularity=day').status_code, 400)
+
+    def test_unknown_message_id(self):
+        """Test querying an unknown message ID"""
+        response = self.client.get('/sms/reports/missing')
+
+        self.assertEqual(response.status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
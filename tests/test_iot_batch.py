@@ -0,0 +1,75 @@
+import math
+import unittest
+from src.iot import rules
+from src.iot.batch import format_event
+from src.iot.rules import DEFAULT_RULES, compile_rules
+
+THRESHOLDS = {'temperature': {'min': 15, 'max': 35}, 'humidity': {'min': 30, 'max': 80}}
+
+class TestEvaluateBatch(unittest.TestCase):
+    """Test cases for batch evaluation of the built-in rules"""
+
+    ruleset = compile_rules(DEFAULT_RULES, THRESHOLDS)
+
+    device_ids = ['a', 'b', 'a', 'c', 'b']
+    temperature = [10.0, 25.0, 40.0, math.nan, 36.0]
+    humidity = [50.0, 20.0, 85.0, 60.0, None]
+    motion = [False, True, True, True, True]
+    intrusion = [False, False, False, True, False]
+
+    expected = [
+        (0, 'a', 'temperature_low', 10.0),
+        (1, 'b', 'humidity_low', 20.0),
+        (1, 'b', 'motion', None),
+        (2, 'a', 'temperature_high', 40.0),
+        (2, 'a', 'humidity_high', 85.0),
+        (2, 'a', 'motion', None),
+        (3, 'c', 'motion', None),
+        (3, 'c', 'intrusion', None),
+        (4, 'b', 'temperature_high', 36.0)
+    ]
+
+    def columns(self, temperature, humidity, motion, intrusion):
+        return {'temperature': temperature, 'humidity': humidity,
+                'motion_detected': motion, 'intrusion_detected': intrusion}
+
+    def evaluate(self, use_numpy, latched=None):
+        columns = self.columns(self.temperature, self.humidity, self.motion, self.intrusion)
+        return self.ruleset.evaluate_batch(self.device_ids, columns, latched=latched, use_numpy=use_numpy)
+
+    def test_python_backend(self):
+        """Test the loop backend matches per-reading checks, latching motion per device"""
+        self.assertEqual(self.evaluate(False), self.expected)
+
+    @unittest.skipIf(rules.np is None, 'NumPy is not installed')
+    def test_numpy_backend_matches_python(self):
+        """Test the vectorized backend gives the same events in the same order"""
+        np = rules.np
+        self.assertEqual(self.evaluate(True), self.expected)
+        columns = self.columns(np.array(self.temperature, dtype=float), np.array([50, 20, 85, 60, np.nan]),
+                               np.array(self.motion), np.array(self.intrusion))
+        events = self.ruleset.evaluate_batch(np.array(self.device_ids), columns, use_numpy=True)
+        self.assertEqual(events, self.expected)
+
+    def test_latched_devices_stay_silent(self):
+        """Test devices latched by an earlier batch do not alert again"""
+        for use_numpy in ([False, True] if rules.np is not None else [False]):
+            latched = {'motion': {'b'}, 'intrusion': set()}
+            events = self.evaluate(use_numpy, latched)
+            self.assertNotIn((1, 'b', 'motion', None), events)
+            self.assertNotIn((4, 'b', 'motion', None), events)
+            self.assertEqual(latched['motion'], {'a', 'b', 'c'})
+            self.assertEqual(latched['intrusion'], {'c'})
+
+    def test_column_length_mismatch(self):
+        """Test columns must match the number of device IDs"""
+        with self.assertRaises(ValueError):
+            self.ruleset.evaluate_batch(['a', 'b'], {'temperature': [20.0]})
+
+    def test_format_event(self):
+        """Test event text follows the single-reading alert wording"""
+        self.assertEqual(format_event((0, 'node-7', 'temperature_high', 42.0), '2026-01-01 00:00:00'),
+                         'node-7: Temperature too high: 42°C at 2026-01-01 00:00:00')
+
+if __name__ == '__main__':
+    unittest.main()
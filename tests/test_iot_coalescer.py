@@ -0,0 +1,97 @@
+import unittest
+from src.iot.coalescer import AlertCoalescer, format_alert, pack_messages
+from src.iot.segments import count_segments, encoded_length
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestSegments(unittest.TestCase):
+    """Test cases for SMS segment counting"""
+
+    def test_gsm7_limits(self):
+        """Test GSM-7 messages split at 160 and then 153 characters"""
+        self.assertEqual(count_segments('a' * 160), 1)
+        self.assertEqual(count_segments('a' * 161), 2)
+        self.assertEqual(count_segments('a' * 306), 2)
+        self.assertEqual(count_segments('a' * 307), 3)
+
+    def test_extension_characters_take_two_septets(self):
+        """Test extension table characters count twice"""
+        self.assertEqual(encoded_length('€{}'), ('gsm7', 6))
+        self.assertEqual(count_segments('a' * 159 + '€'), 2)
+
+    def test_ucs2_limits(self):
+        """Test any non-GSM character switches to UCS-2 limits"""
+        self.assertEqual(count_segments('°' + 'a' * 69), 1)
+        self.assertEqual(count_segments('°' + 'a' * 70), 2)
+        self.assertEqual(encoded_length('🚨'), ('ucs2', 2))
+
+class TestAlertCoalescer(unittest.TestCase):
+    """Test cases for windowed alert coalescing"""
+
+    def setUp(self):
+        self.sent = []
+        self.clock = FakeClock()
+        self.coalescer = AlertCoalescer(lambda numbers, text: self.sent.append((list(numbers), text)),
+                                        window=30, max_delay={'high': 0, 'medium': 10}, clock=self.clock)
+
+    def test_reading_alerts_combined_into_one_send(self):
+        """Test alerts from one reading go out as one message per recipient group"""
+        recipients = ['+254712345678', '+254722000111']
+        with self.coalescer.batch():
+            self.coalescer.add('temperature_high', 'Temperature too high: 42C', 'high', recipients)
+            self.coalescer.add('humidity_high', 'Humidity too high: 90%', 'medium', recipients)
+            self.coalescer.add('motion', 'Motion detected in orchard', 'high', recipients)
+
+        self.assertEqual(len(self.sent), 1)
+        numbers, text = self.sent[0]
+        self.assertEqual(numbers, recipients)
+        self.assertTrue(text.startswith('🚨 URGENT: 3 alerts'))
+        self.assertLess(text.index('Motion'), text.index('Humidity'))
+        stats = self.coalescer.stats()
+        self.assertEqual(stats['requests'], 1)
+        self.assertGreater(stats['segments_saved'], 0)
+
+    def test_priority_controls_hold_time(self):
+        """Test medium alerts wait for their max delay and repeats are counted"""
+        self.coalescer.add('humidity_high', 'Humidity too high: 90%', 'medium', ['+254712345678'])
+        self.clock.now += 5
+        self.coalescer.add('humidity_high', 'Humidity too high: 91%', 'medium', ['+254712345678'])
+        self.assertEqual(self.coalescer.flush_due(), 0)
+
+        self.clock.now += 6
+        self.assertEqual(self.coalescer.flush_due(), 1)
+        self.assertEqual(self.sent[0][1], '⚠️ ALERT: 1 alert\nHumidity too high: 91% (x2)')
+
+    def test_single_alert_keeps_original_format(self):
+        """Test a lone alert is formatted exactly as before coalescing"""
+        self.coalescer.add('daily_report', 'All systems operational.', 'normal', ['+254712345678'])
+        self.coalescer.flush()
+
+        self.assertEqual(self.sent, [(['+254712345678'], format_alert('All systems operational.', 'normal'))])
+
+    def test_rejected_send_counts_as_error(self):
+        """Test a send function returning False is counted as a failure, not a send"""
+        coalescer = AlertCoalescer(lambda numbers, text: False, window=30, clock=self.clock)
+        coalescer.add('intrusion', 'Intrusion detected', 'high', ['+254712345678'])
+
+        self.assertEqual(coalescer.flush(), 0)
+        stats = coalescer.stats()
+        self.assertEqual((stats['send_errors'], stats['requests'], stats['messages']), (1, 0, 0))
+
+    def test_packing_respects_segment_budget(self):
+        """Test alerts are split across messages once the budget is reached"""
+        alerts = [('high', f'Sensor {i} reading out of range ' + 'x' * 40, 1) for i in range(8)]
+
+        messages = pack_messages(alerts, max_segments=2)
+
+        self.assertGreater(len(messages), 1)
+        self.assertTrue(all(count_segments(m) <= 2 for m in messages))
+        self.assertEqual(sum(m.count('Sensor') for m in messages), 8)
+
+if __name__ == '__main__':
+    unittest.main()
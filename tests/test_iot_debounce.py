@@ -0,0 +1,93 @@
+import unittest
+from src.iot.debounce import AlertDebouncer, TTLMap
+
+THRESHOLDS = {'temperature': {'min': 15, 'max': 35}, 'humidity': {'min': 30, 'max': 80}}
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestTTLMap(unittest.TestCase):
+    """Test cases for the TTL-evicting map"""
+
+    def test_entries_expire_and_are_bounded(self):
+        """Test entries expire after their TTL and the oldest go beyond max_entries"""
+        clock = FakeClock()
+        ttl_map = TTLMap(ttl=10, max_entries=2, clock=clock)
+        ttl_map.set('a', 1)
+        clock.now += 5
+        ttl_map.set('b', 2)
+        ttl_map.set('c', 3)
+        self.assertEqual(ttl_map.expire(), [('a', 1)])
+        clock.now += 10
+        self.assertIsNone(ttl_map.get('b'))
+        self.assertEqual(ttl_map.expire(), [('b', 2), ('c', 3)])
+        self.assertEqual(len(ttl_map), 0)
+
+class TestAlertDebouncer(unittest.TestCase):
+    """Test cases for hysteresis, re-alert intervals and latch expiry"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.debouncer = AlertDebouncer(hysteresis={'temperature': 1.0}, min_interval=300,
+                                        latch_ttl={'motion': 600}, clock=self.clock)
+
+    def feed(self, device_id, temperature):
+        """Run one temperature reading through the debouncer, returning whether it alerted"""
+        events = []
+        if temperature > THRESHOLDS['temperature']['max']:
+            events.append((0, device_id, 'temperature_high', temperature))
+        return bool(self.debouncer.filter(events, [device_id], [temperature], None, THRESHOLDS))
+
+    def test_hovering_reading_alerts_once(self):
+        """Test readings flapping around max inside the band send one alert"""
+        sent = [self.feed('node-1', t) for t in (35.5, 34.8, 35.2, 34.5, 35.9)]
+        self.assertEqual(sent, [True, False, False, False, False])
+        stats = self.debouncer.stats()
+        self.assertEqual(stats['suppressed_hysteresis'], 2)
+        self.assertEqual(stats['cleared'], 0)
+
+    def test_clear_then_min_interval(self):
+        """Test an alert clears below the band but waits min_interval to fire again"""
+        self.assertTrue(self.feed('node-1', 36))
+        self.assertFalse(self.feed('node-1', 33.5))
+        self.assertFalse(self.feed('node-1', 36))
+        self.assertEqual(self.debouncer.stats()['suppressed_interval'], 1)
+        self.clock.now += 301
+        self.assertFalse(self.feed('node-1', 30))
+        self.assertTrue(self.feed('node-1', 36))
+
+    def test_devices_are_independent(self):
+        """Test one device's active alert does not suppress another's"""
+        self.assertTrue(self.feed('node-1', 36))
+        self.assertTrue(self.feed('node-2', 36))
+
+    def test_batch_replays_readings_in_order(self):
+        """Test a recovery reading inside a batch clears the alert for later readings"""
+        self.debouncer.min_interval = 0
+        events = [(0, 'n', 'temperature_high', 36.0), (2, 'n', 'temperature_high', 36.0)]
+        allowed = self.debouncer.filter(events, ['n', 'n', 'n'], [36.0, 30.0, 36.0], None, THRESHOLDS)
+        self.assertEqual(allowed, events)
+
+    def test_latches_expire(self):
+        """Test latched alerts are reported for release after latch_ttl"""
+        self.assertTrue(self.debouncer.filter([(0, 'node-1', 'motion', None)], ['node-1']))
+        self.assertEqual(self.debouncer.expired_latches(), [])
+        self.clock.now += 601
+        self.assertEqual(self.debouncer.expired_latches(), [('node-1', 'motion')])
+        self.assertEqual(self.debouncer.stats()['latches_expired'], 1)
+
+    def test_idle_state_is_evicted(self):
+        """Test state of devices that stop alerting is dropped after state_ttl"""
+        debouncer = AlertDebouncer(state_ttl=60, clock=self.clock)
+        debouncer.filter([(0, 'node-1', 'temperature_high', 36.0)], ['node-1'], [36.0], None, THRESHOLDS)
+        self.clock.now += 61
+        self.assertTrue(debouncer.filter([(0, 'node-1', 'temperature_high', 36.0)], ['node-1'],
+                                         [36.0], None, THRESHOLDS))
+        self.assertEqual(debouncer.stats()['states_evicted'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import json
+import os
+import tempfile
+import unittest
+from iot_example import FruitGuardIoT
+from src.iot.rules import DEFAULT_RULES
+
+class RecordingTransport:
+    """Transport that keeps the messages instead of sending them"""
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, phone_numbers, message):
+        self.sent.append(message)
+        return True
+
+    def close(self):
+        pass
+
+def rules_with(name, **changes):
+    return [dict(spec, **changes) if spec['name'] == name else spec for spec in DEFAULT_RULES]
+
+class TestFruitGuardRules(unittest.TestCase):
+    """Test cases for FruitGuardIoT alert rules on device readings"""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.transport = RecordingTransport()
+
+    def make_iot(self, rules=None, **kwargs):
+        iot = FruitGuardIoT(coalesce_window=0, queue_path=None, series_path=None, debounce=False,
+                            rules=rules, rules_check_interval=0, transport=self.transport, **kwargs)
+        self.addCleanup(iot.close)
+        iot.add_alert_recipient('+254700000000')
+        return iot
+
+    def write_rules(self, rules, mtime):
+        path = os.path.join(self.dir.name, 'rules.json')
+        with open(path, 'w') as f:
+            json.dump(rules, f)
+        os.utime(path, ns=(mtime, mtime))
+        return path
+
+    def test_rules_file_applies_to_device_readings(self):
+        """Test a redefined built-in rule changes the alerts of device and batch readings"""
+        iot = self.make_iot(rules_with('temperature_high', threshold=30, message='Too warm: {value}°C'))
+        iot.process_sensor_data({'temperature': 32}, device_id='node-1')
+        iot.process_sensor_batch(['node-2'], temperature=[31.5])
+        self.assertEqual(len(self.transport.sent), 2)
+        self.assertIn('node-1: Too warm: 32°C', self.transport.sent[0])
+        self.assertIn('node-2: Too warm: 31.5°C', self.transport.sent[1])
+
+    def test_device_thresholds_fill_rule_references(self):
+        """Test "temperature.max" rules use each device's own limit"""
+        iot = self.make_iot()
+        iot.add_device('cold-room', {'temperature': {'min': 0, 'max': 8}})
+        iot.process_sensor_batch(['cold-room', 'orchard'], temperature=[20.0, 20.0])
+        self.assertEqual(len(self.transport.sent), 1)
+        self.assertIn('cold-room: Temperature too high: 20°C', self.transport.sent[0])
+
+    def test_rules_file_is_reloaded_when_changed(self):
+        """Test an edited rules file takes effect on the next reading, and a broken one is ignored"""
+        path = self.write_rules(DEFAULT_RULES, 1_000_000_000)
+        iot = self.make_iot(path)
+        iot.process_sensor_data({'temperature': 32}, device_id='node-1')
+        self.assertEqual(self.transport.sent, [])
+
+        self.write_rules(rules_with('temperature_high', threshold=30), 2_000_000_000)
+        iot.process_sensor_data({'temperature': 32}, device_id='node-1')
+        self.assertEqual(len(self.transport.sent), 1)
+
+        with open(path, 'w') as f:
+            f.write('[{"name": ')
+        os.utime(path, ns=(3_000_000_000, 3_000_000_000))
+        iot.process_sensor_data({'temperature': 32}, device_id='node-2')
+        self.assertEqual(len(self.transport.sent), 2)
+        self.assertEqual(iot.rules['temperature_high'].threshold, 30)
+
+    def test_set_alert_thresholds_recompiles_rules(self):
+        """Test new global thresholds reach the compiled rules"""
+        iot = self.make_iot()
+        iot.add_device('node-1')
+        iot.set_alert_thresholds(humidity={'min': 40, 'max': 80})
+        self.assertEqual(iot.rules['humidity_low'].threshold, 40)
+        iot.process_sensor_data({'humidity': 35})
+        self.assertEqual(len(self.transport.sent), 1)
+        self.assertIn('Humidity too low: 35%', self.transport.sent[0])
+        # Devices without their own limits follow the new thresholds too
+        iot.process_sensor_data({'humidity': 35}, device_id='node-1')
+        self.assertEqual(len(self.transport.sent), 2)
+
+class TestFruitGuardReport(unittest.TestCase):
+    """Test cases for FruitGuardIoT storage and the daily report"""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.transport = RecordingTransport()
+
+    def make_iot(self, **kwargs):
+        iot = FruitGuardIoT(coalesce_window=0, debounce=False, transport=self.transport, **kwargs)
+        self.addCleanup(iot.close)
+        iot.add_alert_recipient('+254700000000')
+        return iot
+
+    def test_storage_is_opt_in(self):
+        """Test a FruitGuardIoT without data_dir or paths writes nothing to disk"""
+        cwd = os.getcwd()
+        os.chdir(self.dir.name)
+        self.addCleanup(os.chdir, cwd)
+        iot = self.make_iot()
+        iot.process_sensor_data({'temperature': 40})
+        iot.send_daily_report()
+        self.assertEqual(os.listdir(self.dir.name), [])
+        self.assertIsNone(iot.queue_stats())
+        self.assertIn('All systems operational', self.transport.sent[-1])
+        data_dir = os.path.join(self.dir.name, 'data')
+        FruitGuardIoT(data_dir=data_dir, transport=self.transport).close()
+        self.assertIn('alerts.db', os.listdir(data_dir))
+        self.assertIn('series', os.listdir(data_dir))
+
+    def test_daily_report_summarizes_history(self):
+        """Test the report counts readings, devices and alerts from the data_dir history"""
+        iot = self.make_iot(series_path=os.path.join(self.dir.name, 'series'))
+        iot.process_sensor_data({'temperature': 20, 'humidity': 60})
+        iot.process_sensor_batch(['node-1', 'node-2'], temperature=[40.0, 30.0], humidity=[50.0, 70.0])
+        iot.send_daily_report()
+        lines = self.transport.sent[-1].splitlines()
+        self.assertIn('3 readings from 2 devices', lines)
+        self.assertIn('Temperature: min 20.0°C, max 40.0°C, mean 30.0°C', lines)
+        self.assertIn('Humidity: min 50.0%, max 70.0%, mean 60.0%', lines)
+        self.assertIn('Alerts: 1 (temperature_high 1)', lines)
+
+    def test_daily_report_body(self):
+        """Test the report wording without readings and without alerts"""
+        iot = self.make_iot()
+        self.assertEqual(iot._daily_report_body({'readings': 0, 'devices': 0, 'metrics': {}, 'alerts': {}}),
+                         'No sensor readings recorded.')
+        body = iot._daily_report_body({
+            'readings': 1200, 'devices': 3, 'alerts': {},
+            'metrics': {'soil_moisture': {'count': 1200, 'min': 12.0, 'max': 40.0, 'mean': 25.25}}})
+        self.assertEqual(body, '1,200 readings from 3 devices\n'
+                               'Soil moisture: min 12.0, max 40.0, mean 25.2\n'
+                               'No alerts.')
+
+if __name__ == '__main__':
+    unittest.main()
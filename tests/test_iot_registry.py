@@ -0,0 +1,98 @@
+import unittest
+from src.iot.rules import DEFAULT_RULES, compile_rules
+from src.iot.registry import DeviceRegistry
+
+class TestDeviceRegistry(unittest.TestCase):
+    """Test cases for the array-backed device registry"""
+
+    def setUp(self):
+        self.registry = DeviceRegistry()
+        self.registry.set_group('north', ['+254712345678'])
+
+    def test_per_device_thresholds_and_groups(self):
+        """Test devices keep their own limits and recipients, filling gaps with defaults"""
+        self.registry.add('node-1', {'temperature': {'max': 30}}, group='north')
+        self.registry.add('node-2')
+        self.assertEqual(self.registry.thresholds('node-1'),
+                         {'temperature': {'min': 15.0, 'max': 30.0}, 'humidity': {'min': 30.0, 'max': 80.0}})
+        self.assertEqual(self.registry.recipients('node-1'), ['+254712345678'])
+        self.assertEqual(self.registry.group('node-2'), 'default')
+        with self.assertRaises(KeyError):
+            self.registry.add('node-3', group='missing')
+
+    def test_default_changes_reach_inheriting_devices(self):
+        """Test limits a device was not given follow later changes to the defaults"""
+        defaults = {'temperature': {'min': 15, 'max': 35}, 'humidity': {'min': 30, 'max': 80}}
+        registry = DeviceRegistry(default_thresholds=defaults)
+        registry.add('own', {'temperature': {'max': 30}})
+        registry.latched['motion'].add('seen')
+        defaults['temperature'] = {'min': 10, 'max': 25}
+        self.assertEqual(registry.thresholds('own')['temperature'], {'min': 10.0, 'max': 30.0})
+        self.assertEqual(registry.thresholds('seen')['temperature'], {'min': 10.0, 'max': 25.0})
+        columns = registry.threshold_columns(['own', 'seen', 'unknown'])
+        self.assertEqual(list(columns['temperature']['max']), [30.0, 25.0, 25.0])
+        self.assertEqual(list(columns['temperature']['min']), [10.0, 10.0, 10.0])
+
+    def test_latch_is_set_once(self):
+        """Test a latch reports True only when newly set and can be reset"""
+        self.registry.add('node-1')
+        self.assertTrue(self.registry.latch('node-1', 'motion'))
+        self.assertFalse(self.registry.latch('node-1', 'motion'))
+        self.assertTrue(self.registry.latch('node-1', 'intrusion'))
+        self.assertIn('node-1', self.registry.latched['motion'])
+        self.registry.reset_latches('node-1')
+        self.assertNotIn('node-1', self.registry.latched['motion'])
+        self.assertFalse(self.registry.latched['intrusion'])
+
+    def test_remove_keeps_slots_dense(self):
+        """Test removing a device moves the last one into its slot intact"""
+        for i in range(3):
+            self.registry.add(f"node-{i}", {'humidity': {'min': i}})
+        self.registry.latch('node-2', 'motion')
+        self.assertTrue(self.registry.remove('node-0'))
+        self.assertFalse(self.registry.remove('node-0'))
+        self.assertEqual(len(self.registry), 2)
+        self.assertEqual(self.registry.thresholds('node-2')['humidity']['min'], 2.0)
+        self.assertIn('node-2', self.registry.latched['motion'])
+
+    def test_batch_evaluation_uses_per_device_state(self):
+        """Test threshold columns and latch views plug into RuleSet.evaluate_batch"""
+        self.registry.add('hot', {'temperature': {'max': 20}})
+        self.registry.add('cool')
+        ids = ['hot', 'cool', 'new', 'hot']
+        rules = compile_rules(DEFAULT_RULES, self.registry.default_thresholds)
+        for use_numpy in (False, None):
+            self.registry.reset_latches()
+            events = rules.evaluate_batch(ids, {'temperature': [25.0, 25.0, 25.0, 19.0],
+                                                'motion_detected': [False, True, False, True]},
+                                          thresholds=self.registry.threshold_columns(ids),
+                                          latched=dict(self.registry.latched), use_numpy=use_numpy)
+            self.assertEqual(events, [(0, 'hot', 'temperature_high', 25.0), (1, 'cool', 'motion', None),
+                                      (3, 'hot', 'motion', None)])
+        self.assertNotIn('new', self.registry)
+        self.assertEqual(set(self.registry.latched['motion']), {'hot', 'cool'})
+
+    def test_unknown_devices_are_not_retained(self):
+        """Test unknown devices use the defaults and are only held while latched"""
+        columns = self.registry.threshold_columns([f"node-{i}" for i in range(1000)])
+        self.assertEqual(len(self.registry), 0)
+        self.assertEqual(columns['temperature']['max'][999], 35.0)
+        self.assertEqual(self.registry.recipients('node-1'), [])
+        self.registry.latched['motion'].add('node-1')
+        self.registry.latched['intrusion'].add('node-1')
+        self.assertEqual(len(self.registry), 1)
+        self.registry.latched['motion'].discard('node-1')
+        self.assertIn('node-1', self.registry)
+        self.registry.latched['intrusion'].discard('node-1')
+        self.assertEqual(len(self.registry), 0)
+
+    def test_memory_usage(self):
+        """Test memory accounting covers arrays, IDs and the index"""
+        for i in range(1000):
+            self.registry.add(f"node-{i:05d}")
+        usage = self.registry.memory_usage()
+        self.assertEqual(usage['total'], usage['arrays'] + usage['ids'] + usage['index'])
+        self.assertGreater(usage['arrays'], 1000 * 33)
+
+if __name__ == '__main__':
+    unittest.main()
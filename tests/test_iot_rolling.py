@@ -0,0 +1,90 @@
+import random
+import statistics
+import unittest
+from src.iot.batch import format_event
+from src.iot.rolling import MetricWindow, RollingStats
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestMetricWindow(unittest.TestCase):
+    """Test cases for the fixed-size rolling window"""
+
+    def test_statistics_match_recomputed_window(self):
+        """Test incremental mean, variance, min and max equal a full recomputation"""
+        rng = random.Random(7)
+        window = MetricWindow(size=10, alpha=0.5)
+        readings = []
+        for _ in range(200):
+            value = rng.uniform(10, 40)
+            window.push(value)
+            readings.append(value)
+            recent = readings[-10:]
+            self.assertEqual(window.count, len(recent))
+            self.assertAlmostEqual(window.mean, statistics.fmean(recent), places=9)
+            if len(recent) > 1:
+                self.assertAlmostEqual(window.variance, statistics.variance(recent), places=6)
+            self.assertEqual(window.min, min(recent))
+            self.assertEqual(window.max, max(recent))
+
+    def test_ewma_and_rate(self):
+        """Test the EWMA and the per-minute rate of change"""
+        window = MetricWindow(size=5, alpha=0.5)
+        window.push(20.0, timestamp=0)
+        window.push(24.0, timestamp=30)
+        self.assertEqual(window.ewma, 22.0)
+        self.assertEqual(window.rate(25.0, 60), 2.0)
+        self.assertIsNone(window.rate(25.0, 30))
+
+    def test_constant_window_has_no_zscore(self):
+        """Test a flat series has zero variance and no z-score"""
+        window = MetricWindow(size=4)
+        for _ in range(10):
+            window.push(21.5)
+        self.assertEqual(window.variance, 0.0)
+        self.assertIsNone(window.zscore(30.0))
+
+class TestRollingStats(unittest.TestCase):
+    """Test cases for z-score and rate-of-change rules"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.stats = RollingStats({'temperature': {'z': 3.0, 'min_samples': 10},
+                                   'humidity': {'max_rate': 5.0}},
+                                  window=20, idle_ttl=3600, clock=self.clock)
+
+    def test_zscore_follows_device_baseline(self):
+        """Test a slow daily drift is quiet but a spike against it alerts"""
+        for i in range(20):
+            self.assertEqual(self.stats.update('node-1', 'temperature', 20 + i * 0.1 + (i % 2) * 0.2), [])
+        alerts = self.stats.update('node-1', 'temperature', 30.0)
+        self.assertEqual([alert_type for alert_type, _ in alerts], ['temperature_anomaly'])
+        self.assertGreater(alerts[0][1], 3.0)
+        # Another device has no baseline yet
+        self.assertEqual(self.stats.update('node-2', 'temperature', 30.0), [])
+
+    def test_rate_rule_uses_timestamps(self):
+        """Test a fast change per minute alerts and a slow one does not"""
+        self.assertEqual(self.stats.update('node-1', 'humidity', 60, timestamp=0), [])
+        self.assertEqual(self.stats.update('node-1', 'humidity', 63, timestamp=60), [])
+        alerts = self.stats.update('node-1', 'humidity', 50, timestamp=90)
+        self.assertEqual(alerts, [('humidity_rate', -26.0)])
+
+    def test_batch_events_and_eviction(self):
+        """Test batch events use the batch event format and idle series are evicted"""
+        events = self.stats.evaluate_batch(['a', 'a'], {'humidity': [50.0, 70.0], 'temperature': [None, 20.0]},
+                                           timestamps=[0, 60])
+        self.assertEqual(events, [(1, 'a', 'humidity_rate', 70.0)])
+        self.assertEqual(format_event(events[0], '06:00'), 'a: Humidity changing fast: 70% at 06:00')
+        self.assertEqual(self.stats.stats()['series'], 2)
+        self.clock.now += 3601
+        self.stats.evaluate_batch([], {})
+        self.assertEqual(self.stats.stats()['series'], 0)
+        self.assertEqual(self.stats.stats()['evicted'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
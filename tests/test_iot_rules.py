@@ -0,0 +1,88 @@
+import math
+import unittest
+from src.iot import rules as rules_module
+from src.iot.rules import DEFAULT_RULES, compile_rules
+
+THRESHOLDS = {'temperature': {'min': 15, 'max': 35}, 'humidity': {'min': 30, 'max': 80}}
+
+def alerts(matches, timestamp='06:00'):
+    return [(rule.name, rule.format(value, timestamp), rule.priority) for rule, value in matches]
+
+class TestRules(unittest.TestCase):
+    """Test cases for declarative alert rules"""
+
+    def test_default_rules_match_builtin_checks(self):
+        """Test the default rules give the hard-coded checks' alerts, texts and priorities"""
+        rules = compile_rules(DEFAULT_RULES, THRESHOLDS)
+        latched = set()
+        reading = {'temperature': 36, 'humidity': 25.5, 'motion_detected': True, 'intrusion_detected': False}
+        self.assertEqual(alerts(rules.evaluate(reading, latched)), [
+            ('temperature_high', 'Temperature too high: 36°C at 06:00', 'high'),
+            ('humidity_low', 'Humidity too low: 25.5% at 06:00', 'medium'),
+            ('motion', 'Motion detected in orchard at 06:00', 'high')
+        ])
+        # Latched rules fire once until released
+        self.assertEqual(alerts(rules.evaluate({'motion_detected': True}, latched)), [])
+        latched.discard('motion')
+        self.assertEqual(len(rules.evaluate({'motion_detected': True}, latched)), 1)
+        self.assertEqual(rules.evaluate({'temperature': 20, 'humidity': float('nan')}, latched), [])
+
+    def test_custom_metrics(self):
+        """Test new metrics need only new rules, checked in rule order"""
+        rules = compile_rules([
+            {'name': 'soil_dry', 'metric': 'soil_moisture', 'op': '<', 'threshold': 20, 'priority': 'medium',
+             'message': '{device_id}: soil moisture {value}% below {threshold}%'},
+            {'name': 'pests', 'metric': 'pest_trap_count', 'op': '>=', 'threshold': 'pests.max',
+             'priority': 'high', 'message': '{value} pests trapped'}
+        ], {'pests': {'max': 10}})
+        matches = rules.evaluate({'soil_moisture': 12, 'pest_trap_count': 10, 'temperature': 99})
+        self.assertEqual([rule.name for rule, _ in matches], ['soil_dry', 'pests'])
+        self.assertEqual(matches[0][0].format(12, '', 'node-4'), 'node-4: soil moisture 12% below 20%')
+        self.assertEqual(rules.evaluate({'soil_moisture': 12}, skip=('soil_moisture',)), [])
+        self.assertEqual(rules.evaluate({'soil_moisture': 'wet'}), [])
+
+    def test_evaluate_batch(self):
+        """Test batch evaluation uses per-reading limits for "metric.key" thresholds and latches per device"""
+        rules = compile_rules(DEFAULT_RULES + [
+            {'name': 'soil_dry', 'metric': 'soil_moisture', 'op': '<', 'threshold': 20, 'priority': 'medium',
+             'message': 'Soil dry: {value}%'},
+            {'name': 'door', 'metric': 'door', 'op': 'true', 'latch': True, 'priority': 'high',
+             'message': 'Door open'}
+        ], THRESHOLDS)
+        device_ids = ['a', 'b', 'a', 'b']
+        columns = {'temperature': [33.0, 33.0, math.nan, 40.0], 'humidity': [50, None, 25, 50],
+                   'soil_moisture': [10, 30, 'wet', None], 'door': [True, False, True, 1]}
+        # Device b alerts above 30°C
+        thresholds = {'temperature': {'min': [15, 15, 15, 15], 'max': [35, 30, 35, 30]}}
+        expected = [
+            (0, 'a', 'soil_dry', 10.0),
+            (0, 'a', 'door', None),
+            (1, 'b', 'temperature_high', 33.0),
+            (2, 'a', 'humidity_low', 25.0),
+            (3, 'b', 'temperature_high', 40.0),
+            (3, 'b', 'door', None)
+        ]
+        for use_numpy in ([False, True] if rules_module.np is not None else [False]):
+            with self.subTest(use_numpy=use_numpy):
+                latched = {}
+                self.assertEqual(rules.evaluate_batch(device_ids, columns, thresholds, latched, use_numpy),
+                                 expected)
+                self.assertEqual(latched['door'], {'a', 'b'})
+                self.assertEqual(rules.evaluate_batch(device_ids, columns, thresholds, latched, use_numpy),
+                                 [event for event in expected if event[2] != 'door'])
+        with self.assertRaises(ValueError):
+            rules.evaluate_batch(['a'], {'temperature': [1.0, 2.0]})
+
+    def test_invalid_rules_are_rejected(self):
+        """Test malformed rules fail at compile time, not when a reading arrives"""
+        base = {'name': 'r', 'metric': 'm', 'op': '>', 'threshold': 1, 'message': 'x'}
+        for change in ({'op': '=>'}, {'threshold': None}, {'threshold': 'missing.max'},
+                       {'priority': 'urgent'}, {'message': 'at {time}'}, {'metric': ''}):
+            with self.subTest(change=change):
+                with self.assertRaises(ValueError):
+                    compile_rules([dict(base, **change)])
+        with self.assertRaises(ValueError):
+            compile_rules([base, base])
+
+if __name__ == '__main__':
+    unittest.main()
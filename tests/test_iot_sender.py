@@ -0,0 +1,145 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from src.iot.sender import SCHEMA, BackgroundAlertSender
+
+class TestBackgroundAlertSender(unittest.TestCase):
+    """Test cases for the disk-backed background alert queue"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmpdir, 'alerts.db')
+        self.sent = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_submit_does_not_wait_for_send(self):
+        """Test submit returns while the send function is still blocked"""
+        release = threading.Event()
+
+        def slow_send(numbers, message):
+            release.wait(5)
+            self.sent.append((numbers, message))
+            return True
+
+        sender = BackgroundAlertSender(slow_send, db_path=self.db_path)
+        self.assertTrue(sender.submit(['+254712345678'], 'Temperature too high'))
+        self.assertEqual(sender.stats()['depth'], 1)
+        release.set()
+        self.assertTrue(sender.join(timeout=5))
+        sender.close()
+        self.assertEqual(self.sent, [(['+254712345678'], 'Temperature too high')])
+        self.assertEqual(sender.stats()['sent'], 1)
+
+    def test_same_message_batched_into_one_call(self):
+        """Test queued alerts with identical text go out as one call"""
+        started = threading.Event()
+        release = threading.Event()
+
+        def send(numbers, message):
+            started.set()
+            release.wait(5)
+            self.sent.append((numbers, message))
+            return True
+
+        sender = BackgroundAlertSender(send, db_path=self.db_path)
+        sender.submit(['+254700000000'], 'warmup')
+        self.assertTrue(started.wait(5))
+        for number in ['+254712345678', '+254722000111', '+254712345678']:
+            sender.submit([number], 'Intrusion detected')
+        release.set()
+        sender.close()
+        self.assertEqual(self.sent[-1], (['+254712345678', '+254722000111'], 'Intrusion detected'))
+        self.assertEqual(sender.stats()['sent'], 4)
+
+    def test_queue_survives_restart(self):
+        """Test unsent alerts are delivered by the next sender on the same file"""
+        sender = BackgroundAlertSender(lambda numbers, message: False, db_path=self.db_path, backoff=60)
+        sender.submit(['+254712345678'], 'Motion detected')
+        sender.close(timeout=0.2)
+
+        restarted = BackgroundAlertSender(lambda numbers, message: self.sent.append(message) or True,
+                                          db_path=self.db_path)
+        self.assertEqual(restarted.stats()['recovered'], 1)
+        self.assertTrue(restarted.join(timeout=5))
+        restarted.close()
+        self.assertEqual(self.sent, ['Motion detected'])
+
+    def test_bounded_queue_rejects_when_full(self):
+        """Test submit refuses alerts beyond maxsize and counts them"""
+        release = threading.Event()
+        sender = BackgroundAlertSender(lambda numbers, message: release.wait(5), db_path=self.db_path, maxsize=2)
+        results = [sender.submit(['+254712345678'], f"alert {i}") for i in range(4)]
+        self.assertEqual(results.count(False), 2)
+        self.assertEqual(sender.stats()['dropped'], 2)
+        release.set()
+        sender.close()
+
+    def test_failed_alert_dropped_after_max_attempts(self):
+        """Test an alert is retried and then dropped"""
+        calls = []
+        sender = BackgroundAlertSender(lambda numbers, message: calls.append(message) and False,
+                                       db_path=self.db_path, max_attempts=3, backoff=0.01)
+        sender.submit(['+254712345678'], 'Humidity too low')
+        self.assertTrue(sender.join(timeout=5))
+        sender.close()
+        stats = sender.stats()
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(stats['retries'], 2)
+        self.assertEqual(stats['failed'], 1)
+
+    def test_senders_sharing_a_file_send_each_alert_once(self):
+        """Test two senders on one queue file claim rows instead of both sending them"""
+        lock = threading.Lock()
+
+        def send(numbers, message):
+            with lock:
+                self.sent.append(message)
+            return True
+
+        first = BackgroundAlertSender(send, db_path=self.db_path, batch_size=1)
+        second = BackgroundAlertSender(send, db_path=self.db_path, batch_size=1)
+        for i in range(40):
+            (first if i % 2 else second).submit(['+254712345678'], f"alert {i}")
+        self.assertTrue(first.join(timeout=10))
+        first.close()
+        second.close()
+        self.assertEqual(sorted(self.sent), sorted(f"alert {i}" for i in range(40)))
+        self.assertEqual(first.stats()['depth'], 0)
+        self.assertEqual(first.stats()['sent'] + second.stats()['sent'], 40)
+
+    def test_stale_claim_is_taken_over(self):
+        """Test alerts claimed by a sender that died are sent after claim_timeout"""
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript(SCHEMA)
+        conn.execute("INSERT INTO alert_queue (phone_numbers, message, enqueued_at, claimed_by, claimed_at) "
+                     "VALUES ('[\"+254712345678\"]', 'Frost warning', 0, 'dead:1', 0)")
+        conn.commit()
+        conn.close()
+        restarted = BackgroundAlertSender(lambda numbers, message: self.sent.append(message) or True,
+                                          db_path=self.db_path, claim_timeout=1)
+        self.assertTrue(restarted.join(timeout=5))
+        restarted.close()
+        self.assertEqual(self.sent, ['Frost warning'])
+
+    def test_claim_expiring_after_restart_is_sent_without_submit(self):
+        """Test an idle sender picks up a claim once it expires, without a new alert waking it"""
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript(SCHEMA)
+        conn.execute("INSERT INTO alert_queue (phone_numbers, message, enqueued_at, claimed_by, claimed_at) "
+                     "VALUES ('[\"+254712345678\"]', 'Frost warning', ?, 'dead:1', ?)", (time.time(), time.time()))
+        conn.commit()
+        conn.close()
+        restarted = BackgroundAlertSender(lambda numbers, message: self.sent.append(message) or True,
+                                          db_path=self.db_path, claim_timeout=0.5)
+        self.assertTrue(restarted.join(timeout=5))
+        restarted.close()
+        self.assertEqual(self.sent, ['Frost warning'])
+
+if __name__ == '__main__':
+    unittest.main()
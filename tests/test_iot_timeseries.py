@@ -0,0 +1,79 @@
+import math
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from src.iot.timeseries import TimeSeriesStore
+
+def at(day, hour):
+    return datetime.combine(day, datetime.min.time()).timestamp() + hour * 3600
+
+class TestTimeSeriesStore(unittest.TestCase):
+    """Test cases for the memory-mapped sensor time-series store"""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.store = TimeSeriesStore(self.path)
+        self.today = date.today()
+        self.yesterday = self.today - timedelta(days=1)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.path)
+
+    def test_daily_summary(self):
+        """Test per-day aggregates skip unreported values and count alerts"""
+        self.store.append(['a', 'b', 'a'], {'temperature': [20.0, 30.0, None], 'humidity': [50, float('nan'), 70]},
+                          [at(self.today, 1), at(self.today, 2), at(self.today, 3)])
+        self.store.append(['c'], {'temperature': [99.0]}, at(self.yesterday, 12))
+        self.store.append_alerts([('a', 'temperature_high'), ('b', 'motion'), ('a', 'temperature_high')],
+                                 at(self.today, 2))
+
+        summary = self.store.daily_summary(self.today)
+        self.assertEqual(summary['readings'], 3)
+        self.assertEqual(summary['devices'], 2)
+        self.assertEqual(summary['metrics']['temperature'], {'count': 2, 'min': 20.0, 'max': 30.0, 'mean': 25.0})
+        self.assertEqual(summary['metrics']['humidity']['mean'], 60.0)
+        self.assertEqual(summary['alerts'], {'temperature_high': 2, 'motion': 1})
+        self.assertEqual(self.store.daily_summary(self.yesterday)['metrics']['temperature']['max'], 99.0)
+
+    def test_readings_without_device(self):
+        """Test readings and alerts without a device are counted but are not a device"""
+        self.store.append([None, 'a'], {'temperature': [20.0, 22.0]}, at(self.today, 1))
+        self.store.append_alerts([(None, 'temperature_high')], at(self.today, 1))
+        summary = self.store.daily_summary(self.today)
+        self.assertEqual(summary['readings'], 2)
+        self.assertEqual(summary['devices'], 1)
+        self.assertEqual(summary['alerts'], {'temperature_high': 1})
+
+    def test_range_scan_across_days_and_reopen(self):
+        """Test scans span partitions, align late metrics and survive reopening"""
+        self.store.append(['a'], {'temperature': [10.0]}, at(self.yesterday, 23))
+        self.store.append(['a', 'b'], {'temperature': [11.0, 12.0], 'soil_moisture': [30.0, 31.0]},
+                          [at(self.today, 0.5), at(self.today, 5)])
+        self.store.close()
+        self.store = TimeSeriesStore(self.path)
+
+        rows = self.store.scan(at(self.yesterday, 22), at(self.today, 1))
+        self.assertEqual(list(rows['temperature']), [10.0, 11.0])
+        self.assertTrue(math.isnan(rows['soil_moisture'][0]))
+        self.assertEqual(rows['soil_moisture'][1], 30.0)
+        self.assertEqual(self.store.summary(0, at(self.today, 24), device_id='b')['readings'], 1)
+        self.assertEqual(self.store.summary(0, at(self.today, 24), device_id='zzz')['readings'], 0)
+
+    def test_growth_and_retention(self):
+        """Test columns grow past their first chunk and old days are dropped"""
+        count = 70000
+        self.store.append(['a'] * count, {'temperature': [float(i) for i in range(count)]}, at(self.today, 6))
+        self.store.append(['a'], {'temperature': [1.0]}, at(self.yesterday, 6))
+        self.assertEqual(self.store.daily_summary(self.today)['metrics']['temperature']['max'], count - 1)
+        self.assertEqual(self.store.drop_before(self.today), [self.yesterday.isoformat()])
+        self.assertEqual(self.store.days(), [self.today.isoformat()])
+
+    def test_invalid_metric_name(self):
+        """Test metric names must be usable as column file names"""
+        with self.assertRaises(ValueError):
+            self.store.append(['a'], {'../x': [1.0]})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import requests
+from src.iot.transport import HttpTransport, InProcessTransport, make_transport
+
+class TestTransports(unittest.TestCase):
+    """Test cases for the IoT alert transports"""
+
+    def test_http_transport_posts_to_send_endpoint(self):
+        """Test the HTTP transport posts one JSON request and reports the outcome"""
+        transport = HttpTransport('http://sms.local:5000/', sender_id='Orchard')
+        with patch.object(transport.session, 'post', return_value=MagicMock(status_code=200)) as post:
+            self.assertTrue(transport.send(['+254712345678'], 'Frost warning'))
+        post.assert_called_once_with(
+            'http://sms.local:5000/sms/send',
+            json={'phone_numbers': ['+254712345678'], 'message': 'Frost warning', 'sender_id': 'Orchard'},
+            timeout=10.0)
+        with patch.object(transport.session, 'post', return_value=MagicMock(status_code=500, text='error')):
+            self.assertFalse(transport.send(['+254712345678'], 'Frost warning'))
+        with patch.object(transport.session, 'post', side_effect=requests.exceptions.ConnectionError('refused')):
+            self.assertFalse(transport.send(['+254712345678'], 'Frost warning'))
+        transport.close()
+
+    def test_inprocess_transport_calls_sms_service(self):
+        """Test the in-process transport sends and records through the shared services"""
+        services = {name: MagicMock() for name in ('sms_service', 'status_cache', 'delivery_analytics')}
+        services['sms_service'].format_phone_numbers.return_value = ['+254712345678']
+        services['sms_service'].send_sms.return_value = {'recipients': []}
+        with patch.dict('services.components._instances', services):
+            self.assertTrue(InProcessTransport(sender_id='Orchard').send(['0712345678'], 'Frost warning'))
+            services['sms_service'].send_sms.side_effect = requests.exceptions.ConnectionError('refused')
+            self.assertFalse(InProcessTransport().send(['0712345678'], 'Frost warning'))
+        services['sms_service'].send_sms.assert_any_call(['+254712345678'], 'Frost warning', sender_id='Orchard')
+        services['delivery_analytics'].record_send.assert_called_once_with(
+            {'recipients': []}, 'Orchard', ['+254712345678'])
+
+    def test_make_transport(self):
+        """Test transports are built by name and custom ones are passed through"""
+        self.assertIsInstance(make_transport('inprocess'), InProcessTransport)
+        custom = MagicMock()
+        self.assertIs(make_transport(custom), custom)
+        with self.assertRaises(ValueError):
+            make_transport('carrier-pigeon')
+
+if __name__ == '__main__':
+    unittest.main()
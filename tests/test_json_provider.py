@@ -0,0 +1,40 @@
+import unittest
+import json
+from datetime import datetime
+from decimal import Decimal
+from src.main import app
+from src.utils import json_provider
+
+class TestFastJSONProvider(unittest.TestCase):
+    """Test cases for the fast JSON provider"""
+
+    def test_matches_default_provider_output(self):
+        """Test encoded output is equivalent to Flask's default provider"""
+        data = {'b': [1, 2.5, None], 'a': {'nested': True}, 'when': datetime(2024, 1, 15, 8, 0)}
+
+        encoded = app.json.dumps(data)
+
+        self.assertEqual(json.loads(encoded)['when'], 'Mon, 15 Jan 2024 08:00:00 GMT')
+        self.assertEqual(list(json.loads(encoded)), ['a', 'b', 'when'])
+
+    def test_falls_back_for_unsupported_types(self):
+        """Test types orjson rejects are encoded by the default provider"""
+        self.assertEqual(json.loads(app.json.dumps({'cost': Decimal('0.80')})), {'cost': '0.80'})
+
+    def test_response_round_trip(self):
+        """Test responses decode back to the original object"""
+        with app.app_context():
+            response = app.json.response({'numbers': ['+254712345678'], 'count': 1})
+
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(app.json.loads(response.get_data()), {'numbers': ['+254712345678'], 'count': 1})
+
+    def test_dumps_bytes_and_loads(self):
+        """Test module-level helpers round trip non-ASCII text"""
+        payload = {'message': 'Joto la juu 🌡', 'destination': [{'number': '+254712345678'}]}
+
+        self.assertEqual(json_provider.loads(json_provider.dumps_bytes(payload)), payload)
+        self.assertRaises(ValueError, json_provider.loads, b'{not json')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import threading
+from unittest.mock import patch, Mock
+from src import main
+from src.main import app
+from src.services.smsleopard_service import SMSLeopardService
+from src.utils.metrics import Counter, Histogram, Registry, _Metric
+from utils.metrics import UPSTREAM_REQUESTS
+
+class TestMetricsRegistry(unittest.TestCase):
+    """Test cases for the metrics registry"""
+
+    def test_counter_sums_thread_cells(self):
+        """Test increments from several threads are summed at scrape time"""
+        counter = Counter('test_total', 'Test counter', ('route',))
+
+        def work():
+            for _ in range(1000):
+                counter.inc('/a')
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(counter.value('/a'), 4000)
+        self.assertEqual(counter.render()[-1], 'test_total{route="/a"} 4000')
+
+    def test_histogram_renders_cumulative_buckets(self):
+        """Test histogram exposition is cumulative with sum and count"""
+        registry = Registry()
+        histogram = registry.histogram('test_seconds', 'Test histogram', buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value)
+
+        text = registry.render()
+
+        self.assertIn('test_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('test_seconds_bucket{le="1"} 2', text)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn('test_seconds_count 3', text)
+
+    def test_callback_metrics(self):
+        """Test running totals read at scrape time are typed as counters"""
+        registry = Registry()
+        registry.counter_callback('test_stored_total', 'Stored', lambda: 7)
+        registry.gauge_callback('test_depth', 'Depth', lambda: 2)
+        registry.gauge_callback('test_missing', 'Not built yet', lambda: None)
+
+        text = registry.render()
+
+        self.assertIn('# TYPE test_stored_total counter\ntest_stored_total 7', text)
+        self.assertIn('# TYPE test_depth gauge\ntest_depth 2', text)
+        self.assertNotIn('test_missing', text)
+
+    def test_metric_base_is_abstract(self):
+        """Test a metric type must implement its cells and samples"""
+        with self.assertRaises(TypeError):
+            _Metric('test', 'Abstract')
+
+class TestMetricsEndpoint(unittest.TestCase):
+    """Test cases for the /metrics endpoint"""
+
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_records_route_template(self):
+        """Test requests are labelled by route template, not the raw path"""
+        before = main.HTTP_REQUESTS.value('GET', '/sms/reports/<message_id>', '404')
+        with patch.dict('src.main.components._instances', {'dr_store': Mock(get_by_message_id=Mock(return_value=[]))}):
+            self.client.get('/sms/reports/abc')
+            self.client.get('/sms/reports/def')
+
+        after = main.HTTP_REQUESTS.value('GET', '/sms/reports/<message_id>', '404')
+        self.assertEqual(after - before, 2)
+
+    def test_exposition_format(self):
+        """Test the endpoint serves Prometheus text format"""
+        self.client.get('/health')
+
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        text = response.get_data(as_text=True)
+        self.assertIn('# TYPE fruitguard_http_request_duration_seconds histogram', text)
+        self.assertIn('fruitguard_http_requests_total{method="GET",route="/health",status="200"}', text)
+
+    @patch('src.services.smsleopard_service.requests.post')
+    def test_upstream_calls_counted_by_status_class(self, mock_post):
+        """Test upstream send calls are counted with their status class"""
+        mock_response = Mock(status_code=200, headers={})
+        mock_response.json.return_value = {'success': True}
+        mock_post.return_value = mock_response
+        service = SMSLeopardService()
+        service.api_key, service.api_secret = 'key', 'secret'
+        before = UPSTREAM_REQUESTS.value('/sms/send', '2xx')
+
+        service.send_sms(['+254712345678'], 'Test')
+
+        self.assertEqual(UPSTREAM_REQUESTS.value('/sms/send', '2xx') - before, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from src import main
+from src.main import app
+from src.utils.profiling import ProfileStore, RequestProfile, stage
+
+class TestProfileStore(unittest.TestCase):
+    """Test cases for the on-disk profile ring"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ProfileStore(self.tmp.name, max_files=3)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_ring_keeps_newest_profiles(self):
+        """Test the oldest profiles are deleted beyond max_files"""
+        ids = []
+        for i in range(5):
+            profile = RequestProfile('POST', f'/sms/send/{i}', use_cprofile=False)
+            profile.start()
+            ids.append(self.store.save(profile.stop(200)))
+
+        self.assertEqual(len(os.listdir(self.tmp.name)), 3)
+        self.assertEqual([summary['id'] for summary in self.store.list()], ids[:1:-1])
+        self.assertIsNone(self.store.get(ids[0]))
+
+    def test_stages_recorded_only_while_active(self):
+        """Test stage() is a no-op outside a profiled request"""
+        with stage('ignored'):
+            pass
+        profile = RequestProfile('GET', '/health')
+        profile.start()
+        with stage('work'):
+            sum(range(1000))
+        report = profile.stop(200)
+
+        self.assertEqual([s['stage'] for s in report['stages']], ['work'])
+        self.assertTrue(report['functions'])
+        self.assertIn('function calls', report['cprofile'])
+
+    def test_rejects_path_like_ids(self):
+        """Test profile IDs cannot escape the profile directory"""
+        self.assertIsNone(self.store.get('../secrets'))
+
+class TestProfilingEndpoints(unittest.TestCase):
+    """Test cases for the profiling hook and admin endpoints"""
+
+    def setUp(self):
+        self.client = app.test_client()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patches = [
+            patch.object(main.Config, 'PROFILING_ENABLED', True),
+            patch.object(main.Config, 'PROFILE_SAMPLE_RATE', 0.0),
+            patch.object(main.Config, 'ADMIN_TOKEN', 'secret'),
+            patch.dict('src.main.components._instances', {'profile_store': ProfileStore(self.tmp.name, 10)})
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        self.tmp.cleanup()
+
+    def test_profiles_requests_with_header(self):
+        """Test X-Profile captures a profile that the admin endpoint serves"""
+        response = self.client.post('/sms/validate', json={'phone_numbers': ['0712345678']},
+                                    headers={'X-Profile': '1'})
+        profile_id = response.headers['X-Profile-Id']
+
+        listing = self.client.get('/admin/profiles', headers={'Authorization': 'Bearer secret'})
+        detail = self.client.get(f'/admin/profiles/{profile_id}', headers={'X-Admin-Token': 'secret'})
+
+        self.assertEqual(listing.get_json()['data'][0]['id'], profile_id)
+        self.assertEqual(detail.get_json()['data']['path'], '/sms/validate')
+
+    def test_unprofiled_requests_are_not_stored(self):
+        """Test requests without the header are not profiled at a zero sample rate"""
+        response = self.client.get('/health')
+
+        self.assertNotIn('X-Profile-Id', response.headers)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_admin_token_required(self):
+        """Test admin endpoints reject a missing or wrong token"""
+        self.assertEqual(self.client.get('/admin/profiles').status_code, 401)
+        self.assertEqual(self.client.get('/admin/profiles', headers={'X-Admin-Token': 'nope'}).status_code, 401)
+
+    def test_disabled_profiling_hides_endpoints(self):
+        """Test the header is ignored and endpoints 404 when profiling is off"""
+        with patch.object(main.Config, 'PROFILING_ENABLED', False):
+            response = self.client.get('/health', headers={'X-Profile': '1'})
+            listing = self.client.get('/admin/profiles', headers={'X-Admin-Token': 'secret'})
+
+        self.assertNotIn('X-Profile-Id', response.headers)
+        self.assertEqual(listing.status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
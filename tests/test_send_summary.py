@@ -0,0 +1,126 @@
+import gzip
+import json
+import unittest
+from unittest.mock import patch
+from src.main import app
+from src.services.send_job_store import SendJobStore, summarize_send_result
+from src.utils.compression import accepts_gzip
+
+def provider_result(count, failed_every=0):
+    recipients = []
+    for i in range(count):
+        failed = failed_every and i % failed_every == 0
+        recipients.append({
+            'id': None if failed else f'msg-{i}',
+            'number': f'+2547{i:08d}',
+            'status': 'failed' if failed else 'queued',
+            'cost': 0 if failed else 0.8
+        })
+    return {'success': True, 'recipients': recipients}
+
+class TestSendSummary(unittest.TestCase):
+    """Test cases for send result summaries and the job store"""
+
+    def test_summarize_counts_and_failures(self):
+        """Test summaries split accepted message IDs from failed recipients"""
+        summary = summarize_send_result(provider_result(10, failed_every=5), requested=12, formatted=10)
+
+        self.assertEqual(summary['accepted'], 8)
+        self.assertEqual(summary['failed'], 2)
+        self.assertEqual(summary['invalid_numbers'], 2)
+        self.assertEqual(summary['cost'], 6.4)
+        self.assertEqual([r['number'] for r in summary['failed_recipients']], ['+254700000000', '+254700000005'])
+
+    def test_job_store_round_trip(self):
+        """Test the full provider response is retrievable by job ID"""
+        store = SendJobStore(':memory:')
+        result = provider_result(3)
+        job_id = store.save(result, summarize_send_result(result, 3, 3), 'FruitGuard')
+
+        job = store.get(job_id)
+        store.close()
+
+        self.assertEqual(job['data'], result)
+        self.assertEqual(job['summary']['accepted'], 3)
+        self.assertIsNone(SendJobStore(':memory:').get('missing'))
+
+class TestSendSummaryEndpoints(unittest.TestCase):
+    """Test cases for summary view, job lookup and compression"""
+
+    def setUp(self):
+        self.client = app.test_client()
+        self.store = SendJobStore(':memory:')
+        self.instances = patch.dict('src.main.components._instances', {'job_store': self.store})
+        self.instances.start()
+
+    def tearDown(self):
+        self.instances.stop()
+        self.store.close()
+
+    @patch('src.main.sms_service.send_sms_with_retry')
+    def test_summary_view_and_job_lookup(self, mock_send):
+        """Test ?view=summary returns counts and a job ID for the full result"""
+        mock_send.return_value = provider_result(50, failed_every=10)
+        body = {'phone_numbers': [f'07{i:08d}' for i in range(50)], 'message': 'Alert'}
+
+        response = self.client.post('/sms/send?view=summary', json=body)
+        data = response.get_json()
+        job = self.client.get(f"/sms/jobs/{data['job_id']}").get_json()
+
+        self.assertNotIn('data', data)
+        self.assertEqual(data['summary']['accepted'], 45)
+        self.assertEqual(len(data['summary']['failed_recipients']), 5)
+        self.assertEqual(job['data']['data'], mock_send.return_value)
+
+    @patch('src.main.sms_service.send_sms_with_retry')
+    def test_prefer_header_selects_summary(self, mock_send):
+        """Test Prefer: return=minimal selects the summary view"""
+        mock_send.return_value = provider_result(1)
+
+        response = self.client.post('/sms/send', json={'phone_numbers': ['0712345678'], 'message': 'Alert'},
+                                    headers={'Prefer': 'return=minimal'})
+
+        self.assertIn('job_id', response.get_json())
+
+    def test_unknown_job(self):
+        """Test unknown job IDs return 404"""
+        self.assertEqual(self.client.get('/sms/jobs/nope').status_code, 404)
+
+    def test_large_responses_are_gzipped(self):
+        """Test responses above GZIP_MIN_SIZE are compressed when accepted"""
+        numbers = [f'07{i:08d}' for i in range(500)]
+
+        plain = self.client.post('/sms/validate', json={'phone_numbers': numbers})
+        compressed = self.client.post('/sms/validate', json={'phone_numbers': numbers},
+                                      headers={'Accept-Encoding': 'gzip, deflate'})
+        small = self.client.get('/health', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(compressed.data)), plain.get_json())
+        self.assertLess(len(compressed.data), len(plain.data))
+        self.assertNotIn('Content-Encoding', small.headers)
+
+class TestAcceptsGzip(unittest.TestCase):
+    """Test cases for Accept-Encoding negotiation"""
+
+    def test_explicit_gzip_entry_wins_over_wildcard(self):
+        """Test gzip's own q-value decides, in whatever order it appears with *"""
+        cases = {
+            'gzip': True,
+            'deflate, gzip;q=0.5': True,
+            '*': True,
+            '*;q=0': False,
+            'gzip;q=0, *': False,
+            '*, gzip;q=0': False,
+            '*;q=0, gzip': True,
+            'gzip; q=0.000': False,
+            'identity, deflate': False,
+            '': False
+        }
+        for header, expected in cases.items():
+            with self.subTest(header=header):
+                self.assertIs(accepts_gzip(header), expected)
+
+if __name__ == '__main__':
+    unittest.main()
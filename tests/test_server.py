@@ -0,0 +1,17 @@
+import unittest
+from unittest.mock import patch
+from src import server
+
+class TestServerOptions(unittest.TestCase):
+    """Test cases for the serving mode settings"""
+
+    def test_workers_default_to_one(self):
+        """Test one worker process by default and 0 meaning the host default in every mode"""
+        with patch.object(server.Config, 'WORKERS', 1):
+            self.assertEqual(server.production_options()['workers'], 1)
+        with patch.object(server.Config, 'WORKERS', 0):
+            self.assertEqual(server.worker_count(), server.default_workers())
+            self.assertEqual(server.production_options()['workers'], server.default_workers())
+
+if __name__ == '__main__':
+    unittest.main()
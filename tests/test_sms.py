@@ -2,6 +2,8 @@ import unittest
 import json
 from unittest.mock import Mock, patch, MagicMock
 from src.services.smsleopard_service import SMSLeopardService
+from src.services.delivery_report_store import DeliveryReportStore
+from src.services.dr_ingest_queue import DeliveryReportQueue
 from src.main import app
 
 class TestSMSLeopardService(unittest.TestCase):
@@ -103,6 +105,20 @@ class TestSMSLeopardService(unittest.TestCase):
 class TestFlaskApp(unittest.TestCase):
     """Test cases for Flask application"""
     
+    @classmethod
+    def setUpClass(cls):
+        # Delivery reports go to an in-memory store, not a file in the working directory
+        cls.store = DeliveryReportStore(db_path=':memory:', flush_interval=60)
+        cls.queue = DeliveryReportQueue(cls.store, maxsize=10)
+        cls.patcher = patch.dict('src.main.components._instances', {'dr_store': cls.store, 'dr_queue': cls.queue})
+        cls.patcher.start()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.patcher.stop()
+        cls.queue.close()
+        cls.store.close()
+    
     def setUp(self):
         """Set up test fixtures"""
         app.config['TESTING'] = True
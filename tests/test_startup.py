@@ -0,0 +1,45 @@
+import unittest
+import os
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+class TestLazyStartup(unittest.TestCase):
+    """Test cases for deferred service construction"""
+
+    def run_python(self, code):
+        env = dict(os.environ, PYTHONPATH=SRC, LOG_LEVEL='WARNING')
+        result = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result.stdout.strip().splitlines()[-1]
+
+    def test_importing_app_does_not_load_heavy_dependencies(self):
+        """Test importing main leaves requests, httpx and sqlite3 unloaded"""
+        output = self.run_python(
+            "import sys, main; "
+            "print(sorted(m for m in ('requests', 'httpx', 'sqlite3') if m in sys.modules))"
+        )
+
+        self.assertEqual(output, '[]')
+
+    def test_importing_app_starts_no_threads(self):
+        """Test the delivery report worker threads start on first use only"""
+        output = self.run_python("import threading, main; print(threading.active_count())")
+
+        self.assertEqual(output, '1')
+
+    def test_asgi_app_does_not_import_flask(self):
+        """Test the ASGI app and the JSON helpers it shares with services leave Flask unloaded"""
+        output = self.run_python("import sys, asgi, utils.json_provider; print('flask' in sys.modules)")
+
+        self.assertEqual(output, 'False')
+
+    def test_dotenv_is_loaded_only_with_an_env_file(self):
+        """Test python-dotenv is imported only when there is a .env file to read"""
+        output = self.run_python("import sys, config; print(bool(config._ENV_FILE) == ('dotenv' in sys.modules))")
+
+        self.assertEqual(output, 'True')
+
+if __name__ == '__main__':
+    unittest.main()
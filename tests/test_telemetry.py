@@ -0,0 +1,195 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from src import main
+from src.main import app
+from src.iot.rules import DEFAULT_RULES
+from src.services import telemetry
+from src.services.telemetry import TelemetryProcessor
+
+class TestTelemetry(unittest.TestCase):
+    """Test cases for the /telemetry ingestion endpoints"""
+
+    def setUp(self):
+        self.client = app.test_client()
+        self.sent = []
+        self.telemetry = TelemetryProcessor(lambda numbers, message: self.sent.append((numbers, message)) or True,
+                                            batch_size=2, coalesce_window=0, queue_path=':memory:',
+                                            recipients=['+254712345678'], config_path=':memory:')
+        self.patches = [
+            patch.dict('src.main.components._instances', {'telemetry': self.telemetry}),
+            patch.object(main.Config, 'ADMIN_TOKEN', 'secret')
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        self.telemetry.close()
+
+    def put(self, path, body):
+        return self.client.put(path, json=body, headers={'X-Admin-Token': 'secret'})
+
+    def post_ndjson(self, readings):
+        body = '\n'.join(r if isinstance(r, str) else json.dumps(r) for r in readings)
+        return self.client.post('/telemetry', data=body, content_type='application/x-ndjson')
+
+    def test_ndjson_readings_raise_alerts(self):
+        """Test readings are evaluated across batches and alerts reach the send queue"""
+        response = self.post_ndjson([
+            {'device_id': 'node-1', 'temperature': 25, 'humidity': 60},
+            {'device_id': 'node-2', 'temperature': 40},
+            '{not json',
+            {'device_id': 'node-3', 'temperature': 'hot'},
+            {'device_id': 'node-1', 'motion_detected': True}
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['data'],
+                         {'received': 5, 'accepted': 3, 'malformed': 2, 'alerts': 2})
+        self.assertTrue(self.telemetry.sender.join(timeout=5))
+        messages = '\n'.join(message for _, message in self.sent)
+        self.assertIn('node-2: Temperature too high: 40°C', messages)
+        self.assertIn('node-1: Motion detected', messages)
+        self.assertEqual({tuple(numbers) for numbers, _ in self.sent}, {('+254712345678',)})
+
+    def test_repeated_readings_are_debounced(self):
+        """Test a device staying above its threshold alerts once"""
+        self.put('/telemetry/devices/node-1', {'thresholds': {'temperature': {'max': 30}}})
+        response = self.client.post('/telemetry', json=[{'device_id': 'node-1', 'temperature': 31}] * 4)
+
+        self.assertEqual(response.get_json()['data']['alerts'], 1)
+        stats = self.client.get('/telemetry/stats').get_json()['data']
+        self.assertEqual(stats['debounce']['suppressed_hysteresis'], 3)
+        self.assertEqual(stats['devices'], 1)
+
+    def test_groups_route_alerts(self):
+        """Test devices alert their own recipient group"""
+        self.assertEqual(self.put('/telemetry/devices/node-9', {'group': 'north'}).status_code, 400)
+        self.put('/telemetry/groups/north', {'recipients': ['+254722000111']})
+        self.put('/telemetry/devices/node-9', {'group': 'north'})
+        self.post_ndjson([{'device_id': 'node-9', 'intrusion_detected': True}])
+
+        self.assertTrue(self.telemetry.sender.join(timeout=5))
+        self.assertEqual(self.sent[0][0], ['+254722000111'])
+
+    def test_configuration_requires_admin_token(self):
+        """Test the configuration endpoints refuse requests without a token, or when none is configured"""
+        body = {'recipients': ['+254722000111']}
+        self.assertEqual(self.client.put('/telemetry/groups/default', json=body).status_code, 401)
+        with patch.object(main.Config, 'ADMIN_TOKEN', ''):
+            self.assertEqual(self.client.put('/telemetry/groups/default', json=body,
+                                             headers={'X-Admin-Token': ''}).status_code, 503)
+        self.telemetry.configure_device('node-x')
+        self.assertEqual(self.telemetry.registry.recipients('node-x'), ['+254712345678'])
+
+    def test_configuration_is_shared_through_the_store(self):
+        """Test groups and devices set in one process reach another and survive a restart"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'config.db')
+            workers = [TelemetryProcessor(lambda numbers, message: True, coalesce_window=0, queue_path=':memory:',
+                                          recipients=['+254712345678'], config_path=path) for _ in range(2)]
+            workers[0].set_group('north', ['+254722000111'])
+            workers[0].configure_device('node-9', {'temperature': {'max': 20}}, 'north')
+            workers[1].ingest([{'device_id': 'node-9', 'temperature': 21}])
+            self.assertEqual(workers[1].registry.recipients('node-9'), ['+254722000111'])
+            self.assertEqual(workers[1].stats()['alerts'], 1)
+            for worker in workers:
+                worker.close()
+            restarted = TelemetryProcessor(lambda numbers, message: True, queue_path=':memory:', config_path=path)
+            self.assertEqual(restarted.registry.thresholds('node-9')['temperature']['max'], 20.0)
+            restarted.close()
+
+    def test_workers_sharing_a_queue_send_each_alert_once(self):
+        """Test processors in several workers on one queue file do not send an alert twice"""
+        sent = []
+        with tempfile.TemporaryDirectory() as tmp:
+            queue_path = os.path.join(tmp, 'alerts.db')
+            workers = [TelemetryProcessor(lambda numbers, message: sent.append(message) or True, coalesce_window=0,
+                                          queue_path=queue_path, recipients=['+254712345678'],
+                                          config_path=':memory:') for _ in range(2)]
+            for i in range(20):
+                workers[i % 2].ingest([{'device_id': f"node-{i}", 'temperature': 40}])
+            for worker in workers:
+                self.assertTrue(worker.sender.join(timeout=5))
+            self.assertEqual([worker.stats()['queue_depth'] for worker in workers], [0, 0])
+            for worker in workers:
+                worker.close()
+        self.assertEqual(len(sent), 20)
+        self.assertEqual(len(set(sent)), 20)
+
+    def test_unknown_devices_are_not_retained(self):
+        """Test readings from arbitrary device IDs do not grow the registry"""
+        self.telemetry.ingest({'device_id': f"node-{i}", 'temperature': 40} for i in range(100))
+        self.assertEqual(self.telemetry.stats()['devices'], 0)
+
+    def make_processor(self, rules, **kwargs):
+        processor = TelemetryProcessor(lambda numbers, message: self.sent.append((numbers, message)) or True,
+                                       coalesce_window=0, queue_path=':memory:', recipients=['+254712345678'],
+                                       config_path=':memory:', rules=rules, **kwargs)
+        self.addCleanup(processor.close)
+        return processor
+
+    def test_custom_metric_rule(self):
+        """Test a rule on a metric outside the built-in four is parsed and applied"""
+        soil = {'name': 'soil_moisture_low', 'metric': 'soil_moisture', 'op': '<', 'threshold': 20,
+                'priority': 'high', 'message': 'Soil moisture low: {value}% (below {threshold}%)'}
+        processor = self.make_processor(DEFAULT_RULES + [soil])
+        counts = processor.ingest([
+            {'device_id': 'bed-1', 'soil_moisture': 12.5, 'temperature': 25},
+            {'device_id': 'bed-2', 'soil_moisture': 35},
+            {'device_id': 'bed-3', 'soil_moisture': 'dry'}
+        ])
+        self.assertEqual(counts, {'received': 3, 'accepted': 2, 'malformed': 1, 'alerts': 1})
+        self.assertTrue(processor.sender.join(timeout=5))
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(self.sent[0][1], '🚨 URGENT: bed-1: Soil moisture low: 12.5% (below 20%)')
+
+    def test_rules_file_is_reloaded_when_changed(self):
+        """Test an edited rules file applies to the next request without a restart"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'rules.json')
+            with open(path, 'w') as f:
+                json.dump(DEFAULT_RULES, f)
+            os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+            processor = self.make_processor(path, rules_check_interval=0)
+            self.assertEqual(processor.ingest([{'device_id': 'node-1', 'temperature': 32}])['alerts'], 0)
+
+            warm = [dict(spec, threshold=30) if spec['name'] == 'temperature_high' else spec
+                    for spec in DEFAULT_RULES]
+            with open(path, 'w') as f:
+                json.dump(warm, f)
+            os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+            self.assertEqual(processor.ingest([{'device_id': 'node-2', 'temperature': 32}])['alerts'], 1)
+
+            with open(path, 'w') as f:
+                f.write('[{"name": ')
+            os.utime(path, ns=(3_000_000_000, 3_000_000_000))
+            self.assertEqual(processor.ingest([{'device_id': 'node-3', 'temperature': 32}])['alerts'], 1)
+            self.assertEqual(processor.rules['temperature_high'].threshold, 30)
+
+    def test_group_without_valid_numbers_drops_and_counts_alerts(self):
+        """Test alerts for a group whose numbers all fail validation are counted, not queued as sent"""
+        processor = self.make_processor(None, format_numbers=lambda numbers: [n for n in numbers if n.startswith('+254')])
+        processor.set_group('north', ['12345'])
+        processor.configure_device('node-9', None, 'north')
+        with self.assertLogs(telemetry.logger, level='WARNING') as logs:
+            counts = processor.ingest([{'device_id': 'node-9', 'temperature': 40},
+                                       {'device_id': 'node-1', 'temperature': 40}])
+        self.assertEqual(counts['alerts'], 2)
+        self.assertIn("group 'north'", logs.output[0])
+        self.assertIn('temperature_high:node-9', logs.output[0])
+        self.assertTrue(processor.sender.join(timeout=5))
+        self.assertEqual([numbers for numbers, _ in self.sent], [['+254712345678']])
+        self.assertEqual(processor.stats()['unrouted'], 1)
+
+    def test_unsupported_content_type(self):
+        """Test bodies other than JSON arrays and NDJSON are rejected"""
+        response = self.client.post('/telemetry', data='x', content_type='text/plain')
+        self.assertEqual(response.status_code, 415)
+
+if __name__ == '__main__':
+    unittest.main()